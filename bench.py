@@ -0,0 +1,374 @@
+# Banc d'essai de SSGui, sans affichage (Qt offscreen) : un serveur SSH
+# local (paramiko) joue des scénarios scriptés et un vrai onglet
+# SSHInteractiveClient les affiche.
+#
+#   python bench.py                          # tous les scénarios
+#   python bench.py flood echo --size 50     # sélection, 50 Mo de flot
+#   python bench.py --save-baseline          # enregistre la référence
+#   python bench.py --baseline ref.json      # compare à une référence
+#
+# Mesures : débit rendu (Mo/s), latence touche -> écho à l'écran
+# (percentiles), temps de rendu par frame et pic de mémoire par onglet.
+import argparse
+import json
+import logging
+import os
+import platform
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import paramiko
+from PyQt5.QtCore import Qt, QEvent, QEventLoop, QTimer
+from PyQt5.QtGui import QKeyEvent
+from PyQt5.QtWidgets import QApplication
+
+import ssgui
+
+MARKER = "@@fin@@"
+PASSWORD = "bench"
+SCENARIOS = ("flood", "tui", "trickle", "paste", "echo")
+DEFAULT_BASELINE = "bench_baseline.json"
+# Sens de chaque mesure : True si une valeur plus grande est meilleure
+HIGHER_IS_BETTER = {"mb_s": True}
+# Écart absolu en dessous duquel un temps (ms) ou une mémoire (Mo) n'est
+# pas une régression : le bruit de mesure dépasse vite 100 % sous la ms
+MIN_DELTA = 1.0
+
+# --- Serveur SSH de substitution ---------------------------------------
+
+class BenchServer(paramiko.ServerInterface):
+    def __init__(self):
+        self.shell = threading.Event()
+
+    def get_allowed_auths(self, username):
+        return "password"
+
+    def check_auth_password(self, username, password):
+        return paramiko.AUTH_SUCCESSFUL if password == PASSWORD else paramiko.AUTH_FAILED
+
+    def check_channel_request(self, kind, chanid):
+        return paramiko.OPEN_SUCCEEDED if kind == "session" else paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_pty_request(self, channel, term, width, height, pixelwidth, pixelheight, modes):
+        return True
+
+    def check_channel_window_change_request(self, channel, width, height, pixelwidth, pixelheight):
+        return True
+
+    def check_channel_shell_request(self, channel):
+        self.shell.set()
+        return True
+
+def flood_lines(size):
+    # Lignes de log ordinaires jusqu'à `size` octets
+    lines = []
+    total = n = 0
+    while total < size:
+        line = f"{n:08d} GET /api/items/{n % 997} HTTP/1.1 200 {n * 7 % 5000} octets\r\n"
+        lines.append(line)
+        total += len(line)
+        n += 1
+    return "".join(lines).encode()
+
+def tui_frames(size, cols=120, rows=40):
+    # Redessins plein écran façon top/htop : positionnement, 256 couleurs
+    # et couleurs vraies sur chaque cellule colorée
+    frames = []
+    total = frame = 0
+    while total < size:
+        parts = ["\x1b[H"]
+        for row in range(rows):
+            parts.append(f"\x1b[{row + 1};1H\x1b[38;5;{(row + frame) % 256}m{row:3d} ")
+            for col in range(0, cols - 12, 12):
+                value = (row * 31 + col * 7 + frame * 13) % 1000
+                parts.append(f"\x1b[48;2;{value % 256};{(value * 3) % 256};80m\x1b[1m{value:5d}\x1b[0m  cpu ")
+            parts.append("\x1b[K")
+        data = "".join(parts).encode()
+        frames.append(data)
+        total += len(data)
+        frame += 1
+    return b"\x1b[?1049h\x1b[2J" + b"".join(frames) + b"\x1b[0m\x1b[?1049l"
+
+def play(channel, scenario, size):
+    channel.sendall(b"pret\r\n")
+    # Le client envoie un octet quand il est prêt à chronométrer
+    if not channel.recv(1):
+        return
+    if scenario == "flood":
+        data = flood_lines(size)
+        for start in range(0, len(data), 32 * 1024):
+            channel.sendall(data[start:start + 32 * 1024])
+    elif scenario == "tui":
+        data = tui_frames(size)
+        for start in range(0, len(data), 32 * 1024):
+            channel.sendall(data[start:start + 32 * 1024])
+    elif scenario == "trickle":
+        # Une ligne toutes les 10 ms : le cas des logs suivis avec tail -f
+        deadline = time.monotonic() + size / 1e6
+        n = 0
+        while time.monotonic() < deadline:
+            channel.sendall(f"{n:06d} \x1b[32mINFO\x1b[0m tâche terminée\r\n".encode())
+            n += 1
+            time.sleep(0.01)
+    elif scenario in ("paste", "echo"):
+        # Écho façon tty jusqu'à la fermeture : CR devient CRLF ; en mode
+        # echo, chaque octet reçu réécrit la ligne avec un compteur
+        count = 0
+        while True:
+            data = channel.recv(64 * 1024)
+            if not data:
+                return
+            if scenario == "paste":
+                channel.sendall(data.replace(b"\r", b"\r\n"))
+            else:
+                for _ in data:
+                    count += 1
+                    channel.sendall(f"\rtouche {count}\x1b[K".encode())
+    channel.sendall(f"\r\n{MARKER}\r\n".encode())
+
+def serve(sock, host_key):
+    transport = paramiko.Transport(sock)
+    transport.add_server_key(host_key)
+    server = BenchServer()
+    try:
+        transport.start_server(server=server)
+        channel = transport.accept(30)
+        if channel is None or not server.shell.wait(10):
+            return
+        scenario, _, size = transport.get_username().partition("-")
+        play(channel, scenario, int(size or 0))
+        # Le client ferme l'onglet quand il a fini de mesurer
+        while channel.recv(64 * 1024):
+            pass
+    except Exception:
+        pass
+    finally:
+        transport.close()
+
+def start_server():
+    host_key = paramiko.RSAKey.generate(2048)
+    listener = socket.socket()
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(8)
+
+    def accept_loop():
+        while True:
+            sock, _ = listener.accept()
+            threading.Thread(target=serve, args=(sock, host_key), daemon=True).start()
+
+    threading.Thread(target=accept_loop, daemon=True).start()
+    return listener.getsockname()[1]
+
+# --- Client instrumenté -------------------------------------------------
+
+class Field:
+    # Remplace les champs de ConnectionDialog
+    def __init__(self, value):
+        self.value = value
+
+    def text(self):
+        return self.value
+
+    def isChecked(self):
+        return self.value
+
+    def currentData(self):
+        return self.value
+
+class BenchDialog:
+    def __init__(self, port, user):
+        self.host_input = Field("127.0.0.1")
+        self.user_input = Field(user)
+        self.pass_input = Field(PASSWORD)
+        self.port_input = Field(str(port))
+        self.remember_pass = Field(False)
+        self.tags_input = Field("")
+        self.profile_input = Field(None)
+
+def rss():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return 0
+
+def instrument():
+    # Chaque frame est chronométrée et la mémoire échantillonnée
+    render_frame = ssgui.SSHInteractiveClient.render_frame
+
+    def timed_render_frame(self):
+        start = time.perf_counter()
+        render_frame(self)
+        frames = getattr(self, "bench_frames", None)
+        if frames is not None:
+            frames.append(time.perf_counter() - start)
+            self.bench_peak = max(self.bench_peak, rss())
+
+    ssgui.SSHInteractiveClient.render_frame = timed_render_frame
+
+def screen_has(client, text):
+    screen = client.screen
+    return any(text in screen.line_text(row) for row in range(screen.rows))
+
+def wait_for(app, condition, timeout):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise TimeoutError
+        app.processEvents(QEventLoop.AllEvents | QEventLoop.WaitForMoreEvents)
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+def frame_stats(frames):
+    ms = [f * 1000 for f in frames]
+    return {"frames": len(ms), "frame_p50_ms": percentile(ms, 50),
+            "frame_p99_ms": percentile(ms, 99), "frame_max_ms": max(ms, default=0.0)}
+
+def open_tab(app, port, user, timeout):
+    client = ssgui.SSHInteractiveClient(BenchDialog(port, user))
+    client.resize(1200, 800)
+    client.show()
+    wait_for(app, lambda: client.connected and screen_has(client, "pret"), timeout)
+    client.bench_frames = []
+    client.bench_peak = client.bench_start = rss()
+    return client
+
+def close_tab(app, client):
+    client.close_session()
+    client.close()
+    client.deleteLater()
+    app.processEvents()
+
+def run_scenario(app, port, scenario, size, keystrokes, timeout):
+    if scenario == "trickle":
+        user = f"trickle-{int(2e6)}"  # durée en µs
+    else:
+        user = f"{scenario}-{size}"
+    client = open_tab(app, port, user, timeout)
+    result = {}
+    try:
+        if scenario in ("paste", "echo"):
+            client.send_input(b"g")
+        if scenario == "flood":
+            payload = len(flood_lines(size))
+        elif scenario == "tui":
+            payload = len(tui_frames(size))
+        if scenario == "echo":
+            latencies = []
+            for i in range(1, keystrokes + 1):
+                start = time.perf_counter()
+                key = QKeyEvent(QEvent.KeyPress, Qt.Key_A, Qt.NoModifier, "a")
+                QApplication.sendEvent(client.terminal, key)
+                expected = f"touche {i}"
+                wait_for(app, lambda: client.screen.line_text(client.screen.y).rstrip() == expected, timeout)
+                latencies.append((time.perf_counter() - start) * 1000)
+            result.update({"latency_p50_ms": percentile(latencies, 50),
+                           "latency_p90_ms": percentile(latencies, 90),
+                           "latency_p99_ms": percentile(latencies, 99)})
+        else:
+            if scenario == "paste":
+                line = "echo " + "x" * 70
+                text = "\r".join(line for _ in range(size // (len(line) + 1))) + "\r" + MARKER
+                payload = len(text.encode())
+                start = time.perf_counter()
+                client.paste_text(text)
+            else:
+                start = time.perf_counter()
+                client.send_input(b"g")
+            wait_for(app, lambda: screen_has(client, MARKER), timeout)
+            elapsed = time.perf_counter() - start
+            if scenario != "trickle":
+                result["mb_s"] = payload / elapsed / 1e6
+            result["seconds"] = elapsed
+        result.update(frame_stats(client.bench_frames))
+        result["peak_mb"] = (client.bench_peak - client.bench_start) / 1e6
+    finally:
+        close_tab(app, client)
+    return result
+
+# --- Référence ----------------------------------------------------------
+
+def compare(results, baseline, threshold):
+    # Renvoie la liste des régressions au-delà du seuil (en %)
+    regressions = []
+    for scenario, metrics in results.items():
+        reference = baseline.get("results", {}).get(scenario, {})
+        for name, value in metrics.items():
+            old = reference.get(name)
+            if not old or name in ("frames", "seconds"):
+                continue
+            change = (value - old) / old * 100
+            worse = -change if HIGHER_IS_BETTER.get(name, False) else change
+            flag = ""
+            if worse > threshold and (HIGHER_IS_BETTER.get(name, False) or abs(value - old) > MIN_DELTA):
+                flag = "  << RÉGRESSION"
+                regressions.append((scenario, name, old, value))
+            print(f"  {scenario:8s} {name:16s} {old:10.2f} -> {value:10.2f} ({change:+.1f} %){flag}")
+    return regressions
+
+def print_results(results):
+    for scenario, metrics in results.items():
+        print(f"{scenario}:")
+        for name, value in metrics.items():
+            print(f"  {name:16s} {value:10.2f}" if isinstance(value, float) else f"  {name:16s} {value:10d}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Banc d'essai de SSGui (Qt offscreen, serveur SSH local).")
+    parser.add_argument("scenarios", nargs="*", metavar="scénario",
+                        help="parmi " + ", ".join(SCENARIOS) + " (tous par défaut)")
+    parser.add_argument("--size", type=float, default=20, help="volume des scénarios flood, tui et paste, en Mo")
+    parser.add_argument("--keystrokes", type=int, default=200, help="nombre de touches du scénario echo")
+    parser.add_argument("--timeout", type=float, default=120, help="délai maximal par étape, en secondes")
+    parser.add_argument("--baseline", help=f"référence à comparer (par défaut {DEFAULT_BASELINE} s'il existe)")
+    parser.add_argument("--save-baseline", nargs="?", const=DEFAULT_BASELINE, metavar="FICHIER",
+                        help="enregistre les résultats comme référence")
+    parser.add_argument("--threshold", type=float, default=15, help="écart signalé comme régression, en %%")
+    args = parser.parse_args(argv)
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error("scénario inconnu : " + ", ".join(sorted(unknown)))
+    scenarios = args.scenarios or list(SCENARIOS)
+    baseline_path = os.path.abspath(args.baseline or DEFAULT_BASELINE)
+    save_path = os.path.abspath(args.save_baseline) if args.save_baseline else None
+
+    logging.getLogger("paramiko").setLevel(logging.CRITICAL)  # fermetures brutales du serveur
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    # Inventaire et journaux du banc dans un dossier jetable
+    os.chdir(tempfile.mkdtemp(prefix="ssgui-bench-"))
+    instrument()
+    port = start_server()
+    heartbeat = QTimer()
+    heartbeat.start(50)  # réveille wait_for même sans événement
+
+    results = {}
+    for scenario in scenarios:
+        print(f"[*] {scenario}...", file=sys.stderr)
+        results[scenario] = run_scenario(app, port, scenario, int(args.size * 1e6), args.keystrokes, args.timeout)
+    print_results(results)
+
+    status = 0
+    if os.path.exists(baseline_path) and baseline_path != save_path:
+        with open(baseline_path, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"\nComparaison avec {baseline_path} ({baseline.get('machine', '?')}) :")
+        if compare(results, baseline, args.threshold):
+            status = 1
+    if save_path:
+        with open(save_path, "w", encoding="utf-8") as f:
+            json.dump({"machine": platform.node(), "python": platform.python_version(),
+                       "date": time.strftime("%Y-%m-%d %H:%M"), "results": results}, f, indent=2)
+        print(f"\nRéférence enregistrée dans {save_path}")
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main())
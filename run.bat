@@ -1,2 +1,2 @@
-pip install pyqt5 paramiko bcrypt cryptography qtawesome requests
+pip install pyqt5 paramiko bcrypt cryptography qtawesome
 python ssgui.py
\ No newline at end of file
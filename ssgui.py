@@ -1,56 +1,625 @@
 
 import sys
+if __name__ == "__main__" and len(sys.argv) > 1:
+    # python -m ssgui <commande> : ligne de commande, sans charger Qt
+    from ssgui_cli import main
+    sys.exit(main())
 import time
-import paramiko
 import threading
+import codecs
+import socket
+import zlib
+import marshal
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QLineEdit,
-    QPushButton, QTextEdit, QLabel, QFormLayout, QMessageBox,
-    QDialog, QHBoxLayout, QListWidget, QListWidgetItem, QComboBox, QButtonGroup, QStyle,
-    QMainWindow, QTabWidget
+    QPushButton, QTextEdit, QPlainTextEdit, QLabel, QFormLayout, QMessageBox,
+    QDialog, QHBoxLayout, QListWidget, QListWidgetItem, QListView, QComboBox, QButtonGroup, QStyle,
+    QMainWindow, QTabWidget, QSpinBox, QMenu, QActionGroup, QProgressBar, QTableWidget, QTableWidgetItem, QHeaderView,
+    QFileDialog, QSplitter, QTreeWidget, QTreeWidgetItem, QAbstractItemView, QProgressDialog
+)
+from PyQt5.QtCore import (
+    Qt, QEvent, pyqtSignal, QObject, QTimer, QRect, QRunnable, QThreadPool,
+    QAbstractListModel, QModelIndex, QMimeData, QUrl
+)
+from PyQt5.QtGui import (
+    QFont, QTextCursor, QIcon, QPixmap, QPainter, QColor, QTextCharFormat
 )
-from PyQt5.QtCore import Qt, QEvent, pyqtSignal, QObject, QTimer
-from PyQt5.QtGui import QFont, QTextCursor, QIcon, QPixmap
 import re
 import json
+from array import array
+from collections import deque
+from itertools import groupby
 import os
-import bcrypt
-from cryptography.fernet import Fernet
-import tempfile
-import shutil
+import stat
+import posixpath
 from PyQt5.QtGui import QDrag
-import qtawesome as qta
-import requests
-
-# Création automatique du fichier servers.json vide s'il n'existe pas
-if not os.path.exists("servers.json"):
-    with open("servers.json", "w", encoding="utf-8") as f:
-        json.dump([], f)
-
-def download_temp_icon(url, filename):
-    temp_dir = tempfile.gettempdir()
-    temp_path = os.path.join(temp_dir, filename)
-    r = requests.get(url)
-    with open(temp_path, "wb") as f:
-        f.write(r.content)
-    return temp_path
-
-# Téléchargement systématique à chaque lancement
-icon_png_path = download_temp_icon("https://ssgui.netlify.app/icon.png", "icon.png")
-cross_icon_path = download_temp_icon("https://ssgui.netlify.app/cross.png", "cross.png")
+from ssgui_core import (
+    CONNECT_TIMEOUT, KEEPALIVE_INTERVAL, LOG_DIR,
+    connection_key, ConnectionManager, connect_transport, stream_command,
+    ServerStore, saved_server, parse_tags, fuzzy_score, decrypt_password,
+    load_fernet_key, zstd_available, SessionLogger, TransferQueue, ChannelReactor,
+    PROFILE_LABELS, server_profile, probe_profiles, recommend_profile,
+    FORWARD_KINDS, TunnelSet, parse_forward, server_forwards
+)
+# paramiko, cryptography et qtawesome sont importés à la première utilisation :
+# la fenêtre s'affiche sans attendre leur chargement.
+
+STARTUP_T0 = time.perf_counter()
+# Budget de démarrage : temps maximal entre l'import du module et le premier
+# affichage (mesuré si SSGUI_STARTUP_TRACE est défini)
+STARTUP_BUDGET = 0.5
 
 def resource_path(filename):
-    temp_dir = tempfile.gettempdir()
-    return os.path.join(temp_dir, filename)
+    # Icônes livrées avec l'application (à côté du script, ou dans le
+    # dossier d'extraction PyInstaller) : aucun accès réseau au lancement
+    base_dir = getattr(sys, '_MEIPASS', os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(base_dir, filename)
+
+def report_startup(what):
+    if os.environ.get("SSGUI_STARTUP_TRACE") and not getattr(report_startup, "done", False):
+        report_startup.done = True
+        elapsed = time.perf_counter() - STARTUP_T0
+        status = "OK" if elapsed <= STARTUP_BUDGET else "DÉPASSÉ"
+        print(f"[startup] {what} : {elapsed * 1000:.0f} ms "
+              f"(budget {STARTUP_BUDGET * 1000:.0f} ms : {status})", file=sys.stderr)
+
+# Rendu plafonné à ~60 images/s avec un budget de temps par frame ; au-delà
+# de BACKLOG_LIMIT caractères en attente, la lecture du canal est suspendue
+# (contre-pression SSH).
+FRAME_INTERVAL = 1 / 60
+FRAME_WORK = 0.008
+FAST_FRAME_WORK = 0.05
+FRAME_SLICE = 4096
+BACKLOG_LIMIT = 256 * 1024
+
+# Onglets cachés (hibernation) : rien n'est dessiné, l'émulateur suit le
+# flux par tranches toutes les HIDDEN_FRAME_INTERVAL secondes et l'arriéré
+# peut monter à HIDDEN_BACKLOG_LIMIT caractères. L'historique du document
+# part dans l'historique compressé après RELEASE_DELAY secondes cachées,
+# ou dès que HOT_LINES lignes attendent d'être dessinées.
+HIDDEN_FRAME_INTERVAL = 0.25
+HIDDEN_BACKLOG_LIMIT = 4 * 1024 * 1024
+RELEASE_DELAY = 300
+
+# Historique : les HOT_LINES lignes les plus récentes restent dans le
+# document, les plus anciennes sont compressées par segments de
+# SEGMENT_LINES lignes (au-delà de SPILL_BYTES compressés par onglet, dans un
+# fichier temporaire). SSGUI_SCROLLBACK_LINES fixe le nombre total de lignes.
+SCROLLBACK_LINES = int(os.environ.get("SSGUI_SCROLLBACK_LINES", 1000000))
+HOT_LINES = 2000
+HOT_LINES_MAX = 50000
+SEGMENT_LINES = 1000
+SPILL_BYTES = 32 * 1024 * 1024
+# Recherche dans l'historique : correspondances envoyées par lots
+SEARCH_BATCH = 500
+SEARCH_MAX_MATCHES = 100000
+
+# Les collages sont envoyés par tranches : la progression s'affiche et le
+# collage reste annulable
+PASTE_CHUNK = 16 * 1024
+
+# Écho local prédictif (à la mosh) : les frappes s'affichent aussitôt,
+# soulignées, puis sont confirmées ou annulées par l'écho du serveur. En
+# mode automatique, seulement si l'écho mesuré dépasse PREDICT_RTT
+# secondes ; une prédiction sans écho au bout de PREDICT_TIMEOUT secondes
+# (ou 4 allers-retours) est abandonnée. SSGUI_PREDICT (off, auto, on) fixe
+# le mode des nouveaux onglets.
+PREDICT_MODE = os.environ.get("SSGUI_PREDICT", "off")
+PREDICT_RTT = 0.05
+PREDICT_TIMEOUT = 1.0
+PASSWORD_PROMPT_RE = re.compile(r'(pass(word|phrase)|mot de passe|\bpin\b|code)[^:]*:\s*$', re.I)
+
+# Instrumentation par onglet : compteurs échantillonnés chaque seconde et
+# trace circulaire des derniers événements (exportée au format Chrome trace)
+STATS_INTERVAL = 1.0
+TRACE_EVENTS = 200000
+
+MAX_PARALLEL_CONNECTS = 16
+
+# Espace de travail : les onglets ouverts à la fermeture sont rouverts au
+# lancement et se reconnectent tous en parallèle, chacun avec les
+# RESTORE_TAIL_LINES dernières lignes de son historique (0 : aucune).
+RESTORE_TAIL_LINES = int(os.environ.get("SSGUI_RESTORE_TAIL", "200"))
+
+# Reconnexion automatique : délai doublé à chaque échec
+RECONNECT_DELAY_MIN = 0.5
+RECONNECT_DELAY_MAX = 30
 
 class Worker(QObject):
     output_ready = pyqtSignal(str)
+    output_pending = pyqtSignal()
+    session_closed = pyqtSignal(str, bool)  # raison, connexion perdue
+    connect_progress = pyqtSignal(str)
+    connect_done = pyqtSignal(object, object)
+    connect_failed = pyqtSignal(str, bool)  # message, nouvelle tentative possible
+    paste_progress = pyqtSignal(int, int)
+
+class ConnectTask(QRunnable):
+    # Établit la connexion hors du thread Qt, étape par étape (TCP, KEX,
+    # authentification, shell) ; plusieurs onglets peuvent se connecter en parallèle.
+    pool = None
+
+    @classmethod
+    def shared_pool(cls):
+        if cls.pool is None:
+            cls.pool = QThreadPool()
+            cls.pool.setMaxThreadCount(MAX_PARALLEL_CONNECTS)
+        return cls.pool
+
+    def __init__(self, worker, host, port, user, passwd, cols, rows, keepalive=KEEPALIVE_INTERVAL, profile=None):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.worker = worker
+        self.host, self.port, self.user, self.passwd = host, port, user, passwd
+        self.key = connection_key(user, host, port, passwd)
+        self.cols, self.rows = cols, rows
+        self.keepalive = keepalive
+        self.profile = profile
+        self.cancelled = False
+        self.lock = threading.Lock()
+        self.sock = None
+        self.transport = None
+        self.shared = False  # transport enregistrée auprès du ConnectionManager
+        self.shell = None
+
+    def cancel(self):
+        # Fermer la socket débloque l'étape en cours ; une transport partagée
+        # n'est que rendue au gestionnaire, jamais fermée sous les autres onglets
+        with self.lock:
+            self.cancelled = True
+            sock, self.sock = self.sock, None
+            transport, self.transport = self.transport, None
+            shell, self.shell = self.shell, None
+            shared, self.shared = self.shared, False
+        for closable in (shell, sock) if shared else (shell, transport, sock):
+            try:
+                if closable is not None:
+                    closable.close()
+            except Exception:
+                pass
+        if shared:
+            ConnectionManager.shared().release(self.key, transport)
+
+    def stage(self, message):
+        if self.cancelled:
+            raise EOFError("annulé")
+        self.worker.connect_progress.emit(message)
+
+    def track(self, closable):
+        # Mémorise la socket puis la transport pour pouvoir les fermer en cas d'annulation
+        if isinstance(closable, socket.socket):
+            self.sock = closable
+        else:
+            self.transport = closable
+
+    def open_transport(self):
+        manager = ConnectionManager.shared()
+        with manager.key_lock(self.key):
+            transport = manager.acquire(self.key)
+            if transport is not None:
+                with self.lock:
+                    self.transport, self.shared = transport, True
+                self.stage(f"Réutilisation de la connexion existante vers {self.key[0]}")
+                return
+            connect_transport(self.host, self.port, self.user, self.passwd,
+                              stage=self.stage, on_open=self.track, profile=self.profile)
+            with self.lock:
+                if self.cancelled:
+                    raise EOFError("annulé")
+                manager.add(self.key, self.transport, self.keepalive)
+                self.shared = True
+
+    def run(self):
+        import paramiko
+        try:
+            self.open_transport()
+            self.stage("Ouverture du shell...")
+            shell = self.transport.open_session(timeout=CONNECT_TIMEOUT)
+            self.shell = shell
+            shell.get_pty(term='xterm-256color', width=self.cols, height=self.rows)
+            shell.invoke_shell()
+            with self.lock:
+                if self.cancelled:
+                    raise EOFError("annulé")
+                # L'onglet devient responsable du canal et de la référence
+                transport, shell = self.transport, self.shell
+                self.transport = self.shell = self.sock = None
+                self.shared = False
+            self.worker.connect_done.emit(transport, shell)
+        except Exception as e:
+            self.cancel()
+            if isinstance(e, paramiko.AuthenticationException):
+                self.worker.connect_failed.emit("Authentification échouée.", False)
+            elif isinstance(e, paramiko.SSHException):
+                self.worker.connect_failed.emit(f"Erreur SSH : {str(e)}", True)
+            else:
+                self.worker.connect_failed.emit(f"Connexion échouée : {str(e)}", True)
+
+class FanOutWorker(QObject):
+    host_started = pyqtSignal(int)
+    host_output = pyqtSignal(int, str, bool)  # ligne, texte, stderr
+    host_done = pyqtSignal(int, int, str, float)  # ligne, code, état, durée
+
+class FanOutTask(QRunnable):
+    # Exécute une commande (exec_command) sur un serveur ; la sortie est
+    # transmise au fil de l'eau et la transport est partagée avec les onglets.
+    def __init__(self, worker, row, host, port, user, passwd, command, timeout, keepalive=KEEPALIVE_INTERVAL,
+                 profile=None):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.worker = worker
+        self.row = row
+        self.host, self.port, self.user, self.passwd = host, port, user, passwd
+        self.key = connection_key(user, host, port, passwd)
+        self.command = command
+        self.timeout = timeout
+        self.keepalive = keepalive
+        self.profile = profile
+        self.cancelled = False
+        self.lock = threading.Lock()
+        self.opened = []  # socket et transport pas encore confiées au gestionnaire
+        self.channel = None
+
+    def cancel(self):
+        with self.lock:
+            self.cancelled = True
+            closables, self.opened = self.opened, []
+            if self.channel is not None:
+                closables.append(self.channel)
+        for closable in closables:
+            try:
+                closable.close()
+            except Exception:
+                pass
+
+    def track(self, closable):
+        with self.lock:
+            self.opened.append(closable)
+            if self.cancelled:
+                raise EOFError("annulé")
+
+    def open_transport(self):
+        manager = ConnectionManager.shared()
+        with manager.key_lock(self.key):
+            transport = manager.acquire(self.key)
+            if transport is None:
+                transport = connect_transport(self.host, self.port, self.user, self.passwd,
+                                              timeout=min(self.timeout, CONNECT_TIMEOUT),
+                                              on_open=self.track, profile=self.profile)
+                with self.lock:
+                    if self.cancelled:
+                        raise EOFError("annulé")
+                    self.opened = []
+                    manager.add(self.key, transport, self.keepalive)
+        return transport
+
+    def run(self):
+        start = time.perf_counter()
+        if self.cancelled:
+            self.worker.host_done.emit(self.row, -1, "Annulé", 0.0)
+            return
+        import paramiko
+        self.worker.host_started.emit(self.row)
+        deadline = start + self.timeout
+        transport = None
+        code, status = -1, ''
+        try:
+            transport = self.open_transport()
+            channel = transport.open_session(timeout=CONNECT_TIMEOUT)
+            with self.lock:
+                self.channel = channel
+                if self.cancelled:
+                    raise EOFError("annulé")
+            emit = lambda text, is_err: self.worker.host_output.emit(self.row, text, is_err)
+            code, status = stream_command(channel, self.command, emit, deadline, lambda: self.cancelled)
+        except Exception as e:
+            if self.cancelled:
+                status = "Annulé"
+            elif isinstance(e, paramiko.AuthenticationException):
+                status = "Authentification échouée"
+            elif isinstance(e, paramiko.SSHException):
+                status = f"Erreur SSH : {str(e)}"
+            else:
+                status = f"Connexion échouée : {str(e)}"
+        finally:
+            self.cancel()
+            if transport is not None:
+                ConnectionManager.shared().release(self.key, transport)
+        self.worker.host_done.emit(self.row, code, status, time.perf_counter() - start)
+
+class OutputQueue:
+    # Tampon entre le réacteur et l'interface : les chunks s'accumulent ici
+    # et l'interface les consomme une fois par frame. Une file pleine
+    # suspend la lecture du canal jusqu'à redescendre sous la limite, puis
+    # appelle on_resume(début de la pause).
+    def __init__(self, limit=BACKLOG_LIMIT):
+        self.limit = limit
+        self.chunks = deque()
+        self.size = 0
+        self.closed = False
+        self.paused = None
+        self.on_resume = None
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return self.size
+
+    def put(self, text):
+        # Renvoie (file vide avant, il faut prévenir l'interface ; file pleine)
+        with self.lock:
+            first = not self.chunks
+            self.chunks.append(text)
+            self.size += len(text)
+            if self.size >= self.limit and self.paused is None:
+                self.paused = time.perf_counter()
+            return first, self.paused is not None
+
+    def drained(self):
+        # Appelé sous le verrou : début de la pause qui vient de finir, ou None
+        if self.paused is not None and self.size < self.limit:
+            paused, self.paused = self.paused, None
+            return paused
+        return None
+
+    def resume(self, paused):
+        if paused is not None and self.on_resume is not None:
+            self.on_resume(paused)
+
+    def take(self, max_size=None):
+        with self.lock:
+            if max_size is None or self.size <= max_size:
+                data = ''.join(self.chunks)
+                self.chunks.clear()
+                self.size = 0
+            else:
+                parts = []
+                n = 0
+                while n < max_size:
+                    chunk = self.chunks.popleft()
+                    if n + len(chunk) > max_size:
+                        cut = max_size - n
+                        self.chunks.appendleft(chunk[cut:])
+                        chunk = chunk[:cut]
+                    parts.append(chunk)
+                    n += len(chunk)
+                self.size -= n
+                data = ''.join(parts)
+            paused = self.drained()
+        self.resume(paused)
+        return data
+
+    def set_limit(self, limit):
+        with self.lock:
+            self.limit = limit
+            paused = self.drained()
+        self.resume(paused)
+
+    def close(self):
+        self.closed = True
+
+class PerfStats:
+    # Compteurs d'un onglet, alimentés par le réacteur et le thread Qt :
+    # additions simples et deque borné, sans verrou.
+    THREADS = {'ui': (1, "Interface"), 'receive': (2, "Lecture SSH"), 'net': (3, "Réseau")}
+
+    def __init__(self, limit=TRACE_EVENTS):
+        self.t0 = time.perf_counter()
+        self.trace = deque(maxlen=limit)  # (phase, nom, début, durée, fil, args)
+        self.bytes_in = self.bytes_out = 0
+        self.rate_in = self.rate_out = 0.0
+        self.render_times = deque(maxlen=120)
+        self.echo_sent = None  # touche envoyée, en attente de la prochaine réception
+        self.echo_rtt = None
+        self.last_sample = (self.t0, 0, 0)
+
+    def key_sent(self):
+        if self.echo_sent is None:
+            self.echo_sent = time.perf_counter()
+
+    def record_send(self, size):
+        self.bytes_out += size
+        self.trace.append(('i', "envoi", time.perf_counter(), 0, 'ui', {'octets': size}))
+
+    def record_read(self, start, size):
+        end = time.perf_counter()
+        self.bytes_in += size
+        sent, self.echo_sent = self.echo_sent, None
+        if sent is not None:
+            self.echo_rtt = end - sent
+            self.trace.append(('X', "écho", sent, end - sent, 'net', None))
+        self.trace.append(('X', "lecture", start, end - start, 'receive', {'octets': size}))
+
+    def record_wait(self, start):
+        # Lecture du canal suspendue par la contre-pression (arriéré plein)
+        end = time.perf_counter()
+        if end - start > 0.001:
+            self.trace.append(('X', "arriéré plein", start, end - start, 'receive', None))
+
+    def record_frame(self, start, fed, backlog):
+        end = time.perf_counter()
+        self.render_times.append(end - start)
+        self.trace.append(('X', "rendu", start, end - start, 'ui', {'caractères': fed, 'arriéré': backlog}))
+
+    def sample(self, backlog, blocks, cold):
+        now = time.perf_counter()
+        then, bytes_in, bytes_out = self.last_sample
+        elapsed = max(now - then, 1e-6)
+        self.rate_in = (self.bytes_in - bytes_in) / elapsed
+        self.rate_out = (self.bytes_out - bytes_out) / elapsed
+        self.last_sample = (now, self.bytes_in, self.bytes_out)
+        self.trace.append(('C', "débit (o/s)", now, 0, 'ui', {'reçu': round(self.rate_in), 'envoyé': round(self.rate_out)}))
+        self.trace.append(('C', "arriéré (caractères)", now, 0, 'ui', {'arriéré': backlog}))
+        self.trace.append(('C', "document (lignes)", now, 0, 'ui', {'blocs': blocks, 'compressées': cold}))
+
+    def summary(self, backlog, blocks, cold):
+        def rate(value):
+            if value >= 1e6:
+                return f"{value / 1e6:.1f} Mo/s"
+            if value >= 1e3:
+                return f"{value / 1e3:.1f} Ko/s"
+            return f"{value:.0f} o/s"
+        times = self.render_times
+        render = f"{times[-1] * 1000:.1f} ms (max {max(times) * 1000:.1f})" if times else "-"
+        echo = f"{self.echo_rtt * 1000:.0f} ms" if self.echo_rtt is not None else "-"
+        return (f"↓ {rate(self.rate_in)}   ↑ {rate(self.rate_out)}   arriéré {backlog} car.   "
+                f"rendu {render}   document {blocks} lignes (+{cold} compressées)   écho {echo}")
+
+    def chrome_trace(self, process_name):
+        # Format JSON de chrome://tracing et Perfetto (temps en µs)
+        events = [{'name': 'process_name', 'ph': 'M', 'pid': 1, 'tid': 0, 'args': {'name': process_name}}]
+        for tid, name in self.THREADS.values():
+            events.append({'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': tid, 'args': {'name': name}})
+        for phase, name, start, duration, thread, args in list(self.trace):
+            event = {'name': name, 'ph': phase, 'pid': 1, 'tid': self.THREADS[thread][0],
+                     'ts': round((start - self.t0) * 1e6, 1)}
+            if phase == 'X':
+                event['dur'] = round(duration * 1e6, 1)
+            elif phase == 'i':
+                event['s'] = 't'
+            if args:
+                event['args'] = args
+            events.append(event)
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+class ServerListModel(QAbstractListModel):
+    # Première ligne fixe "+ Nouveau serveur", puis les serveurs (MRU, ou par
+    # pertinence pendant une recherche). Taper un caractère de plus ne filtre
+    # que les correspondances précédentes.
+    def __init__(self, entries, parent=None):
+        super().__init__(parent)
+        self.entries = entries
+        self.keys = [self.search_key(e) for e in entries]
+        self.pattern = ''
+        self.matches = list(range(len(entries)))
+
+    def search_key(self, entry):
+        server_id, user, host, port, tags, has_password = entry
+        return f"{user}@{host}:{port} " + ' '.join('#' + t for t in tags.split(',') if t).lower()
+
+    def label(self, entry):
+        server_id, user, host, port, tags, has_password = entry
+        label = f"{user}@{host}:{port}"
+        return f"{label}  [{tags.replace(',', ', ')}]" if tags else label
+
+    def set_filter(self, text):
+        pattern = text.strip().lower()
+        if pattern == self.pattern:
+            return
+        candidates = self.matches if self.pattern and pattern.startswith(self.pattern) else range(len(self.entries))
+        if pattern:
+            scored = []
+            for i in candidates:
+                score = fuzzy_score(pattern, self.keys[i])
+                if score is not None:
+                    scored.append((-score, len(self.keys[i]), i))
+            scored.sort()
+            matches = [i for _, _, i in scored]
+        else:
+            matches = list(range(len(self.entries)))
+        self.beginResetModel()
+        self.pattern = pattern
+        self.matches = matches
+        self.endResetModel()
+
+    def server_id(self, row):
+        return self.entries[self.matches[row - 1]][0] if 0 < row <= len(self.matches) else None
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.matches) + 1
+
+    def data(self, index, role=Qt.DisplayRole):
+        row = index.row()
+        if not index.isValid() or row > len(self.matches):
+            return None
+        if row == 0:
+            return "+ Nouveau serveur" if role == Qt.DisplayRole else None
+        entry = self.entries[self.matches[row - 1]]
+        if role == Qt.DisplayRole:
+            return self.label(entry)
+        if role == Qt.ToolTipRole and entry[4]:
+            return "Tags : " + entry[4].replace(',', ', ')
+        return None
+
+class InputWriter:
+    # File d'envoi d'un onglet, vidée par le réacteur au rythme de la fenêtre
+    # SSH : l'interface ne fait que la remplir. Les frappes en attente
+    # partent en un seul paquet, les collages par tranches de PASTE_CHUNK,
+    # dans l'ordre de saisie.
+    def __init__(self, shell, worker):
+        self.shell = shell
+        self.worker = worker
+        self.items = deque()  # [données, suffixe du collage ou None pour des frappes]
+        self.sent = 0  # octets déjà pris du collage en tête
+        self.paste_cancelled = False
+        self.closed = False
+        self.lock = threading.Lock()
+
+    def write(self, data):
+        with self.lock:
+            if self.items and self.items[-1][1] is None:
+                self.items[-1][0] += data
+            else:
+                self.items.append([bytearray(data), None])
+        ChannelReactor.shared().want_write(self.shell)
+
+    def paste(self, data, suffix=b''):
+        with self.lock:
+            self.items.append([data, suffix])
+        ChannelReactor.shared().want_write(self.shell)
+
+    def cancel_paste(self):
+        # Les collages pas encore commencés sont abandonnés tout de suite,
+        # celui en cours l'est à la prochaine tranche
+        with self.lock:
+            head = self.items[0] if self.items else None
+            self.items = deque(item for item in self.items if item[1] is None or item is head)
+            if head is not None and head[1] is not None:
+                self.paste_cancelled = True
+        ChannelReactor.shared().want_write(self.shell)
+
+    def close(self):
+        self.closed = True
+
+    def next_chunk(self):
+        # Appelé par le réacteur : (tranche, (envoyé, total) d'un collage ou
+        # None), ou None s'il n'y a rien à envoyer
+        with self.lock:
+            if self.closed or not self.items:
+                return None
+            data, suffix = self.items[0]
+            if suffix is None:
+                self.items.popleft()
+                return bytes(data), None
+            total = len(data)
+            if self.paste_cancelled:
+                # Un collage entamé est refermé (bracketed paste)
+                self.items.popleft()
+                self.paste_cancelled = False
+                chunk = data[max(self.sent, total - len(suffix)):] if self.sent else b''
+                self.sent = 0
+                return chunk, (total, total)
+            chunk = data[self.sent:self.sent + PASTE_CHUNK]
+            self.sent += len(chunk)
+            progress = (self.sent, total)
+            if self.sent >= total:
+                self.items.popleft()
+                self.sent = 0
+            return chunk, progress
+
+    def chunk_sent(self, progress):
+        if progress is not None:
+            self.worker.paste_progress.emit(*progress)
+
+    def send_failed(self, error):
+        if not self.closed:
+            self.closed = True
+            self.worker.output_ready.emit(f"\r\n[!] Erreur envoi : {str(error)}\r\n")
 
 class ConnectionDialog(QDialog):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("SSGui")
-        self.setFixedSize(600, 500)
+        self.setFixedSize(640, 580)
         self.setStyleSheet("""
             QDialog {
                 background: #101014;
@@ -70,6 +639,14 @@ class ConnectionDialog(QDialog):
                 border: 1.5px solid #4e8cff;
                 background: #23272e;
             }
+            QComboBox {
+                background: #181a20;
+                color: #e0e0e0;
+                border: 1px solid #444;
+                border-radius: 6px;
+                padding: 6px 8px;
+                font-size: 15px;
+            }
             QLabel {
                 color: #b0b8c0;
                 font-weight: bold;
@@ -90,37 +667,19 @@ class ConnectionDialog(QDialog):
                 background: #1a1d23;
             }
         """)
-        self.servers_file = "servers.json"
         self.fernet_key_file = ".fernet.key"
-        self.fernet = self.load_fernet()
-        self.servers = self.load_servers()
+        self.fernet = None  # clé chargée à la première sélection d'un serveur
+        self.store = ServerStore.shared()
         self.init_ui()
 
-    def load_servers(self):
-        if os.path.exists(self.servers_file):
-            try:
-                with open(self.servers_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except Exception:
-                return []
-        return []
-
-    def save_servers(self):
-        try:
-            with open(self.servers_file, 'w', encoding='utf-8') as f:
-                json.dump(self.servers, f, indent=2, ensure_ascii=False)
-        except Exception:
-            pass
+    def showEvent(self, event):
+        super().showEvent(event)
+        report_startup("Fenêtre de connexion")
 
     def load_fernet(self):
-        if not os.path.exists(self.fernet_key_file):
-            key = Fernet.generate_key()
-            with open(self.fernet_key_file, 'wb') as f:
-                f.write(key)
-        else:
-            with open(self.fernet_key_file, 'rb') as f:
-                key = f.read()
-        return Fernet(key)
+        if self.fernet is None:
+            self.fernet = load_fernet_key(self.fernet_key_file)
+        return self.fernet
 
     def init_ui(self):
         global_layout = QVBoxLayout()
@@ -152,100 +711,2491 @@ class ConnectionDialog(QDialog):
         mode_layout.addStretch(1)
         global_layout.addLayout(mode_layout)
 
-        main_layout = QHBoxLayout()
+        main_layout = QHBoxLayout()
+
+        # Recherche et liste verticale des serveurs à gauche
+        list_layout = QVBoxLayout()
+        self.search_input = QLineEdit()
+        self.search_input.setFixedWidth(230)
+        self.search_input.setPlaceholderText("Rechercher...")
+        self.search_input.setClearButtonEnabled(True)
+        self.search_input.textChanged.connect(self.filter_servers)
+        self.search_input.returnPressed.connect(self.select_first_match)
+        list_layout.addWidget(self.search_input)
+        self.server_model = ServerListModel(self.store.entries(), self)
+        self.server_list = QListView()
+        self.server_list.setFixedWidth(230)
+        self.server_list.setUniformItemSizes(True)
+        self.server_list.setModel(self.server_model)
+        self.server_list.selectionModel().currentRowChanged.connect(
+            lambda current, previous: self.on_server_selected(current.row()))
+        self.server_list.setStyleSheet("""
+            QListView {
+                background: #23272e;
+                color: #e0e0e0;
+                border: 1px solid #444;
+                border-radius: 8px;
+                font-size: 15px;
+            }
+            QListView::item:selected {
+                background: #3a4250;
+                color: #8ab4f8;
+            }
+        """)
+        list_layout.addWidget(self.server_list)
+        main_layout.addLayout(list_layout)
+
+        # Formulaire à droite
+        form_widget = QWidget()
+        form_layout = QFormLayout()
+        form_layout.setLabelAlignment(Qt.AlignRight)
+
+        self.host_input = QLineEdit()
+        self.user_input = QLineEdit()
+        self.pass_input = QLineEdit()
+        self.pass_input.setEchoMode(QLineEdit.Password)
+        self.port_input = QLineEdit()
+        self.port_input.setPlaceholderText("22")
+        self.remember_pass = QPushButton("Retenir le mot de passe")
+        self.remember_pass.setCheckable(True)
+        self.remember_pass.setStyleSheet("QPushButton:checked { background: #4e8cff; color: #fff; }")
+        self.tags_input = QLineEdit()
+        self.tags_input.setPlaceholderText("prod, web")
+        profile_layout = QHBoxLayout()
+        self.profile_input = QComboBox()
+        for name, label in PROFILE_LABELS.items():
+            self.profile_input.addItem(label, name)
+        self.profile_input.setToolTip("Compression, algorithmes et tailles de fenêtre SSH pour ce serveur")
+        self.probe_btn = QPushButton("Mesurer")
+        self.probe_btn.setToolTip("Mesure le débit de chaque profil et recommande le meilleur")
+        self.probe_btn.clicked.connect(self.open_probe)
+        profile_layout.addWidget(self.profile_input, 1)
+        profile_layout.addWidget(self.probe_btn)
+
+        form_layout.addRow("Hôte :", self.host_input)
+        form_layout.addRow("Utilisateur :", self.user_input)
+        form_layout.addRow("Mot de passe :", self.pass_input)
+        form_layout.addRow("Port :", self.port_input)
+        form_layout.addRow("Tags :", self.tags_input)
+        form_layout.addRow("Réseau :", profile_layout)
+        form_layout.addRow(self.remember_pass)
+
+        btn_layout = QHBoxLayout()
+        self.connect_btn = QPushButton("Connexion")
+        self.cancel_btn = QPushButton("Annuler")
+        self.connect_btn.clicked.connect(self.accept)
+        self.cancel_btn.clicked.connect(self.reject)
+        btn_layout.addWidget(self.connect_btn)
+        btn_layout.addWidget(self.cancel_btn)
+        form_layout.addRow(btn_layout)
+
+        form_widget.setLayout(form_layout)
+        main_layout.addWidget(form_widget)
+
+        global_layout.addLayout(main_layout)
+        self.setLayout(global_layout)
+        self.server_list.setCurrentIndex(self.server_model.index(0))
+
+    def filter_servers(self, text):
+        self.server_model.set_filter(text)
+        self.server_list.setCurrentIndex(self.server_model.index(0))
+
+    def select_first_match(self):
+        if self.server_model.rowCount() > 1:
+            self.server_list.setCurrentIndex(self.server_model.index(1))
+            self.pass_input.setFocus()
+
+    def on_server_selected(self, idx):
+        server_id = self.server_model.server_id(idx)
+        if server_id is not None:
+            self.fill_server(self.store.get_by_id(server_id))
+        else:
+            self.host_input.clear()
+            self.user_input.clear()
+            self.port_input.clear()
+            self.pass_input.clear()
+            self.tags_input.clear()
+            self.set_profile(None)
+            self.remember_pass.setChecked(False)
+
+    def fill_server(self, s):
+        self.host_input.setText(s['host'])
+        self.user_input.setText(s['user'])
+        self.port_input.setText(str(s['port']))
+        self.tags_input.setText(s.get('tags', '').replace(',', ', '))
+        self.set_profile(s.get('profile'))
+        # Déchiffrer le mot de passe si présent
+        if 'password_fernet' in s:
+            try:
+                decrypted = self.load_fernet().decrypt(s['password_fernet'].encode()).decode()
+                self.pass_input.setText(decrypted)
+                self.remember_pass.setChecked(True)
+            except Exception:
+                self.pass_input.clear()
+                self.remember_pass.setChecked(False)
+        else:
+            self.pass_input.clear()
+            self.remember_pass.setChecked(False)
+
+    def set_profile(self, value):
+        # Un profil JSON propre au serveur apparaît comme "Personnalisé"
+        while self.profile_input.count() > len(PROFILE_LABELS):
+            self.profile_input.removeItem(self.profile_input.count() - 1)
+        value = value or 'standard'
+        if value not in PROFILE_LABELS:
+            self.profile_input.addItem("Personnalisé", value)
+        self.profile_input.setCurrentIndex(self.profile_input.findData(value))
+
+    def open_probe(self):
+        host = self.host_input.text().strip()
+        user = self.user_input.text().strip()
+        passwd = self.pass_input.text()
+        try:
+            port = int(self.port_input.text().strip() or 22)
+        except ValueError:
+            QMessageBox.warning(self, "SSGui", "Le port doit être un nombre.")
+            return
+        if not host or not user or not passwd:
+            QMessageBox.warning(self, "SSGui", "Hôte, utilisateur et mot de passe sont nécessaires pour mesurer.")
+            return
+        dialog = ProbeDialog(host, port, user, passwd, self)
+        if dialog.exec_() == QDialog.Accepted and dialog.recommended:
+            self.set_profile(dialog.recommended)
+
+    def set_mode(self, mode):
+        self.mode = mode
+        for m, btn in self.mode_btns.items():
+            btn.setChecked(m == mode)
+
+class ProbeWorker(QObject):
+    result = pyqtSignal(str, object)  # profil, (connexion, débit, algorithmes) ou exception
+    done = pyqtSignal(object)
+
+class ProbeDialog(QDialog):
+    # Mesure le débit de chaque profil de transport sur une connexion
+    # dédiée, hors du thread Qt, et propose le meilleur
+    def __init__(self, host, port, user, passwd, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(f"SSGui - Profils réseau de {user}@{host}:{port}")
+        self.resize(720, 260)
+        self.setStyleSheet("""
+            QDialog {
+                background: #101014;
+                color: #e0e0e0;
+                font-size: 15px;
+            }
+            QLabel {
+                color: #b0b8c0;
+                font-weight: bold;
+            }
+            QPushButton {
+                background: #2d333b;
+                color: #e0e0e0;
+                border: 1px solid #444;
+                border-radius: 6px;
+                padding: 7px 18px;
+                font-size: 15px;
+            }
+            QPushButton:hover {
+                background: #3a4250;
+                border: 1.5px solid #4e8cff;
+            }
+            QPushButton:disabled {
+                color: #666;
+            }
+            QTableWidget {
+                background: #23272e;
+                color: #e0e0e0;
+                border: 1px solid #444;
+                border-radius: 8px;
+                font-size: 14px;
+                gridline-color: #333;
+            }
+            QHeaderView::section {
+                background: #181a20;
+                color: #b0b8c0;
+                border: none;
+                padding: 4px;
+            }
+        """)
+        self.recommended = None
+        self.names = list(PROFILE_LABELS)
+        layout = QVBoxLayout()
+        self.table = QTableWidget(len(self.names), 4)
+        self.table.setHorizontalHeaderLabels(["Profil", "Connexion", "Débit", "Algorithmes"])
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.horizontalHeader().setSectionResizeMode(3, QHeaderView.Stretch)
+        for row, name in enumerate(self.names):
+            self.table.setItem(row, 0, QTableWidgetItem(PROFILE_LABELS[name]))
+            for col in (1, 2, 3):
+                self.table.setItem(row, col, QTableWidgetItem(""))
+        self.table.item(0, 2).setText("Mesure...")
+        self.table.resizeColumnToContents(0)
+        layout.addWidget(self.table)
+        self.status_label = QLabel("Mesure en cours, un profil après l'autre...")
+        layout.addWidget(self.status_label)
+        btn_layout = QHBoxLayout()
+        btn_layout.addStretch(1)
+        self.use_btn = QPushButton("Utiliser la recommandation")
+        self.use_btn.setEnabled(False)
+        self.use_btn.clicked.connect(self.accept)
+        close_btn = QPushButton("Fermer")
+        close_btn.clicked.connect(self.reject)
+        btn_layout.addWidget(self.use_btn)
+        btn_layout.addWidget(close_btn)
+        layout.addLayout(btn_layout)
+        self.setLayout(layout)
+        self.worker = ProbeWorker()
+        self.worker.result.connect(self.on_result)
+        self.worker.done.connect(self.on_done)
+        threading.Thread(target=self.run, args=(host, port, user, passwd), daemon=True).start()
+
+    def run(self, host, port, user, passwd):
+        results = probe_profiles(host, port, user, passwd, self.names, self.worker.result.emit)
+        self.worker.done.emit(results)
+
+    def on_result(self, name, result):
+        row = self.names.index(name)
+        if isinstance(result, Exception):
+            self.table.item(row, 2).setText(f"Échec : {str(result) or result.__class__.__name__}")
+        else:
+            connect, rate, algorithms = result
+            self.table.item(row, 1).setText(f"{connect * 1000:.0f} ms")
+            self.table.item(row, 2).setText(f"{format_size(rate)}/s")
+            self.table.item(row, 3).setText(algorithms)
+        if row + 1 < len(self.names):
+            self.table.item(row + 1, 2).setText("Mesure...")
+
+    def on_done(self, results):
+        self.recommended = recommend_profile(results)
+        if self.recommended is None:
+            self.status_label.setText("Aucune mesure n'a abouti.")
+            return
+        row = self.names.index(self.recommended)
+        for col in range(4):
+            self.table.item(row, col).setForeground(QColor('#8ab4f8'))
+        self.status_label.setText(f"Recommandé : {PROFILE_LABELS[self.recommended]}")
+        self.use_btn.setEnabled(True)
+
+# Une cellule = un point de code dans un array par ligne + un identifiant
+# d'attributs dans un second array : pas d'objet Python par caractère.
+# 'u' n'est utilisable que si wchar_t fait 32 bits ; sous Windows avant
+# Python 3.13, un caractère hors BMP y prendrait deux éléments, d'où un
+# array 'I' de ord(). cells() et cells_text() convertissent dans les deux sens.
+if sys.version_info >= (3, 13):
+    CELL_TYPECODE = 'w'
+elif array('u').itemsize == 4:
+    CELL_TYPECODE = 'u'
+else:
+    CELL_TYPECODE = 'I'
+
+if CELL_TYPECODE == 'I':
+    def cells(text):
+        return array('I', map(ord, text))
+
+    def cells_text(chars):
+        return ''.join(map(chr, chars))
+
+    def cell_char(value):
+        return chr(value)
+else:
+    def cells(text):
+        return array(CELL_TYPECODE, text)
+
+    def cells_text(chars):
+        return chars.tounicode()
+
+    def cell_char(value):
+        return value
+
+# Un caractère large (CJK, emoji) occupe deux cellules : le caractère puis
+# WIDE_TAIL, jamais écrit par le flux (NUL est un caractère de contrôle) et
+# retiré du texte affiché. Les caractères combinants (largeur nulle) ne sont
+# pas gérés : ils prennent une cellule.
+WIDE_TAIL = '\x00'
+WIDE_CELL, BLANK_CELL = cells(WIDE_TAIL + ' ')
+WIDE_RE = re.compile('[\u1100-\u115f\u231a\u231b\u2329\u232a\u2e80-\u303e\u3041-\u33ff'
+                     '\u3400-\u4dbf\u4e00-\u9fff\ua000-\ua4cf\ua960-\ua97f\uac00-\ud7a3'
+                     '\uf900-\ufaff\ufe10-\ufe19\ufe30-\ufe6f\uff00-\uff60\uffe0-\uffe6'
+                     '\U0001f300-\U0001f64f\U0001f900-\U0001f9ff\U00020000-\U0002fffd'
+                     '\U00030000-\U0003fffd]')
+
+DEC_GRAPHICS = str.maketrans({
+    '`': '◆', 'a': '▒', 'b': '␉', 'c': '␌', 'd': '␍', 'e': '␊', 'f': '°', 'g': '±',
+    'h': '␤', 'i': '␋', 'j': '┘', 'k': '┐', 'l': '┌', 'm': '└', 'n': '┼', 'o': '⎺',
+    'p': '⎻', 'q': '─', 'r': '⎼', 's': '⎽', 't': '├', 'u': '┤', 'v': '┴', 'w': '┬',
+    'x': '│', 'y': '≤', 'z': '≥', '{': 'π', '|': '≠', '}': '£', '~': '·',
+})
+
+# Bits de style SGR
+BOLD, DIM, ITALIC, UNDERLINE, BLINK, REVERSE, HIDDEN, STRIKE = (1 << i for i in range(8))
+SGR_FLAGS = {1: BOLD, 2: DIM, 3: ITALIC, 4: UNDERLINE, 5: BLINK, 7: REVERSE, 8: HIDDEN, 9: STRIKE}
+SGR_RESET_FLAGS = {21: BOLD, 22: BOLD | DIM, 23: ITALIC, 24: UNDERLINE, 25: BLINK, 27: REVERSE, 28: HIDDEN, 29: STRIKE}
+TRUECOLOR = 1 << 24
+
+def blank_row(cols, attr=0):
+    return cells(' ' * cols), array('I', [attr]) * cols
+
+class ScreenBuffer:
+    __slots__ = ('chars', 'attrs')
+
+    def __init__(self, cols, rows):
+        self.chars = []
+        self.attrs = []
+        for _ in range(rows):
+            chars, attrs = blank_row(cols)
+            self.chars.append(chars)
+            self.attrs.append(attrs)
+
+class TerminalScreen:
+    # Émulation VT100/xterm sans Qt : grille principale + alternative,
+    # suivi des lignes modifiées (dirty) et des lignes sorties par le haut.
+    TEXT_RE = re.compile(r'[^\x00-\x1f\x7f]+')
+    ESC_RE = re.compile(
+        r'\x1b(?:\[([<=>?]?)([0-9;:]*)([ -/]*)([@-~])'
+        r'|\](.*?)(?:\x07|\x1b\\)'
+        r'|([P_^X]).*?(?:\x07|\x1b\\)'
+        r'|([ -/]*)([0-OQ-WYZ\\`-~]))', re.S)
+    PARTIAL_RE = re.compile(r'\x1b(?:\[[<=>?]?[0-9;:]*[ -/]*|\].*|[P_^X].*|[ -/]*)', re.S)
+    MAX_PENDING = 65536
+
+    def __init__(self, cols=80, rows=24):
+        self.cols = cols
+        self.rows = rows
+        self.attr_table = [(-1, -1, 0)]
+        self.attr_ids = {(-1, -1, 0): 0}
+        self.pending = ''
+        self.replies = []
+        self.scrolled = []
+        self.title = ''
+        self.csi_handlers = {
+            '@': self.csi_insert_chars, 'A': self.csi_cursor_up, 'B': self.csi_cursor_down,
+            'C': self.csi_cursor_forward, 'D': self.csi_cursor_back, 'E': self.csi_next_line,
+            'F': self.csi_prev_line, 'G': self.csi_column, '`': self.csi_column,
+            'H': self.csi_position, 'f': self.csi_position, 'I': self.csi_tab,
+            'J': self.csi_erase_display, 'K': self.csi_erase_line, 'L': self.csi_insert_lines,
+            'M': self.csi_delete_lines, 'P': self.csi_delete_chars, 'S': self.csi_scroll_up,
+            'T': self.csi_scroll_down, 'X': self.csi_erase_chars, 'Z': self.csi_back_tab,
+            'a': self.csi_cursor_forward, 'b': self.csi_repeat, 'c': self.csi_device_attributes,
+            'd': self.csi_row, 'e': self.csi_cursor_down, 'g': self.csi_clear_tab,
+            'h': self.csi_set_mode, 'l': self.csi_reset_mode,
+            'n': self.csi_device_status, 'r': self.csi_scroll_region,
+            's': self.csi_save_cursor, 'u': self.csi_restore_cursor,
+        }
+        self.reset()
+
+    def reset(self):
+        self.primary = ScreenBuffer(self.cols, self.rows)
+        self.alternate = ScreenBuffer(self.cols, self.rows)
+        self.buffer = self.primary
+        self.x = 0
+        self.y = 0
+        self.wrap_pending = False
+        self.fg = -1
+        self.bg = -1
+        self.flags = 0
+        self.attr = 0
+        self.top = 0
+        self.bottom = self.rows - 1
+        self.autowrap = True
+        self.origin_mode = False
+        self.insert_mode = False
+        self.newline_mode = False
+        self.app_cursor = False
+        self.app_keypad = False
+        self.cursor_visible = True
+        self.bracketed_paste = False
+        self.charsets = [None, None]
+        self.shift_out = False
+        self.saved = None
+        self.tabstops = set(range(8, self.cols, 8))
+        self.dirty = set(range(self.rows))
+
+    @property
+    def on_alternate(self):
+        return self.buffer is self.alternate
+
+    def take_dirty(self):
+        dirty, self.dirty = self.dirty, set()
+        return dirty
+
+    def take_scrolled(self):
+        scrolled, self.scrolled = self.scrolled, []
+        return scrolled
+
+    def take_replies(self):
+        replies, self.replies = self.replies, []
+        return ''.join(replies)
+
+    def line_text(self, row):
+        return cells_text(self.buffer.chars[row]).replace(WIDE_TAIL, '')
+
+    # --- Analyse du flux ---
+
+    def feed(self, data):
+        if self.pending:
+            data = self.pending + data
+            self.pending = ''
+        pos = 0
+        end = len(data)
+        while pos < end:
+            ch = data[pos]
+            if ch == '\x1b':
+                m = self.ESC_RE.match(data, pos)
+                if m is None:
+                    if self.PARTIAL_RE.fullmatch(data, pos) and end - pos < self.MAX_PENDING:
+                        self.pending = data[pos:]
+                        break
+                    pos += 1
+                    continue
+                if m.group(4) is not None:
+                    self.dispatch_csi(m.group(1), m.group(2), m.group(3), m.group(4))
+                elif m.group(5) is not None:
+                    self.dispatch_osc(m.group(5))
+                elif m.group(6) is None:
+                    self.dispatch_esc(m.group(7), m.group(8))
+                pos = m.end()
+            elif ch < ' ' or ch == '\x7f':
+                self.control(ch)
+                pos += 1
+            else:
+                m = self.TEXT_RE.match(data, pos)
+                self.write_text(m.group())
+                pos = m.end()
+
+    def control(self, ch):
+        if ch == '\r':
+            self.x = 0
+            self.wrap_pending = False
+        elif ch in '\n\x0b\x0c':
+            if self.newline_mode:
+                self.x = 0
+            self.index()
+        elif ch == '\b':
+            if self.x > 0:
+                self.x -= 1
+            self.wrap_pending = False
+        elif ch == '\t':
+            self.csi_tab([1])
+        elif ch == '\x0e':
+            self.shift_out = True
+        elif ch == '\x0f':
+            self.shift_out = False
+
+    def dispatch_esc(self, inter, final):
+        if inter in ('(', ')'):
+            self.charsets['()'.index(inter)] = 'graphics' if final == '0' else None
+        elif inter:
+            pass
+        elif final == '7':
+            self.save_cursor()
+        elif final == '8':
+            self.restore_cursor()
+        elif final == 'D':
+            self.index()
+        elif final == 'E':
+            self.x = 0
+            self.index()
+        elif final == 'M':
+            self.reverse_index()
+        elif final == 'H':
+            self.tabstops.add(self.x)
+        elif final == 'c':
+            self.reset()
+        elif final == '=':
+            self.app_keypad = True
+        elif final == '>':
+            self.app_keypad = False
+
+    def dispatch_osc(self, text):
+        code, _, value = text.partition(';')
+        if code in ('0', '2'):
+            self.title = value
+
+    def dispatch_csi(self, private, params, inter, final):
+        if inter:
+            if inter == '!' and final == 'p':
+                self.soft_reset()
+            return
+        if final == 'm' and private == '':
+            self.csi_sgr(params)
+            return
+        args = [int(p) if p.isdigit() else 0 for p in params.replace(':', ';').split(';')] if params else []
+        if private == '?':
+            if final in 'hl':
+                self.set_private_modes(args, final == 'h')
+            return
+        if private == '>':
+            if final == 'c':
+                self.replies.append('\x1b[>0;10;0c')
+            return
+        handler = self.csi_handlers.get(final)
+        if handler is not None and not private:
+            handler(args)
+
+    # --- Écriture ---
+
+    def write_text(self, text):
+        charset = self.charsets[1 if self.shift_out else 0]
+        if charset == 'graphics':
+            text = text.translate(DEC_GRAPHICS)
+        if not text.isascii() and WIDE_RE.search(text):
+            text = WIDE_RE.sub('\\g<0>' + WIDE_TAIL, text)
+        cols = self.cols
+        while text:
+            if self.wrap_pending:
+                self.wrap_pending = False
+                if self.autowrap:
+                    self.x = 0
+                    self.index()
+            x = self.x
+            n = min(len(text), cols - x)
+            if n < len(text) and text[n] == WIDE_TAIL and cols > 1:
+                # Un caractère large ne se coupe pas : la dernière colonne
+                # reste vide et il passe à la ligne suivante
+                chunk, text = text[:n - 1] + ' ', text[n - 1:]
+            else:
+                chunk, text = text[:n], text[n:]
+            row_chars = self.buffer.chars[self.y]
+            row_attrs = self.buffer.attrs[self.y]
+            if self.insert_mode:
+                self.split_wide(row_chars, x, x)
+                row_chars[x:x] = cells(' ' * n)
+                row_attrs[x:x] = array('I', [0]) * n
+                self.split_wide(row_chars, cols, cols)
+                del row_chars[cols:]
+                del row_attrs[cols:]
+            self.split_wide(row_chars, x, x + n)
+            row_chars[x:x + n] = cells(chunk)
+            row_attrs[x:x + n] = array('I', [self.attr]) * n
+            self.dirty.add(self.y)
+            if x + n >= cols:
+                self.x = cols - 1
+                self.wrap_pending = True
+                if not self.autowrap and text:
+                    # Le dernier caractère remplace la dernière colonne ; un
+                    # caractère large n'y tient pas
+                    last = text.rstrip(WIDE_TAIL)[-1:]
+                    self.split_wide(row_chars, cols - 1, cols)
+                    row_chars[cols - 1] = BLANK_CELL if not last or WIDE_RE.match(last) else cells(last)[0]
+                    text = ''
+            else:
+                self.x = x + n
+
+    def split_wide(self, chars, start, end):
+        # Un caractère large coupé par un bord de la plage [start, end)
+        # disparaît entièrement
+        for edge in (start, end):
+            if 0 < edge < len(chars) and chars[edge] == WIDE_CELL:
+                chars[edge - 1] = chars[edge] = BLANK_CELL
+
+    def erase_attr(self):
+        if self.bg == -1:
+            return 0
+        return self.attr_id((-1, self.bg, 0))
+
+    def erase(self, row, start, end):
+        n = end - start
+        if n <= 0:
+            return
+        self.split_wide(self.buffer.chars[row], start, end)
+        self.buffer.chars[row][start:end] = cells(' ' * n)
+        self.buffer.attrs[row][start:end] = array('I', [self.erase_attr()]) * n
+        self.dirty.add(row)
+
+    def blank_row(self):
+        return blank_row(self.cols, self.erase_attr())
+
+    # --- Défilement ---
+
+    def index(self):
+        if self.y == self.bottom:
+            self.scroll_up(1)
+        elif self.y < self.rows - 1:
+            self.y += 1
+
+    def reverse_index(self):
+        if self.y == self.top:
+            self.scroll_down(1)
+        elif self.y > 0:
+            self.y -= 1
+
+    def scroll_up(self, n):
+        top, bottom = self.top, self.bottom
+        n = min(n, bottom - top + 1)
+        buf = self.buffer
+        if buf is self.primary and top == 0 and bottom == self.rows - 1:
+            # Les lignes qui sortent de l'écran partent dans l'historique ;
+            # les lignes restantes gardent leur rendu (décalage des indices).
+            for _ in range(n):
+                self.scrolled.append((buf.chars.pop(0), buf.attrs.pop(0)))
+                chars, attrs = self.blank_row()
+                buf.chars.append(chars)
+                buf.attrs.append(attrs)
+            if len(self.dirty) < self.rows:
+                self.dirty = {r - n for r in self.dirty if r >= n}
+                self.dirty.update(range(self.rows - n, self.rows))
+            return
+        del buf.chars[top:top + n]
+        del buf.attrs[top:top + n]
+        for _ in range(n):
+            chars, attrs = self.blank_row()
+            buf.chars.insert(bottom - n + 1, chars)
+            buf.attrs.insert(bottom - n + 1, attrs)
+        self.dirty.update(range(top, bottom + 1))
+
+    def scroll_down(self, n):
+        top, bottom = self.top, self.bottom
+        n = min(n, bottom - top + 1)
+        buf = self.buffer
+        del buf.chars[bottom - n + 1:bottom + 1]
+        del buf.attrs[bottom - n + 1:bottom + 1]
+        for _ in range(n):
+            chars, attrs = self.blank_row()
+            buf.chars.insert(top, chars)
+            buf.attrs.insert(top, attrs)
+        self.dirty.update(range(top, bottom + 1))
+
+    # --- Curseur ---
+
+    def move_to(self, x, y):
+        self.x = max(0, min(self.cols - 1, x))
+        if self.origin_mode:
+            self.y = max(self.top, min(self.bottom, y + self.top))
+        else:
+            self.y = max(0, min(self.rows - 1, y))
+        self.wrap_pending = False
+
+    def save_cursor(self):
+        self.saved = (self.x, self.y, self.fg, self.bg, self.flags, self.origin_mode,
+                      self.autowrap, list(self.charsets), self.shift_out)
+
+    def restore_cursor(self):
+        if self.saved is None:
+            self.move_to(0, 0)
+            return
+        (self.x, self.y, self.fg, self.bg, self.flags, self.origin_mode,
+         self.autowrap, charsets, self.shift_out) = self.saved
+        self.charsets = list(charsets)
+        self.x = min(self.x, self.cols - 1)
+        self.y = min(self.y, self.rows - 1)
+        self.wrap_pending = False
+        self.update_attr()
+
+    def soft_reset(self):
+        self.cursor_visible = True
+        self.origin_mode = False
+        self.autowrap = True
+        self.insert_mode = False
+        self.app_cursor = False
+        self.top = 0
+        self.bottom = self.rows - 1
+        self.fg, self.bg, self.flags = -1, -1, 0
+        self.update_attr()
+        self.saved = None
+
+    # --- Séquences CSI ---
+
+    @staticmethod
+    def arg(args, i=0, default=1):
+        if i < len(args) and args[i]:
+            return args[i]
+        return default
+
+    def csi_cursor_up(self, args):
+        top = self.top if self.y >= self.top else 0
+        self.y = max(top, self.y - self.arg(args))
+        self.wrap_pending = False
+
+    def csi_cursor_down(self, args):
+        bottom = self.bottom if self.y <= self.bottom else self.rows - 1
+        self.y = min(bottom, self.y + self.arg(args))
+        self.wrap_pending = False
+
+    def csi_cursor_forward(self, args):
+        self.x = min(self.cols - 1, self.x + self.arg(args))
+        self.wrap_pending = False
+
+    def csi_cursor_back(self, args):
+        self.x = max(0, self.x - self.arg(args))
+        self.wrap_pending = False
+
+    def csi_next_line(self, args):
+        self.csi_cursor_down(args)
+        self.x = 0
+
+    def csi_prev_line(self, args):
+        self.csi_cursor_up(args)
+        self.x = 0
+
+    def csi_column(self, args):
+        self.x = min(self.cols - 1, self.arg(args) - 1)
+        self.wrap_pending = False
+
+    def csi_row(self, args):
+        self.move_to(self.x, self.arg(args) - 1)
+
+    def csi_position(self, args):
+        self.move_to(self.arg(args, 1) - 1, self.arg(args, 0) - 1)
+
+    def csi_tab(self, args):
+        for _ in range(self.arg(args)):
+            stops = [t for t in self.tabstops if t > self.x]
+            self.x = min(stops) if stops else self.cols - 1
+        self.wrap_pending = False
+
+    def csi_back_tab(self, args):
+        for _ in range(self.arg(args)):
+            stops = [t for t in self.tabstops if t < self.x]
+            self.x = max(stops) if stops else 0
+        self.wrap_pending = False
+
+    def csi_clear_tab(self, args):
+        mode = self.arg(args, 0, 0)
+        if mode == 0:
+            self.tabstops.discard(self.x)
+        elif mode == 3:
+            self.tabstops.clear()
+
+    def csi_erase_display(self, args):
+        mode = self.arg(args, 0, 0)
+        if mode == 0:
+            self.erase(self.y, self.x, self.cols)
+            for row in range(self.y + 1, self.rows):
+                self.erase(row, 0, self.cols)
+        elif mode == 1:
+            for row in range(self.y):
+                self.erase(row, 0, self.cols)
+            self.erase(self.y, 0, self.x + 1)
+        elif mode == 2:
+            for row in range(self.rows):
+                self.erase(row, 0, self.cols)
+
+    def csi_erase_line(self, args):
+        mode = self.arg(args, 0, 0)
+        if mode == 0:
+            self.erase(self.y, self.x, self.cols)
+        elif mode == 1:
+            self.erase(self.y, 0, self.x + 1)
+        elif mode == 2:
+            self.erase(self.y, 0, self.cols)
+
+    def csi_erase_chars(self, args):
+        self.erase(self.y, self.x, min(self.cols, self.x + self.arg(args)))
+
+    def csi_insert_chars(self, args):
+        n = min(self.arg(args), self.cols - self.x)
+        chars = self.buffer.chars[self.y]
+        attrs = self.buffer.attrs[self.y]
+        self.split_wide(chars, self.x, self.x)
+        chars[self.x:self.x] = cells(' ' * n)
+        attrs[self.x:self.x] = array('I', [self.erase_attr()]) * n
+        self.split_wide(chars, self.cols, self.cols)
+        del chars[self.cols:]
+        del attrs[self.cols:]
+        self.dirty.add(self.y)
+
+    def csi_delete_chars(self, args):
+        n = min(self.arg(args), self.cols - self.x)
+        chars = self.buffer.chars[self.y]
+        attrs = self.buffer.attrs[self.y]
+        self.split_wide(chars, self.x, self.x + n)
+        del chars[self.x:self.x + n]
+        del attrs[self.x:self.x + n]
+        chars.extend(cells(' ' * n))
+        attrs.extend(array('I', [self.erase_attr()]) * n)
+        self.dirty.add(self.y)
+
+    def csi_insert_lines(self, args):
+        if self.top <= self.y <= self.bottom:
+            top = self.top
+            self.top = self.y
+            self.scroll_down(self.arg(args))
+            self.top = top
+            self.x = 0
+
+    def csi_delete_lines(self, args):
+        if self.top <= self.y <= self.bottom:
+            buf = self.buffer
+            n = min(self.arg(args), self.bottom - self.y + 1)
+            del buf.chars[self.y:self.y + n]
+            del buf.attrs[self.y:self.y + n]
+            for _ in range(n):
+                chars, attrs = self.blank_row()
+                buf.chars.insert(self.bottom - n + 1, chars)
+                buf.attrs.insert(self.bottom - n + 1, attrs)
+            self.dirty.update(range(self.y, self.bottom + 1))
+            self.x = 0
+
+    def csi_scroll_up(self, args):
+        self.scroll_up(self.arg(args))
+
+    def csi_scroll_down(self, args):
+        self.scroll_down(self.arg(args))
+
+    def csi_repeat(self, args):
+        if self.x > 0 or self.wrap_pending:
+            x = self.x if self.wrap_pending else self.x - 1
+            ch = cell_char(self.buffer.chars[self.y][x])
+            if ch == WIDE_TAIL:
+                ch = cell_char(self.buffer.chars[self.y][x - 1])
+            self.write_text(ch * self.arg(args))
+
+    def csi_device_attributes(self, args):
+        if self.arg(args, 0, 0) == 0:
+            self.replies.append('\x1b[?62;22c')
+
+    def csi_device_status(self, args):
+        mode = self.arg(args, 0, 0)
+        if mode == 5:
+            self.replies.append('\x1b[0n')
+        elif mode == 6:
+            y = self.y - self.top if self.origin_mode else self.y
+            self.replies.append(f'\x1b[{y + 1};{self.x + 1}R')
+
+    def csi_scroll_region(self, args):
+        top = self.arg(args, 0) - 1
+        bottom = self.arg(args, 1, self.rows) - 1
+        if 0 <= top < bottom < self.rows:
+            self.top, self.bottom = top, bottom
+            self.move_to(0, 0)
+
+    def csi_save_cursor(self, args):
+        self.save_cursor()
+
+    def csi_restore_cursor(self, args):
+        self.restore_cursor()
+
+    def csi_set_mode(self, args):
+        for mode in args:
+            if mode == 4:
+                self.insert_mode = True
+            elif mode == 20:
+                self.newline_mode = True
+
+    def csi_reset_mode(self, args):
+        for mode in args:
+            if mode == 4:
+                self.insert_mode = False
+            elif mode == 20:
+                self.newline_mode = False
+
+    def set_private_modes(self, args, on):
+        for mode in args:
+            if mode == 1:
+                self.app_cursor = on
+            elif mode == 6:
+                self.origin_mode = on
+                self.move_to(0, 0)
+            elif mode == 7:
+                self.autowrap = on
+            elif mode == 25:
+                self.cursor_visible = on
+            elif mode in (47, 1047, 1049):
+                if mode == 1049 and on:
+                    self.save_cursor()
+                self.switch_buffer(on)
+                if mode == 1049 and not on:
+                    self.restore_cursor()
+            elif mode == 2004:
+                self.bracketed_paste = on
+
+    def switch_buffer(self, alternate):
+        target = self.alternate if alternate else self.primary
+        if target is self.buffer:
+            return
+        if alternate:
+            self.alternate = ScreenBuffer(self.cols, self.rows)
+            target = self.alternate
+        self.buffer = target
+        self.dirty = set(range(self.rows))
+
+    # --- Attributs (SGR) ---
+
+    def attr_id(self, key):
+        attr = self.attr_ids.get(key)
+        if attr is None:
+            attr = len(self.attr_table)
+            self.attr_table.append(key)
+            self.attr_ids[key] = attr
+        return attr
+
+    def update_attr(self):
+        self.attr = self.attr_id((self.fg, self.bg, self.flags))
+
+    def csi_sgr(self, params):
+        groups = params.split(';') if params else ['0']
+        i = 0
+        while i < len(groups):
+            group = groups[i]
+            if ':' in group:
+                parts = [int(p) if p.isdigit() else 0 for p in group.split(':')]
+                code = parts[0]
+                if code in (38, 48, 58) and len(parts) >= 2:
+                    if parts[1] == 5 and len(parts) >= 3:
+                        color = parts[2]
+                    elif parts[1] == 2 and len(parts) >= 5:
+                        r, g, b = parts[-3:]
+                        color = TRUECOLOR | (r << 16) | (g << 8) | b
+                    else:
+                        color = -1
+                    if code == 38:
+                        self.fg = color
+                    elif code == 48:
+                        self.bg = color
+                elif code == 4:
+                    if len(parts) > 1 and parts[1] == 0:
+                        self.flags &= ~UNDERLINE
+                    else:
+                        self.flags |= UNDERLINE
+                i += 1
+                continue
+            code = int(group) if group.isdigit() else 0
+            if code == 0:
+                self.fg, self.bg, self.flags = -1, -1, 0
+            elif code in SGR_FLAGS:
+                self.flags |= SGR_FLAGS[code]
+            elif code in SGR_RESET_FLAGS:
+                self.flags &= ~SGR_RESET_FLAGS[code]
+            elif 30 <= code <= 37:
+                self.fg = code - 30
+            elif 40 <= code <= 47:
+                self.bg = code - 40
+            elif 90 <= code <= 97:
+                self.fg = code - 82
+            elif 100 <= code <= 107:
+                self.bg = code - 92
+            elif code == 39:
+                self.fg = -1
+            elif code == 49:
+                self.bg = -1
+            elif code in (38, 48, 58):
+                color = -1
+                mode = int(groups[i + 1]) if i + 1 < len(groups) and groups[i + 1].isdigit() else 0
+                if mode == 5 and i + 2 < len(groups):
+                    color = int(groups[i + 2]) if groups[i + 2].isdigit() else -1
+                    i += 2
+                elif mode == 2 and i + 4 < len(groups):
+                    r, g, b = (int(c) if c.isdigit() else 0 for c in groups[i + 2:i + 5])
+                    color = TRUECOLOR | (r << 16) | (g << 8) | b
+                    i += 4
+                else:
+                    i += 1
+                if code == 38:
+                    self.fg = color
+                elif code == 48:
+                    self.bg = color
+            i += 1
+        self.update_attr()
+
+    # --- Redimensionnement ---
+
+    def resize(self, cols, rows):
+        if cols == self.cols and rows == self.rows:
+            return
+        cols = max(1, cols)
+        rows = max(1, rows)
+        # On garde le curseur à l'écran : les lignes du haut partent dans
+        # l'historique (écran principal), le bas vide est coupé.
+        pushed = max(0, self.y - (rows - 1))
+        for buf in (self.primary, self.alternate):
+            for r in range(len(buf.chars)):
+                chars, attrs = buf.chars[r], buf.attrs[r]
+                if cols < self.cols:
+                    del chars[cols:]
+                    del attrs[cols:]
+                else:
+                    chars.extend(cells(' ' * (cols - self.cols)))
+                    attrs.extend(array('I', [0]) * (cols - self.cols))
+            if rows < self.rows:
+                for _ in range(pushed if buf is self.buffer else 0):
+                    chars, attrs = buf.chars.pop(0), buf.attrs.pop(0)
+                    if buf is self.primary:
+                        self.scrolled.append((chars, attrs))
+                del buf.chars[rows:]
+                del buf.attrs[rows:]
+            else:
+                for _ in range(rows - self.rows):
+                    chars, attrs = blank_row(cols)
+                    buf.chars.append(chars)
+                    buf.attrs.append(attrs)
+        self.y -= pushed
+        self.cols = cols
+        self.rows = rows
+        self.x = min(self.x, cols - 1)
+        self.y = min(self.y, rows - 1)
+        self.top = 0
+        self.bottom = rows - 1
+        self.wrap_pending = False
+        self.tabstops = set(range(8, cols, 8))
+        self.dirty = set(range(rows))
+
+class EchoPredictor:
+    # Prédictions posées par-dessus l'écran émulé, qui reste l'état exact du
+    # serveur : le rendu les affiche soulignées à la place des cellules.
+    # Chaque prédiction est confirmée quand le curseur du serveur l'a
+    # dépassée en affichant le même caractère ; sinon toutes sont annulées.
+    # Une série (frappes entre deux touches non prévisibles : Entrée,
+    # flèches, Ctrl+...) reste invisible tant que le serveur n'en a
+    # confirmé aucune : une saisie sans écho (mot de passe) n'est jamais
+    # affichée. Rien n'est prévu sur l'écran alternatif (vim, less, top).
+    def __init__(self, screen, mode=PREDICT_MODE):
+        self.screen = screen
+        self.mode = mode
+        self.pending = []  # [ligne, colonne, caractère ('' : effacement), instant, série]
+        self.series = None  # [confirmée, caractères effaçables]
+        self.blind_at = 0.0  # dernière touche envoyée sans prédiction
+        self.output_at = 0.0  # dernière sortie du serveur
+        self.rtt = None
+
+    def enabled(self):
+        return self.mode == 'on' or self.mode == 'auto' and self.rtt is not None and self.rtt > PREDICT_RTT
+
+    def cursor(self):
+        # Position après la dernière prédiction de la série en cours
+        for row, col, ch, _, series in reversed(self.pending):
+            if series is self.series:
+                return row, col + 1 if ch else col
+            break
+        return self.screen.y, self.screen.x
+
+    def start_series(self, now):
+        # Pas de nouvelle série tant que le serveur n'a pas traité ce qui
+        # a été envoyé sans prédiction ni écho
+        screen = self.screen
+        if self.mode == 'off' or screen.on_alternate or screen.wrap_pending or self.pending:
+            return False
+        if self.output_at <= self.blind_at:
+            return False
+        if PASSWORD_PROMPT_RE.search(cells_text(screen.buffer.chars[screen.y][:screen.x])):
+            return False
+        self.series = [False, 0]
+        return True
+
+    def type_text(self, text, now):
+        screen = self.screen
+        for ch in text:
+            if self.series is None and not self.start_series(now):
+                self.barrier(now)
+                return
+            row, col = self.cursor()
+            # Seulement en fin de ligne, sans retour à la ligne automatique
+            # ni caractère large
+            if col >= screen.cols - 1 or WIDE_RE.match(ch) or cells_text(screen.buffer.chars[row][col:]).strip():
+                self.barrier(now)
+                return
+            self.pending.append([row, col, ch, now, self.series])
+            self.series[1] += 1
+            screen.dirty.add(row)
+
+    def erase(self, now):
+        # Retour arrière prévu seulement sur des caractères tapés dans la série
+        series = self.series
+        if series is None or series[1] <= 0:
+            self.barrier(now)
+            return
+        row, col = self.cursor()
+        self.pending.append([row, col - 1, '', now, series])
+        series[1] -= 1
+        self.screen.dirty.add(row)
+
+    def barrier(self, now):
+        # Touche non prévisible : les prédictions en cours attendent leur
+        # écho, les suivantes attendent que le serveur ait répondu
+        self.series = None
+        self.blind_at = now
+
+    def reset(self):
+        for row, *_ in self.pending:
+            if row < self.screen.rows:
+                self.screen.dirty.add(row)
+        self.pending = []
+        self.series = None
+
+    def verify(self, now, scrolled):
+        # Après chaque lecture, avant le rendu ; scrolled : lignes sorties
+        # par le haut depuis le dernier rendu
+        self.output_at = now
+        if not self.pending:
+            return
+        screen = self.screen
+        if screen.on_alternate:
+            self.reset()
+            return
+        if scrolled:
+            # Les prédictions suivent le défilement de l'écran
+            for entry in self.pending:
+                entry[0] -= scrolled
+            if self.pending[0][0] < 0:
+                self.reset()
+                return
+        timeout = max(PREDICT_TIMEOUT, 4 * (self.rtt or 0))
+        while self.pending:
+            row, col, ch, sent, series = self.pending[0]
+            if ch:
+                passed = screen.y > row or screen.y == row and screen.x > col
+            else:
+                passed = screen.y == row and screen.x <= col
+            if not passed:
+                if now - sent > timeout:
+                    self.reset()
+                return
+            if cell_char(screen.buffer.chars[row][col]) != (ch or ' '):
+                self.reset()
+                return
+            self.pending.pop(0)
+            if not series[0]:
+                series[0] = True
+                for other in self.pending:
+                    screen.dirty.add(other[0])
+            rtt = now - sent
+            self.rtt = rtt if self.rtt is None else 0.8 * self.rtt + 0.2 * rtt
+            screen.dirty.add(row)
+
+    def visible(self):
+        return self.enabled() and any(series[0] for *_, series in self.pending)
+
+    def overlay_row(self, row, chars, attrs):
+        if not self.visible():
+            return chars, attrs
+        typed = [(col, ch) for r, col, ch, _, series in self.pending if r == row and series[0]]
+        if not typed:
+            return chars, attrs
+        screen = self.screen
+        chars, attrs = array(CELL_TYPECODE, chars), array('I', attrs)
+        fg, bg, flags = screen.attr_table[screen.attr]
+        underline = screen.attr_id((fg, bg, flags | UNDERLINE))
+        for col, ch in typed:
+            chars[col] = cells(ch or ' ')[0]
+            attrs[col] = underline
+        return chars, attrs
+
+    def cursor_cell(self):
+        if self.enabled():
+            for row, col, ch, _, series in reversed(self.pending):
+                if series[0]:
+                    return row, col + 1 if ch else col
+        return self.screen.y, self.screen.x
+
+class Scrollback:
+    # Historique froid : pile de segments compressés (zlib), du plus ancien
+    # au plus récent. Une ligne est une liste de runs (texte, attribut).
+    # Chaque segment garde aussi son texte brut compressé, toujours en
+    # mémoire : c'est l'index parcouru par la recherche.
+    def __init__(self, limit=SCROLLBACK_LINES):
+        self.limit = limit
+        self.segments = deque()  # [bytes ou (position, taille) dans le fichier, nombre de lignes, texte]
+        self.lines = 0
+        self.dropped = 0  # lignes abandonnées (limite) : numéro absolu de la première ligne
+        self.memory = 0
+        self.spill = None
+        self.spilled = 0
+        self.spill_live = 0  # octets des segments encore sur disque
+        self.spill_end = 0  # fin du fichier, octets morts compris
+
+    def __len__(self):
+        return self.lines
+
+    def push(self, lines):
+        data = zlib.compress(marshal.dumps(lines))
+        text = '\n'.join(''.join(run[0] for run in runs) for runs in lines)
+        self.segments.append([data, len(lines), zlib.compress(text.encode(), 1)])
+        self.lines += len(lines)
+        self.memory += len(data)
+        while self.lines > self.limit and self.segments:
+            self.lines -= self.segments[0][1]
+            self.dropped += self.segments[0][1]
+            self.forget(self.segments.popleft())
+        if self.memory > SPILL_BYTES:
+            self.spill_oldest()
+
+    def pop(self):
+        segment = self.segments.pop()
+        self.lines -= segment[1]
+        lines = self.load(segment)
+        self.forget(segment)
+        return lines
+
+    def load(self, segment):
+        data = segment[0]
+        if not isinstance(data, bytes):
+            offset, size = data
+            self.spill.seek(offset)
+            data = self.spill.read(size)
+        return marshal.loads(zlib.decompress(data))
+
+    def iter_lines(self):
+        for segment in list(self.segments):
+            yield from self.load(segment)
+
+    def snapshot(self):
+        # Index texte (références) pour la recherche dans un autre thread
+        return [(segment[1], segment[2]) for segment in self.segments]
+
+    def forget(self, segment):
+        if isinstance(segment[0], bytes):
+            self.memory -= len(segment[0])
+        else:
+            self.spilled -= 1
+            self.spill_live -= segment[0][1]
+            # Les segments abandonnés laissent des trous : le fichier est
+            # compacté dès que la place morte dépasse la place utile, il
+            # reste donc borné par la limite de l'historique
+            if self.spill_end - self.spill_live > self.spill_live:
+                self.compact_spill()
+
+    def compact_spill(self):
+        # Les segments sur disque sont dans l'ordre des positions : chacun
+        # recule vers le début du fichier sans écraser les suivants
+        end = 0
+        for segment in self.segments:
+            if not isinstance(segment[0], bytes):
+                offset, size = segment[0]
+                if offset != end:
+                    self.spill.seek(offset)
+                    data = self.spill.read(size)
+                    self.spill.seek(end)
+                    self.spill.write(data)
+                    segment[0] = (end, size)
+                end += size
+        self.spill.truncate(end)
+        self.spill_end = end
+
+    def spill_oldest(self):
+        # Les segments les plus anciens partent sur disque jusqu'à libérer la
+        # moitié du budget mémoire
+        import tempfile
+        if self.spill is None:
+            self.spill = tempfile.TemporaryFile(prefix='ssgui-scrollback-')
+        for segment in self.segments:
+            if self.memory <= SPILL_BYTES // 2:
+                break
+            if isinstance(segment[0], bytes):
+                size = len(segment[0])
+                self.spill.seek(self.spill_end)
+                self.spill.write(segment[0])
+                self.memory -= size
+                segment[0] = (self.spill_end, size)
+                self.spill_end += size
+                self.spill_live += size
+                self.spilled += 1
+
+    def clear(self):
+        self.segments.clear()
+        self.lines = self.memory = self.spilled = self.dropped = 0
+        self.spill_live = self.spill_end = 0
+        if self.spill is not None:
+            self.spill.close()
+            self.spill = None
+
+class CursorBlinker(QObject):
+    # Horloge de clignotement unique pour toute l'application : seuls les
+    # terminaux visibles y sont abonnés, les onglets cachés ne coûtent rien.
+    instance = None
+
+    @classmethod
+    def shared(cls):
+        if cls.instance is None:
+            cls.instance = cls()
+        return cls.instance
+
+    def __init__(self, interval=500):
+        super().__init__()
+        self.views = set()
+        self.visible = True
+        self.timer = QTimer()
+        self.timer.setInterval(interval)
+        self.timer.timeout.connect(self.tick)
+
+    def register(self, view):
+        self.views.add(view)
+        view.set_cursor_on(self.visible)
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def unregister(self, view):
+        self.views.discard(view)
+        if not self.views:
+            try:
+                self.timer.stop()
+            except RuntimeError:
+                pass  # timer déjà détruit à la fermeture de l'application
+
+    def tick(self):
+        self.visible = not self.visible
+        for view in list(self.views):
+            view.set_cursor_on(self.visible)
+
+ANSI_COLORS = [
+    '#1e1e1e', '#e06c75', '#98c379', '#e5c07b', '#61afef', '#c678dd', '#56b6c2', '#d0d0d0',
+    '#5c6370', '#ff7b86', '#b5e890', '#ffd68a', '#82c4ff', '#e09cf2', '#7fd8e3', '#ffffff',
+]
+DEFAULT_FG = '#e0e0e0'
+DEFAULT_BG = '#1e1e1e'
+CUBE_LEVELS = (0, 95, 135, 175, 215, 255)
+
+def xterm_color(index):
+    if index & TRUECOLOR:
+        return QColor((index >> 16) & 255, (index >> 8) & 255, index & 255)
+    if index < 16:
+        return QColor(ANSI_COLORS[index])
+    if index < 232:
+        index -= 16
+        return QColor(CUBE_LEVELS[index // 36], CUBE_LEVELS[(index // 6) % 6], CUBE_LEVELS[index % 6])
+    gray = min(255, 8 + (index - 232) * 10)
+    return QColor(gray, gray, gray)
+
+class TerminalView(QPlainTextEdit):
+    # Le curseur est peint par-dessus le viewport : le clignotement ne
+    # touche jamais au document ni à la sélection de l'utilisateur.
+    grid_resized = pyqtSignal(int, int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setLineWrapMode(QPlainTextEdit.NoWrap)
+        self.cursor_block = 0
+        self.cursor_col = 0
+        self.cursor_on = True
+        self.cursor_hidden = False
+
+    def grid_size(self):
+        metrics = self.fontMetrics()
+        margin = 2 * self.document().documentMargin()
+        cols = int((self.viewport().width() - margin) // metrics.horizontalAdvance(' '))
+        rows = int((self.viewport().height() - margin) // metrics.height())
+        return max(cols, 10), max(rows, 2)
+
+    def cursor_rect(self):
+        block = self.document().findBlockByNumber(self.cursor_block)
+        if not block.isValid():
+            return QRect()
+        width = self.fontMetrics().horizontalAdvance(' ')
+        rect = self.cursorRect(QTextCursor(block))
+        rect.translate(self.cursor_col * width, 0)
+        rect.setWidth(width)
+        return rect
+
+    def set_cursor_cell(self, block, col, hidden=False):
+        if (block, col, hidden) != (self.cursor_block, self.cursor_col, self.cursor_hidden):
+            self.viewport().update(self.cursor_rect())
+            self.cursor_block, self.cursor_col, self.cursor_hidden = block, col, hidden
+            self.viewport().update(self.cursor_rect())
+
+    def set_cursor_on(self, on):
+        if on != self.cursor_on:
+            self.cursor_on = on
+            self.viewport().update(self.cursor_rect())
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        CursorBlinker.shared().register(self)
+
+    def hideEvent(self, event):
+        CursorBlinker.shared().unregister(self)
+        super().hideEvent(event)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.grid_resized.emit(*self.grid_size())
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self.cursor_on and not self.cursor_hidden:
+            painter = QPainter(self.viewport())
+            painter.setCompositionMode(QPainter.CompositionMode_Difference)
+            painter.fillRect(self.cursor_rect(), QColor(DEFAULT_FG))
+            painter.end()
+
+class TerminalRenderer:
+    # Projette l'écran émulé sur le QTextDocument : l'historique récent est
+    # fait de blocs figés en tête de document, l'écran occupe les derniers
+    # blocs et seules les lignes marquées dirty sont réécrites. L'historique
+    # plus ancien est compressé dans self.scrollback et revient dans le
+    # document quand on remonte tout en haut.
+    def __init__(self, text_edit, screen):
+        self.text_edit = text_edit
+        self.screen = screen
+        self.document = text_edit.document()
+        self.document.setUndoRedoEnabled(False)
+        self.formats = {}
+        self.hot = deque()  # runs des blocs d'historique présents dans le document
+        self.scrollback = Scrollback()
+        self.restore_pending = False
+        self.trimming = False
+        self.dormant = False
+        self.released = False
+        self.pending = []  # lignes sorties de l'écran pendant l'hibernation
+        self.predictor = None  # écho local prédictif, superposé aux lignes de l'écran
+        text_edit.verticalScrollBar().valueChanged.connect(self.on_scroll)
+        self.reset()
+
+    def reset(self):
+        self.document.clear()
+        self.hot.clear()
+        self.scrollback.clear()
+        self.pending = []
+        self.released = False
+        self.history = 0
+        self.screen_blocks = 1
+        self.screen.take_scrolled()
+        self.screen.dirty.update(range(self.screen.rows))
+        self.flush()
+
+    def clear(self):
+        self.screen.feed('\x1b[H\x1b[2J')
+        self.reset()
+
+    def feed(self, data):
+        self.screen.feed(data)
+        self.flush()
+
+    def resize(self, cols, rows):
+        self.screen.resize(cols, rows)
+        self.flush()
+
+    def char_format(self, attr):
+        fmt = self.formats.get(attr)
+        if fmt is None:
+            fmt = self.formats[attr] = self.build_format(*self.screen.attr_table[attr])
+        return fmt
+
+    def build_format(self, fg, bg, flags):
+        fmt = QTextCharFormat()
+        if flags & BOLD and 0 <= fg < 8:
+            fg += 8
+        fg_color = xterm_color(fg) if fg != -1 else None
+        bg_color = xterm_color(bg) if bg != -1 else None
+        if flags & REVERSE:
+            fg_color, bg_color = bg_color or QColor(DEFAULT_BG), fg_color or QColor(DEFAULT_FG)
+        if flags & DIM:
+            fg_color = (fg_color or QColor(DEFAULT_FG)).darker(150)
+        if flags & HIDDEN:
+            fg_color = bg_color or QColor(DEFAULT_BG)
+        if fg_color is not None:
+            fmt.setForeground(fg_color)
+        if bg_color is not None:
+            fmt.setBackground(bg_color)
+        if flags & BOLD:
+            fmt.setFontWeight(QFont.Bold)
+        if flags & ITALIC:
+            fmt.setFontItalic(True)
+        if flags & UNDERLINE:
+            fmt.setFontUnderline(True)
+        if flags & STRIKE:
+            fmt.setFontStrikeOut(True)
+        return fmt
+
+    def line_runs(self, chars, attrs):
+        text = cells_text(chars)
+        if WIDE_TAIL in text:
+            # La seconde cellule d'un caractère large n'est pas affichée
+            return ((run.replace(WIDE_TAIL, ''), attr) for run, attr in self.cell_runs(text, attrs)
+                    if run.strip(WIDE_TAIL))
+        return self.cell_runs(text, attrs)
+
+    def cell_runs(self, text, attrs):
+        end = len(text.rstrip(' '))
+        if end < len(text) and any(attrs[end:]):
+            end = len(text)
+        if not end:
+            return
+        attrs = attrs[:end]
+        if not any(attrs):
+            yield text[:end], 0
+            return
+        start = 0
+        for attr, run in groupby(attrs):
+            n = sum(1 for _ in run)
+            yield text[start:start + n], attr
+            start += n
+
+    def write_lines(self, cursor, lines):
+        # Les runs de même format sont fusionnés d'une ligne à l'autre : un
+        # flot de texte brut ne coûte qu'un seul insertText.
+        parts = []
+        current = 0
+        for i, runs in enumerate(lines):
+            if i:
+                parts.append('\n')
+            for text, attr in runs:
+                if attr != current and parts:
+                    cursor.insertText(''.join(parts), self.char_format(current))
+                    parts = []
+                current = attr
+                parts.append(text)
+        if parts:
+            cursor.insertText(''.join(parts), self.char_format(current))
+
+    def select_blocks(self, cursor, first, count):
+        last = first
+        for _ in range(count - 1):
+            last = last.next()
+        cursor.setPosition(first.position())
+        cursor.setPosition(last.position() + last.length() - 1, QTextCursor.KeepAnchor)
+        cursor.removeSelectedText()
+
+    def sleep(self):
+        self.dormant = True
+
+    def wake(self):
+        # Le prochain flush ne dessine que l'état final : lignes en attente
+        # et écran entier
+        self.dormant = False
+        self.released = False
+        self.screen.dirty.update(range(self.screen.rows))
+
+    def stash(self):
+        self.pending.extend(self.screen.take_scrolled())
+        if self.released:
+            self.push_pending()
+        elif len(self.pending) > HOT_LINES:
+            self.release()
+
+    def release(self):
+        # Onglet caché : l'historique du document rejoint l'historique
+        # compressé, seuls les blocs de l'écran restent dans le document
+        if self.history:
+            cursor = QTextCursor(self.document)
+            cursor.setPosition(0)
+            cursor.setPosition(self.document.findBlockByNumber(self.history).position(), QTextCursor.KeepAnchor)
+            cursor.removeSelectedText()
+            lines = list(self.hot)
+            self.hot.clear()
+            self.history = 0
+            for i in range(0, len(lines), SEGMENT_LINES):
+                self.scrollback.push(lines[i:i + SEGMENT_LINES])
+        self.released = True
+        self.push_pending()
+
+    def push_pending(self):
+        while len(self.pending) >= SEGMENT_LINES:
+            lines = self.pending[:SEGMENT_LINES]
+            del self.pending[:SEGMENT_LINES]
+            self.scrollback.push([list(self.line_runs(chars, attrs)) for chars, attrs in lines])
+
+    def flush(self):
+        if self.dormant:
+            self.stash()
+            return
+        screen = self.screen
+        scrolled = screen.take_scrolled()
+        if self.pending:
+            scrolled, self.pending = self.pending + scrolled, []
+        dirty = screen.take_dirty()
+        if scrolled or dirty or self.screen_blocks != screen.rows:
+            scrollbar = self.text_edit.verticalScrollBar()
+            at_bottom = scrollbar.value() >= scrollbar.maximum()
+            cursor = QTextCursor(self.document)
+            cursor.beginEditBlock()
+            # Les lignes sorties de l'écran remplacent les blocs du haut de
+            # l'écran, qui deviennent de l'historique sans être déplacés.
+            reused = min(len(scrolled), self.screen_blocks)
+            if scrolled:
+                lines = [list(self.line_runs(chars, attrs)) for chars, attrs in scrolled]
+                self.select_blocks(cursor, self.document.findBlockByNumber(self.history), reused)
+                self.write_lines(cursor, lines)
+                self.hot.extend(lines)
+                self.history += len(scrolled)
+            remaining = self.screen_blocks - reused
+            if remaining < screen.rows:
+                cursor.movePosition(QTextCursor.End)
+                cursor.insertText('\n' * (screen.rows - remaining), self.char_format(0))
+            elif remaining > screen.rows:
+                block = self.document.findBlockByNumber(self.history + screen.rows)
+                cursor.setPosition(block.position() - 1)
+                cursor.movePosition(QTextCursor.End, QTextCursor.KeepAnchor)
+                cursor.removeSelectedText()
+            self.screen_blocks = screen.rows
+            row = 0
+            block = self.document.findBlockByNumber(self.history)
+            predictor = self.predictor
+            for target in sorted(dirty):
+                while row < target:
+                    block = block.next()
+                    row += 1
+                chars, attrs = screen.buffer.chars[row], screen.buffer.attrs[row]
+                if predictor is not None and predictor.pending:
+                    chars, attrs = predictor.overlay_row(row, chars, attrs)
+                self.select_blocks(cursor, block, 1)
+                self.write_lines(cursor, [self.line_runs(chars, attrs)])
+            # Pas de compression sous les yeux de l'utilisateur qui relit
+            # l'historique, sauf si le document devient trop gros
+            if self.history >= HOT_LINES + SEGMENT_LINES and at_bottom or self.history > HOT_LINES_MAX:
+                self.trim(cursor, (self.history - HOT_LINES) // SEGMENT_LINES * SEGMENT_LINES)
+            cursor.endEditBlock()
+            if at_bottom:
+                scrollbar.setValue(scrollbar.maximum())
+        y, x = self.predictor.cursor_cell() if self.predictor is not None else (screen.y, screen.x)
+        self.text_edit.set_cursor_cell(self.history + y, x, not screen.cursor_visible)
+
+    def trim(self, cursor, count):
+        scrollbar = self.text_edit.verticalScrollBar()
+        value = scrollbar.value()
+        cursor.setPosition(0)
+        cursor.setPosition(self.document.findBlockByNumber(count).position(), QTextCursor.KeepAnchor)
+        cursor.removeSelectedText()
+        lines = [self.hot.popleft() for _ in range(count)]
+        for i in range(0, count, SEGMENT_LINES):
+            self.scrollback.push(lines[i:i + SEGMENT_LINES])
+        self.history -= count
+        self.trimming = True
+        scrollbar.setValue(value - count)
+        self.trimming = False
+
+    def on_scroll(self, value):
+        if value == 0 and len(self.scrollback) and not self.restore_pending and not self.trimming:
+            self.restore_pending = True
+            QTimer.singleShot(0, self.restore_segment)
+
+    def restore_segment(self):
+        # Décompresse le segment le plus récent de l'historique froid et le
+        # replace en tête du document, sans déplacer la vue
+        self.restore_pending = False
+        if not len(self.scrollback):
+            return
+        scrollbar = self.text_edit.verticalScrollBar()
+        value = scrollbar.value()
+        lines = self.scrollback.pop()
+        cursor = QTextCursor(self.document)
+        cursor.beginEditBlock()
+        cursor.setPosition(0)
+        self.write_lines(cursor, lines)
+        cursor.insertText('\n', self.char_format(0))
+        cursor.endEditBlock()
+        self.hot.extendleft(reversed(lines))
+        self.history += len(lines)
+        scrollbar.setValue(value + len(lines))
+
+    def first_line(self):
+        # Numéro absolu (depuis le début de la session) du premier bloc du document
+        return self.scrollback.dropped + len(self.scrollback)
+
+    def tail_lines(self, count):
+        # Dernières lignes en texte brut : historique froid si besoin, blocs
+        # récents, lignes en attente (hibernation) puis écran sans les
+        # lignes vides du bas
+        lines = [self.screen.line_text(row).rstrip() for row in range(self.screen.rows)]
+        while lines and not lines[-1]:
+            lines.pop()
+        lines = ([''.join(run[0] for run in runs) for runs in self.hot]
+                 + [cells_text(chars).replace(WIDE_TAIL, '') for chars, _ in self.pending] + lines)
+        for _, text in reversed(self.scrollback.snapshot()):
+            if len(lines) >= count:
+                break
+            lines = zlib.decompress(text).decode().split('\n') + lines
+        return [line.rstrip() for line in lines[-count:]]
+
+    def search_snapshot(self):
+        return (self.scrollback.snapshot(), self.scrollback.dropped,
+                list(self.hot), [self.screen.line_text(row) for row in range(self.screen.rows)])
+
+    def reveal_line(self, line):
+        # Ramène au besoin la ligne depuis l'historique froid ; renvoie son
+        # numéro de bloc, ou None si elle n'existe plus
+        while line < self.first_line() and len(self.scrollback):
+            self.restore_segment()
+        block = line - self.first_line()
+        return block if 0 <= block < self.document.blockCount() else None
+
+class SearchWorker(QObject):
+    found = pyqtSignal(int, object)  # génération, [(ligne, début, fin)]
+    done = pyqtSignal(int, int)  # génération, nombre de correspondances
+
+class ScrollbackSearch:
+    # Recherche dans un instantané de l'historique, hors du thread Qt : les
+    # lignes sont parcourues de la plus récente à la plus ancienne (écran,
+    # document puis segments froids décompressés un par un) et les
+    # correspondances remontent par lots. Annulée dès que la requête change.
+    def __init__(self, worker, generation, regex, snapshot):
+        self.worker = worker
+        self.generation = generation
+        self.regex = regex
+        self.snapshot = snapshot
+        self.cancelled = False
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def cancel(self):
+        self.cancelled = True
+
+    def chunks(self):
+        # (numéro de la première ligne, texte des lignes séparées par \n),
+        # du plus récent au plus ancien
+        cold, dropped, hot, screen_lines = self.snapshot
+        first_hot = dropped + sum(n for n, _ in cold)
+        yield first_hot + len(hot), '\n'.join(screen_lines)
+        for end in range(len(hot), 0, -SEGMENT_LINES):
+            start = max(0, end - SEGMENT_LINES)
+            yield first_hot + start, '\n'.join(''.join(run[0] for run in runs) for runs in hot[start:end])
+        line = first_hot
+        for n, text in reversed(cold):
+            line -= n
+            yield line, zlib.decompress(text).decode()
+
+    def run(self):
+        batch = []
+        total = 0
+        last_emit = time.monotonic()
+        for first, text in self.chunks():
+            if self.cancelled:
+                return
+            # Une passe de l'expression sur tout le bloc ; le numéro de ligne
+            # avance avec les \n rencontrés
+            found = []
+            line = first
+            pos = 0
+            line_start = 0
+            for match in self.regex.finditer(text):
+                if match.end() == match.start():
+                    continue
+                newlines = text.count('\n', pos, match.start())
+                if newlines:
+                    line += newlines
+                    line_start = text.rfind('\n', 0, match.start()) + 1
+                pos = match.start()
+                end = text.find('\n', match.start(), match.end())
+                found.append((line, match.start() - line_start, (end if end >= 0 else match.end()) - line_start))
+            found.reverse()
+            batch.extend(found)
+            if batch and (len(batch) >= SEARCH_BATCH or time.monotonic() - last_emit > 0.1):
+                total += len(batch)
+                self.worker.found.emit(self.generation, batch)
+                batch = []
+                last_emit = time.monotonic()
+                if total >= SEARCH_MAX_MATCHES:
+                    break
+        if batch:
+            total += len(batch)
+            self.worker.found.emit(self.generation, batch)
+        self.worker.done.emit(self.generation, total)
+
+class FindBar(QWidget):
+    # Barre de recherche d'un onglet (Ctrl+Maj+F) : la recherche tourne en
+    # arrière-plan, seules les lignes visibles sont surlignées.
+    def __init__(self, terminal, renderer, parent=None):
+        import qtawesome as qta
+        super().__init__(parent)
+        self.terminal = terminal
+        self.renderer = renderer
+        self.worker = SearchWorker()
+        self.worker.found.connect(self.on_found)
+        self.worker.done.connect(self.on_done)
+        self.generation = 0
+        self.search = None
+        self.searching = False
+        self.matches = []
+        self.match_lines = {}
+        self.current = None
+        self.debounce = QTimer(self)
+        self.debounce.setSingleShot(True)
+        self.debounce.setInterval(150)
+        self.debounce.timeout.connect(self.start_search)
+        self.match_format = QTextCharFormat()
+        self.match_format.setBackground(QColor('#5c6370'))
+        self.current_format = QTextCharFormat()
+        self.current_format.setBackground(QColor('#e5c07b'))
+        self.current_format.setForeground(QColor('#101014'))
+
+        layout = QHBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.query_input = QLineEdit()
+        self.query_input.setPlaceholderText("Rechercher dans l'historique...")
+        self.query_input.setStyleSheet("QLineEdit { background: #181a20; color: #e0e0e0; border: 1px solid #444; border-radius: 6px; padding: 4px 8px; font-size: 14px; } QLineEdit:focus { border: 1.5px solid #4e8cff; }")
+        self.query_input.textChanged.connect(self.debounce.start)
+        self.query_input.installEventFilter(self)
+        layout.addWidget(self.query_input)
+        button_style = "QPushButton { background: #23272e; color: #e0e0e0; border-radius: 6px; font-size: 14px; padding: 4px 8px; } QPushButton:hover { background: #3a4250; color: #8ab4f8; } QPushButton:checked { background: #4e8cff; color: #fff; }"
+        self.regex_btn = QPushButton(".*")
+        self.regex_btn.setCheckable(True)
+        self.regex_btn.setToolTip("Expression régulière")
+        self.case_btn = QPushButton("Aa")
+        self.case_btn.setCheckable(True)
+        self.case_btn.setToolTip("Respecter la casse")
+        for btn in (self.regex_btn, self.case_btn):
+            btn.setStyleSheet(button_style)
+            btn.toggled.connect(self.debounce.start)
+            layout.addWidget(btn)
+        self.count_label = QLabel("")
+        self.count_label.setMinimumWidth(110)
+        self.count_label.setStyleSheet("color: #b0b8c0; font-size: 13px;")
+        layout.addWidget(self.count_label)
+        self.older_btn = QPushButton()
+        self.older_btn.setIcon(qta.icon('fa5s.chevron-up', color='#8ab4f8'))
+        self.older_btn.setToolTip("Correspondance plus ancienne (Entrée)")
+        self.older_btn.clicked.connect(self.next_match)
+        self.newer_btn = QPushButton()
+        self.newer_btn.setIcon(qta.icon('fa5s.chevron-down', color='#8ab4f8'))
+        self.newer_btn.setToolTip("Correspondance plus récente (Maj+Entrée)")
+        self.newer_btn.clicked.connect(self.previous_match)
+        self.close_btn = QPushButton()
+        self.close_btn.setIcon(qta.icon('fa5s.times', color='#ff3333'))
+        self.close_btn.setToolTip("Fermer (Échap)")
+        self.close_btn.clicked.connect(self.close_bar)
+        for btn in (self.older_btn, self.newer_btn, self.close_btn):
+            btn.setStyleSheet(button_style)
+            layout.addWidget(btn)
+        self.setLayout(layout)
+        self.terminal.verticalScrollBar().valueChanged.connect(self.update_highlights)
+        self.hide()
+
+    def open_bar(self):
+        self.show()
+        self.query_input.setFocus()
+        self.query_input.selectAll()
+        if self.query_input.text() and not self.matches and not self.searching:
+            self.start_search()
+
+    def close_bar(self):
+        self.cancel_search()
+        self.clear_results()
+        self.hide()
+        self.terminal.setFocus()
+
+    def cancel_search(self):
+        if self.search is not None:
+            self.search.cancel()
+            self.search = None
+        self.searching = False
+
+    def clear_results(self):
+        self.generation += 1
+        self.matches = []
+        self.match_lines = {}
+        self.current = None
+        self.count_label.setText("")
+        self.update_highlights()
+
+    def restart(self):
+        # Le contenu a été remplacé (nouvelle connexion, Clear)
+        self.cancel_search()
+        self.clear_results()
+        if self.isVisible() and self.query_input.text():
+            self.debounce.start()
+
+    def start_search(self):
+        self.cancel_search()
+        self.clear_results()
+        self.query_input.setStyleSheet(self.query_input.styleSheet().replace('#ff3333', '#444'))
+        text = self.query_input.text()
+        if not text:
+            return
+        pattern = text if self.regex_btn.isChecked() else re.escape(text)
+        try:
+            regex = re.compile(pattern, re.MULTILINE | (0 if self.case_btn.isChecked() else re.IGNORECASE))
+        except re.error:
+            self.query_input.setStyleSheet(self.query_input.styleSheet().replace('#444', '#ff3333'))
+            self.count_label.setText("Expression invalide")
+            return
+        self.searching = True
+        self.count_label.setText("Recherche...")
+        self.search = ScrollbackSearch(self.worker, self.generation, regex, self.renderer.search_snapshot())
+
+    def on_found(self, generation, batch):
+        if generation != self.generation:
+            return
+        self.matches.extend(batch)
+        for line, start, end in batch:
+            self.match_lines.setdefault(line, []).append((start, end))
+        if self.current is None:
+            self.go_to(0)
+        else:
+            self.update_label()
+            self.update_highlights()
+
+    def on_done(self, generation, total):
+        if generation != self.generation:
+            return
+        self.searching = False
+        self.search = None
+        self.update_label()
+
+    def update_label(self):
+        if not self.matches:
+            self.count_label.setText("Recherche..." if self.searching else "Aucun résultat")
+        else:
+            more = "+" if self.searching or len(self.matches) >= SEARCH_MAX_MATCHES else ""
+            self.count_label.setText(f"{self.current + 1} / {len(self.matches)}{more}")
+
+    def next_match(self):
+        # Les correspondances sont rangées de la plus récente à la plus
+        # ancienne : "suivante" remonte dans l'historique
+        if self.matches:
+            self.go_to((self.current + 1) % len(self.matches))
+
+    def previous_match(self):
+        if self.matches:
+            self.go_to((self.current - 1) % len(self.matches))
+
+    def go_to(self, index):
+        self.current = index
+        line, start, end = self.matches[index]
+        block = self.renderer.reveal_line(line)
+        if block is not None:
+            visible = self.terminal.viewport().height() // self.terminal.fontMetrics().height()
+            first = self.terminal.firstVisibleBlock().blockNumber()
+            if not first <= block < first + visible:
+                self.terminal.verticalScrollBar().setValue(max(0, block - visible // 2))
+        self.update_label()
+        self.update_highlights()
+
+    def update_highlights(self, *args):
+        # Surligne uniquement les blocs visibles : coût indépendant de la
+        # taille de l'historique
+        selections = []
+        if self.matches and self.isVisible():
+            document = self.terminal.document()
+            base = self.renderer.first_line()
+            current = self.matches[self.current] if self.current is not None else None
+            block = self.terminal.firstVisibleBlock()
+            rows = self.terminal.viewport().height() // self.terminal.fontMetrics().height() + 2
+            for _ in range(rows):
+                if not block.isValid():
+                    break
+                line = base + block.blockNumber()
+                for start, end in self.match_lines.get(line, ()):
+                    length = block.length() - 1
+                    if start >= length:
+                        continue
+                    selection = QTextEdit.ExtraSelection()
+                    cursor = QTextCursor(document)
+                    cursor.setPosition(block.position() + start)
+                    cursor.setPosition(block.position() + min(end, length), QTextCursor.KeepAnchor)
+                    selection.cursor = cursor
+                    selection.format = self.current_format if current == (line, start, end) else self.match_format
+                    selections.append(selection)
+                block = block.next()
+        self.terminal.setExtraSelections(selections)
+
+    def eventFilter(self, source, event):
+        if source is self.query_input and event.type() == QEvent.KeyPress:
+            if event.key() in (Qt.Key_Return, Qt.Key_Enter):
+                if event.modifiers() & Qt.ShiftModifier:
+                    self.previous_match()
+                else:
+                    self.next_match()
+                return True
+            if event.key() == Qt.Key_Escape:
+                self.close_bar()
+                return True
+        return super().eventFilter(source, event)
+
+def format_size(size):
+    for unit in ("o", "Ko", "Mo", "Go"):
+        if size < 1024 or unit == "Go":
+            return f"{size:.0f} {unit}" if unit == "o" else f"{size:.1f} {unit}"
+        size /= 1024
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+    return f"{seconds // 60}:{seconds % 60:02d}"
+
+class SftpWorker(QObject):
+    listed = pyqtSignal(str, object, str)  # dossier, [(nom, dossier, taille, date)], erreur
+
+class RemoteMimeData(QMimeData):
+    # Fichiers distants tirés vers le bureau : le téléchargement n'a lieu
+    # qu'au dépôt, quand la cible demande les URL
+    def __init__(self, panel, entries):
+        super().__init__()
+        self.panel = panel
+        self.entries = entries
+        self.local_urls = None
+
+    def formats(self):
+        return ['text/uri-list']
+
+    def hasFormat(self, mime):
+        return mime == 'text/uri-list'
+
+    def retrieveData(self, mime, kind):
+        if mime != 'text/uri-list':
+            return None
+        if self.local_urls is None:
+            self.local_urls = [QUrl.fromLocalFile(path) for path in self.panel.fetch_for_drag(self.entries)]
+        return self.local_urls
+
+class RemoteListView(QTreeWidget):
+    # Dossier distant : on y dépose des fichiers du bureau (envoi) et on en
+    # tire des fichiers vers le bureau
+    def __init__(self, panel):
+        super().__init__()
+        self.panel = panel
+        self.setHeaderLabels(["Nom", "Taille", "Modifié"])
+        self.setRootIsDecorated(False)
+        self.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.setDragEnabled(True)
+        self.setAcceptDrops(True)
+        self.setDragDropMode(QAbstractItemView.DragDrop)
+        self.header().setSectionResizeMode(0, QHeaderView.Stretch)
+
+    def dragEnterEvent(self, event):
+        if event.source() is not self and event.mimeData().hasUrls():
+            event.acceptProposedAction()
+        else:
+            event.ignore()
+
+    def dragMoveEvent(self, event):
+        self.dragEnterEvent(event)
+
+    def dropEvent(self, event):
+        paths = [url.toLocalFile() for url in event.mimeData().urls() if url.isLocalFile()]
+        item = self.itemAt(event.pos())
+        target = self.panel.path
+        if item is not None and item.data(0, Qt.UserRole)[1]:
+            target = posixpath.join(target, item.data(0, Qt.UserRole)[0])
+        self.panel.upload(paths, target)
+        event.acceptProposedAction()
+
+    def startDrag(self, actions):
+        entries = self.panel.selected_entries()
+        if entries:
+            drag = QDrag(self)
+            drag.setMimeData(RemoteMimeData(self.panel, entries))
+            drag.exec_(Qt.CopyAction)
+
+class SftpPanel(QWidget):
+    # Panneau SFTP d'un onglet : dossier distant et transferts, sur la
+    # transport de la session (canaux SFTP en plus du shell)
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        import qtawesome as qta
+        self.queue = None
+        self.server = ''
+        self.path = ''
+        self.rows = {}  # transfert -> ligne du tableau
+        self.rates = {}  # transfert -> (instant, octets, débit lissé)
+        self.running = 0
+        self.worker = SftpWorker()
+        self.worker.listed.connect(self.on_listed)
+        self.setStyleSheet("""
+            QLineEdit { background: #23272e; color: #e0e0e0; border-radius: 6px; padding: 4px 8px; font-size: 13px; }
+            QTreeWidget, QTableWidget { background: #1e1e1e; color: #e0e0e0; border: 1.5px solid #23272e; border-radius: 8px; font-size: 13px; }
+            QHeaderView::section { background: #23272e; color: #8ab4f8; border: none; padding: 4px; }
+            QPushButton { background: #23272e; color: #e0e0e0; border-radius: 6px; font-size: 13px; padding: 4px 8px; }
+            QPushButton:hover { background: #3a4250; color: #8ab4f8; }
+            QProgressBar { background: #23272e; color: #e0e0e0; border-radius: 4px; text-align: center; font-size: 12px; }
+            QProgressBar::chunk { background: #4e8cff; border-radius: 4px; }
+        """)
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        path_layout = QHBoxLayout()
+        self.up_btn = QPushButton()
+        self.up_btn.setIcon(qta.icon('fa5s.level-up-alt', color='#8ab4f8'))
+        self.up_btn.setToolTip("Dossier parent")
+        self.up_btn.clicked.connect(lambda: self.list_dir(posixpath.dirname(self.path.rstrip('/')) or '/'))
+        path_layout.addWidget(self.up_btn)
+        self.path_input = QLineEdit()
+        self.path_input.returnPressed.connect(lambda: self.list_dir(self.path_input.text().strip() or '.'))
+        path_layout.addWidget(self.path_input)
+        self.refresh_btn = QPushButton()
+        self.refresh_btn.setIcon(qta.icon('fa5s.sync', color='#8ab4f8'))
+        self.refresh_btn.setToolTip("Actualiser")
+        self.refresh_btn.clicked.connect(lambda: self.list_dir(self.path or '.'))
+        path_layout.addWidget(self.refresh_btn)
+        layout.addLayout(path_layout)
+        self.listing = RemoteListView(self)
+        self.listing.itemDoubleClicked.connect(self.open_item)
+        layout.addWidget(self.listing, 3)
+        btn_layout = QHBoxLayout()
+        self.upload_btn = QPushButton(" Envoyer...")
+        self.upload_btn.setIcon(qta.icon('fa5s.upload', color='#8ab4f8'))
+        self.upload_btn.clicked.connect(self.choose_upload)
+        btn_layout.addWidget(self.upload_btn)
+        self.download_btn = QPushButton(" Télécharger...")
+        self.download_btn.setIcon(qta.icon('fa5s.download', color='#8ab4f8'))
+        self.download_btn.clicked.connect(self.choose_download)
+        btn_layout.addWidget(self.download_btn)
+        btn_layout.addStretch(1)
+        layout.addLayout(btn_layout)
+        self.transfers_view = QTableWidget(0, 5)
+        self.transfers_view.setHorizontalHeaderLabels(["Fichier", "Progression", "Débit", "Reste", "État"])
+        self.transfers_view.verticalHeader().setVisible(False)
+        self.transfers_view.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.transfers_view.setSelectionBehavior(QTableWidget.SelectRows)
+        self.transfers_view.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.transfers_view.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.transfers_view.customContextMenuRequested.connect(self.transfer_menu)
+        layout.addWidget(self.transfers_view, 2)
+        self.status_label = QLabel()
+        self.status_label.setStyleSheet("QLabel { color: #9aa4b2; font-size: 12px; font-weight: normal; }")
+        layout.addWidget(self.status_label)
+        self.setLayout(layout)
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.update_transfers)
+
+    def attach(self, transport, server):
+        self.detach()
+        self.server = server
+        self.queue = TransferQueue(transport, server)
+        self.timer.start(500)
+        self.list_dir(self.path or '.')
+
+    def detach(self):
+        queue, self.queue = self.queue, None
+        if queue is not None:
+            queue.close()
+            self.update_transfers()
+
+    def list_dir(self, path):
+        queue = self.queue
+        if queue is None:
+            return
+        self.status_label.setText("Chargement...")
+
+        def run():
+            try:
+                with queue.control() as client:
+                    path_real = client.normalize(path)
+                    attrs = client.listdir_attr(path_real)
+                entries = [(a.filename, stat.S_ISDIR(a.st_mode or 0), a.st_size or 0, a.st_mtime or 0) for a in attrs]
+                entries.sort(key=lambda e: (not e[1], e[0].lower()))
+                self.worker.listed.emit(path_real, entries, '')
+            except Exception as e:
+                self.worker.listed.emit(path, [], str(e) or e.__class__.__name__)
+        threading.Thread(target=run, daemon=True).start()
+
+    def on_listed(self, path, entries, error):
+        if error:
+            self.status_label.setText(f"Erreur : {error}")
+            return
+        self.path = path
+        self.path_input.setText(path)
+        self.listing.clear()
+        items = []
+        for name, is_dir, size, mtime in entries:
+            item = QTreeWidgetItem([name + ('/' if is_dir else ''), '' if is_dir else format_size(size),
+                                    time.strftime('%Y-%m-%d %H:%M', time.localtime(mtime))])
+            item.setData(0, Qt.UserRole, (name, is_dir))
+            item.setTextAlignment(1, Qt.AlignRight | Qt.AlignVCenter)
+            items.append(item)
+        self.listing.addTopLevelItems(items)
+        self.status_label.setText(f"{len(entries)} éléments")
+
+    def open_item(self, item):
+        name, is_dir = item.data(0, Qt.UserRole)
+        if is_dir:
+            self.list_dir(posixpath.join(self.path, name))
+
+    def selected_entries(self):
+        return [item.data(0, Qt.UserRole) for item in self.listing.selectedItems()]
+
+    def upload(self, paths, target):
+        if self.queue is None:
+            return
+        for path in paths:
+            remote = posixpath.join(target, os.path.basename(path.rstrip('/\\')))
+            if os.path.isdir(path):
+                self.queue.add_tree(True, path, remote)
+            elif os.path.isfile(path):
+                self.queue.add(True, path, remote)
+        self.update_transfers()
+
+    def download(self, entries, folder):
+        if self.queue is None:
+            return []
+        for name, is_dir in entries:
+            remote = posixpath.join(self.path, name)
+            if is_dir:
+                self.queue.add_tree(False, os.path.join(folder, name), remote)
+            else:
+                self.queue.add(False, os.path.join(folder, name), remote)
+        self.update_transfers()
+        return [os.path.join(folder, name) for name, _ in entries]
 
-        # Liste verticale des serveurs à gauche
-        self.server_list = QListWidget()
-        self.server_list.setFixedWidth(210)
-        self.server_list.addItem("+ Nouveau serveur")
-        for s in self.servers:
-            label = f"{s['user']}@{s['host']}:{s['port']}"
-            self.server_list.addItem(label)
-        self.server_list.currentRowChanged.connect(self.on_server_selected)
-        self.server_list.setStyleSheet("""
-            QListWidget {
-                background: #23272e;
-                color: #e0e0e0;
-                border: 1px solid #444;
-                border-radius: 8px;
-                font-size: 15px;
-            }
-            QListWidget::item:selected {
-                background: #3a4250;
-                color: #8ab4f8;
-            }
+    def choose_upload(self):
+        paths, _ = QFileDialog.getOpenFileNames(self, "Envoyer vers " + (self.path or '.'))
+        self.upload(paths, self.path)
+
+    def choose_download(self):
+        entries = self.selected_entries()
+        if not entries:
+            self.status_label.setText("Sélectionnez des fichiers à télécharger.")
+            return
+        folder = QFileDialog.getExistingDirectory(self, "Télécharger dans")
+        if folder:
+            self.download(entries, folder)
+
+    def fetch_for_drag(self, entries):
+        # Dépôt sur le bureau : téléchargement dans un dossier temporaire,
+        # attendu avant de rendre la main au gestionnaire de fichiers
+        import tempfile
+        queue = self.queue
+        if queue is None:
+            return []
+        folder = tempfile.mkdtemp(prefix='ssgui-')
+        paths = self.download(entries, folder)
+        progress = QProgressDialog("Téléchargement...", "Annuler", 0, 100, self)
+        progress.setWindowModality(Qt.WindowModal)
+        progress.setMinimumDuration(300)
+        while True:
+            transfers = [t for t in queue.transfers if t.local.startswith(folder)]
+            if not queue.walking and all(t.finished or t.stopped for t in transfers):
+                break
+            total = sum(t.size for t in transfers) or 1
+            progress.setValue(int(100 * sum(t.done for t in transfers) / total))
+            QApplication.processEvents()
+            if progress.wasCanceled():
+                for transfer in transfers:
+                    transfer.stop("Annulé")
+                progress.close()
+                return []
+            time.sleep(0.02)
+        progress.close()
+        return paths
+
+    def update_transfers(self):
+        queue = self.queue
+        if queue is not None:
+            with queue.cond:
+                new = [t for t in queue.transfers if t not in self.rows]
+            for transfer in new:
+                row = self.transfers_view.rowCount()
+                self.transfers_view.insertRow(row)
+                self.rows[transfer] = row
+                arrow = "↑ " if transfer.upload else "↓ "
+                self.transfers_view.setItem(row, 0, QTableWidgetItem(arrow + transfer.name))
+                bar = QProgressBar()
+                bar.setRange(0, 1000)
+                self.transfers_view.setCellWidget(row, 1, bar)
+        now = time.monotonic()
+        running = 0
+        total_rate = 0.0
+        total_left = 0
+        for transfer, row in self.rows.items():
+            bar = self.transfers_view.cellWidget(row, 1)
+            bar.setValue(int(1000 * transfer.done / transfer.size) if transfer.size else (1000 if transfer.finished else 0))
+            then, done, rate = self.rates.get(transfer, (now, transfer.done, 0.0))
+            if now > then:
+                rate = 0.7 * rate + 0.3 * (transfer.done - done) / (now - then)
+            self.rates[transfer] = (now, transfer.done, rate)
+            active = not transfer.finished and not transfer.stopped
+            left = transfer.size - transfer.done
+            self.set_cell(row, 2, f"{format_size(rate)}/s" if active and rate > 0 else "")
+            self.set_cell(row, 3, format_duration(left / rate) if active and rate > 1 else "")
+            self.set_cell(row, 4, transfer.status)
+            if active:
+                running += 1
+                total_rate += rate
+                total_left += left
+        if running:
+            eta = f", reste {format_duration(total_left / total_rate)}" if total_rate > 1 else ""
+            self.status_label.setText(f"{running} transfert(s) en cours, {format_size(total_rate)}/s{eta}")
+        elif self.running:
+            self.status_label.setText("Transferts terminés")
+        self.running = running
+
+    def set_cell(self, row, col, text):
+        item = self.transfers_view.item(row, col)
+        if item is None:
+            self.transfers_view.setItem(row, col, QTableWidgetItem(text))
+        elif item.text() != text:
+            item.setText(text)
+
+    def transfer_menu(self, pos):
+        selected = {index.row() for index in self.transfers_view.selectionModel().selectedRows()}
+        transfers = [t for t, row in self.rows.items() if row in selected]
+        menu = QMenu(self)
+        cancel = menu.addAction("Annuler")
+        cancel.setEnabled(any(not t.finished and not t.stopped for t in transfers))
+        resume = menu.addAction("Reprendre")
+        resume.setEnabled(self.queue is not None and any(t.stopped for t in transfers))
+        clear = menu.addAction("Retirer les transferts terminés")
+        action = menu.exec_(self.transfers_view.viewport().mapToGlobal(pos))
+        if action is cancel:
+            for transfer in transfers:
+                transfer.stop("Annulé")
+        elif action is resume:
+            for transfer in transfers:
+                if transfer.stopped:
+                    self.queue.restart(transfer)
+        elif action is clear:
+            for transfer, row in sorted(self.rows.items(), key=lambda item: -item[1]):
+                if transfer.finished:
+                    self.transfers_view.removeRow(row)
+                    if self.queue is not None:
+                        with self.queue.cond:
+                            if transfer in self.queue.transfers:
+                                self.queue.transfers.remove(transfer)
+            remaining = [t for t, _ in sorted(self.rows.items(), key=lambda item: item[1]) if not t.finished]
+            self.rows = {t: row for row, t in enumerate(remaining)}
+            self.rates = {t: self.rates[t] for t in remaining if t in self.rates}
+        self.update_transfers()
+
+class TunnelPanel(QWidget):
+    # Redirections de ports de la connexion (L, R, D comme ssh) : règles
+    # enregistrées par serveur, connexions en cours et débit de chaque
+    # tunnel. Le TunnelSet est partagé par les onglets du même serveur.
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        import qtawesome as qta
+        self.tunnels = None
+        self.server = None  # (host, user, port) pour enregistrer les règles
+        self.rates = {}  # tunnel -> (instant, envoyés, reçus, débit ↑, débit ↓)
+        self.setStyleSheet("""
+            QLineEdit { background: #23272e; color: #e0e0e0; border-radius: 6px; padding: 4px 8px; font-size: 13px; }
+            QTableWidget { background: #1e1e1e; color: #e0e0e0; border: 1.5px solid #23272e; border-radius: 8px; font-size: 13px; }
+            QHeaderView::section { background: #23272e; color: #8ab4f8; border: none; padding: 4px; }
+            QPushButton { background: #23272e; color: #e0e0e0; border-radius: 6px; font-size: 13px; padding: 4px 8px; }
+            QPushButton:hover { background: #3a4250; color: #8ab4f8; }
         """)
-        main_layout.addWidget(self.server_list)
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        rule_layout = QHBoxLayout()
+        self.rule_input = QLineEdit()
+        self.rule_input.setPlaceholderText("L 8080:localhost:80, R 9000:localhost:3000 ou D 1080")
+        self.rule_input.setToolTip("Locale (L), distante (R) ou SOCKS5 (D), comme ssh -L, -R et -D")
+        self.rule_input.returnPressed.connect(self.add_rule)
+        rule_layout.addWidget(self.rule_input)
+        self.add_btn = QPushButton(" Ajouter")
+        self.add_btn.setIcon(qta.icon('fa5s.plus', color='#8ab4f8'))
+        self.add_btn.clicked.connect(self.add_rule)
+        rule_layout.addWidget(self.add_btn)
+        layout.addLayout(rule_layout)
+        self.tunnels_view = QTableWidget(0, 6)
+        self.tunnels_view.setHorizontalHeaderLabels(["Redirection", "Écoute", "Connexions", "↑ Débit", "↓ Débit", "État"])
+        self.tunnels_view.verticalHeader().setVisible(False)
+        self.tunnels_view.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.tunnels_view.setSelectionBehavior(QTableWidget.SelectRows)
+        self.tunnels_view.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.tunnels_view.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.tunnels_view.customContextMenuRequested.connect(self.tunnel_menu)
+        layout.addWidget(self.tunnels_view)
+        self.status_label = QLabel()
+        self.status_label.setStyleSheet("QLabel { color: #9aa4b2; font-size: 12px; font-weight: normal; }")
+        layout.addWidget(self.status_label)
+        self.setLayout(layout)
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.update_tunnels)
 
-        # Formulaire à droite
-        form_widget = QWidget()
-        form_layout = QFormLayout()
-        form_layout.setLabelAlignment(Qt.AlignRight)
+    def attach(self, transport, server, rules):
+        self.detach()
+        self.server = server
+        self.tunnels = TunnelSet.acquire(transport, rules)
+        self.update_tunnels()
 
-        self.host_input = QLineEdit()
-        self.user_input = QLineEdit()
-        self.pass_input = QLineEdit()
-        self.pass_input.setEchoMode(QLineEdit.Password)
-        self.port_input = QLineEdit()
-        self.port_input.setPlaceholderText("22")
-        self.remember_pass = QPushButton("Retenir le mot de passe")
-        self.remember_pass.setCheckable(True)
-        self.remember_pass.setStyleSheet("QPushButton:checked { background: #4e8cff; color: #fff; }")
+    def detach(self):
+        tunnels, self.tunnels = self.tunnels, None
+        if tunnels is not None:
+            TunnelSet.release(tunnels)
+        self.rates = {}
+        self.tunnels_view.setRowCount(0)
 
-        form_layout.addRow("Hôte :", self.host_input)
-        form_layout.addRow("Utilisateur :", self.user_input)
-        form_layout.addRow("Mot de passe :", self.pass_input)
-        form_layout.addRow("Port :", self.port_input)
-        form_layout.addRow(self.remember_pass)
+    def showEvent(self, event):
+        super().showEvent(event)
+        # Compteurs rafraîchis seulement quand le panneau est visible
+        self.timer.start(1000)
+        self.update_tunnels()
 
-        btn_layout = QHBoxLayout()
-        self.connect_btn = QPushButton("Connexion")
-        self.cancel_btn = QPushButton("Annuler")
-        self.connect_btn.clicked.connect(self.accept)
-        self.cancel_btn.clicked.connect(self.reject)
-        btn_layout.addWidget(self.connect_btn)
-        btn_layout.addWidget(self.cancel_btn)
-        form_layout.addRow(btn_layout)
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.timer.stop()
 
-        form_widget.setLayout(form_layout)
-        main_layout.addWidget(form_widget)
+    def add_rule(self):
+        if self.tunnels is None:
+            self.status_label.setText("Non connecté.")
+            return
+        try:
+            rule = parse_forward(self.rule_input.text())
+        except ValueError as e:
+            self.status_label.setText(str(e).capitalize())
+            return
+        if rule['spec'] in self.tunnels.specs():
+            self.status_label.setText("Cette redirection existe déjà.")
+            return
+        self.tunnels.add(rule)
+        self.rule_input.clear()
+        self.save_rules()
+        self.update_tunnels()
 
-        global_layout.addLayout(main_layout)
-        self.setLayout(global_layout)
-        self.server_list.setCurrentRow(0)
+    def save_rules(self):
+        # Serveur absent de l'inventaire : règles gardées pour la session
+        try:
+            ServerStore.shared().set_forwards(*self.server, self.tunnels.specs())
+        except Exception:
+            pass
 
-    def on_server_selected(self, idx):
-        if idx > 0 and idx <= len(self.servers):
-            s = self.servers[idx-1]
-            self.host_input.setText(s['host'])
-            self.user_input.setText(s['user'])
-            self.port_input.setText(str(s['port']))
-            # Déchiffrer le mot de passe si présent
-            if 'password_fernet' in s:
-                try:
-                    decrypted = self.fernet.decrypt(s['password_fernet'].encode()).decode()
-                    self.pass_input.setText(decrypted)
-                    self.remember_pass.setChecked(True)
-                except Exception:
-                    self.pass_input.clear()
-                    self.remember_pass.setChecked(False)
-            else:
-                self.pass_input.clear()
-                self.remember_pass.setChecked(False)
-        else:
-            self.host_input.clear()
-            self.user_input.clear()
-            self.port_input.clear()
-            self.pass_input.clear()
-            self.remember_pass.setChecked(False)
+    def update_tunnels(self):
+        tunnels = list(self.tunnels.tunnels) if self.tunnels is not None else []
+        if self.tunnels_view.rowCount() != len(tunnels):
+            self.tunnels_view.setRowCount(len(tunnels))
+        now = time.monotonic()
+        connections = 0
+        total_up = total_down = 0.0
+        for row, tunnel in enumerate(tunnels):
+            rule = tunnel.rule
+            then, sent, received, up, down = self.rates.get(tunnel, (now, tunnel.sent, tunnel.received, 0.0, 0.0))
+            if now > then:
+                up = 0.7 * up + 0.3 * (tunnel.sent - sent) / (now - then)
+                down = 0.7 * down + 0.3 * (tunnel.received - received) / (now - then)
+            self.rates[tunnel] = (now, tunnel.sent, tunnel.received, up, down)
+            port = tunnel.port if tunnel.port is not None else rule['port']
+            where = f"serveur:{port}" if rule['kind'] == 'R' else f"{rule['bind']}:{port}"
+            target = f" → {rule['host']}:{rule['host_port']}" if rule['kind'] != 'D' else ''
+            self.set_cell(row, 0, FORWARD_KINDS[rule['kind']] + target, rule['spec'])
+            self.set_cell(row, 1, where)
+            self.set_cell(row, 2, f"{tunnel.connections} ({tunnel.total})")
+            self.set_cell(row, 3, f"{format_size(up)}/s" if up >= 1 else "")
+            self.set_cell(row, 4, f"{format_size(down)}/s" if down >= 1 else "")
+            self.set_cell(row, 5, tunnel.status, f"Dernière erreur : {tunnel.error}" if tunnel.error else '')
+            connections += tunnel.connections
+            total_up += up
+            total_down += down
+        self.rates = {t: self.rates[t] for t in tunnels}
+        if tunnels:
+            self.status_label.setText(f"{len(tunnels)} tunnel(s), {connections} connexion(s), "
+                                      f"↑ {format_size(total_up)}/s ↓ {format_size(total_down)}/s")
+        elif self.tunnels is not None:
+            self.status_label.setText("Aucune redirection.")
 
-    def set_mode(self, mode):
-        self.mode = mode
-        for m, btn in self.mode_btns.items():
-            btn.setChecked(m == mode)
+    def set_cell(self, row, col, text, tip=''):
+        item = self.tunnels_view.item(row, col)
+        if item is None:
+            item = QTableWidgetItem(text)
+            self.tunnels_view.setItem(row, col, item)
+        elif item.text() != text:
+            item.setText(text)
+        if item.toolTip() != tip:
+            item.setToolTip(tip)
+
+    def tunnel_menu(self, pos):
+        if self.tunnels is None:
+            return
+        selected = {index.row() for index in self.tunnels_view.selectionModel().selectedRows()}
+        tunnels = [t for row, t in enumerate(list(self.tunnels.tunnels)) if row in selected]
+        menu = QMenu(self)
+        remove = menu.addAction("Supprimer")
+        remove.setEnabled(bool(tunnels))
+        copy = menu.addAction("Copier la règle")
+        copy.setEnabled(len(tunnels) == 1)
+        action = menu.exec_(self.tunnels_view.viewport().mapToGlobal(pos))
+        if action is remove:
+            for tunnel in tunnels:
+                self.tunnels.remove(tunnel)
+            self.save_rules()
+        elif action is copy:
+            QApplication.clipboard().setText(tunnels[0].rule['spec'])
+        self.update_tunnels()
+
+# Touches spéciales -> séquences xterm
+CURSOR_KEYS = {
+    Qt.Key_Up: 'A', Qt.Key_Down: 'B', Qt.Key_Right: 'C', Qt.Key_Left: 'D',
+    Qt.Key_Home: 'H', Qt.Key_End: 'F',
+}
+SPECIAL_KEYS = {
+    Qt.Key_Escape: '\x1b', Qt.Key_Backtab: '\x1b[Z',
+    Qt.Key_Insert: '\x1b[2~', Qt.Key_Delete: '\x1b[3~',
+    Qt.Key_PageUp: '\x1b[5~', Qt.Key_PageDown: '\x1b[6~',
+    Qt.Key_F1: '\x1bOP', Qt.Key_F2: '\x1bOQ', Qt.Key_F3: '\x1bOR', Qt.Key_F4: '\x1bOS',
+    Qt.Key_F5: '\x1b[15~', Qt.Key_F6: '\x1b[17~', Qt.Key_F7: '\x1b[18~', Qt.Key_F8: '\x1b[19~',
+    Qt.Key_F9: '\x1b[20~', Qt.Key_F10: '\x1b[21~', Qt.Key_F11: '\x1b[23~', Qt.Key_F12: '\x1b[24~',
+}
 
 class SSHInteractiveClient(QWidget):
-    def __init__(self, dialog=None, parent=None):
+    activity = pyqtSignal()  # sortie reçue pendant l'hibernation
+
+    def __init__(self, dialog=None, parent=None, restore=None, history=None):
         super().__init__(parent)
         self.setWindowTitle("SSGui")
         self.setWindowIcon(QIcon(resource_path('icon.png')))
@@ -262,7 +3212,7 @@ class SSHInteractiveClient(QWidget):
                 font-size: 16px;
                 font-weight: bold;
             }
-            QTextEdit {
+            QTextEdit, QPlainTextEdit {
                 background-color: #181a20;
                 color: #e0e0e0;
                 border: 1.5px solid #23272e;
@@ -272,25 +3222,59 @@ class SSHInteractiveClient(QWidget):
                 selection-background-color: #2d333b;
                 selection-color: #f0f0f0;
             }
-            QTextEdit:focus {
+            QTextEdit:focus, QPlainTextEdit:focus {
                 border: 1.5px solid #4e8cff;
             }
         """)
-        self.client = None
+        self.transport = None
+        self.connect_task = None
         self.shell = None
         self.connected = False
         self.worker = Worker()
         self.worker.output_ready.connect(self.append_output)
-        self.terminal_buffer = ""
-        self.cursor_visible = True
-        self.cursor_char = '█'
+        self.worker.output_pending.connect(self.schedule_render)
+        self.output = OutputQueue()
+        self.fast_scroll = False
+        self.draining = False
+        self.last_frame = 0.0
+        self.frame_timer = QTimer(self)
+        self.frame_timer.setSingleShot(True)
+        self.frame_timer.timeout.connect(self.render_frame)
+        self.dormant = False
+        self.activity_seen = False
+        self.release_timer = QTimer(self)
+        self.release_timer.setSingleShot(True)
+        self.release_timer.timeout.connect(lambda: self.dormant and self.renderer.release())
+        self.worker.session_closed.connect(self.on_session_closed)
+        self.worker.connect_progress.connect(self.on_connect_progress)
+        self.worker.connect_done.connect(self.on_connected)
+        self.worker.connect_failed.connect(self.on_connect_failed)
+        self.worker.paste_progress.connect(self.on_paste_progress)
+        self.writer = None
+        self.logger = None
+        self.stats = PerfStats()
+        self.stats_timer = QTimer(self)
+        self.stats_timer.timeout.connect(self.update_stats)
+        self.stats_timer.start(int(STATS_INTERVAL * 1000))
+        self.host, self.user, self.port = '', '', 22
+        self.keepalive = KEEPALIVE_INTERVAL
+        self.profile = 'standard'
+        self.reconnecting = False
+        self.reconnect_delay = RECONNECT_DELAY_MIN
+        self.notices = set()  # lignes d'état écrites par le client
+        self.reconnect_timer = QTimer(self)
+        self.reconnect_timer.setSingleShot(True)
+        self.reconnect_timer.timeout.connect(self.reconnect)
         self.init_ui()
-        if dialog is not None:
-            self.connect_ssh(dialog)
+        if restore is not None:
+            self.open_session(**restore)
+        elif dialog is not None:
+            self.connect_ssh(dialog, history)
         else:
             self.show_connection_dialog()
 
     def init_ui(self):
+        import qtawesome as qta
         layout = QVBoxLayout()
         # Logo et titre SSGui en haut (centré)
         logo_title_layout = QHBoxLayout()
@@ -322,19 +3306,151 @@ class SSHInteractiveClient(QWidget):
         self.clear_btn.setStyleSheet("QPushButton { background: #23272e; color: #e0e0e0; border-radius: 6px; font-size: 14px; } QPushButton:hover { background: #3a4250; color: #8ab4f8; }")
         self.clear_btn.clicked.connect(self.handle_clear)
         btn_layout.addWidget(self.clear_btn, alignment=Qt.AlignLeft)
+        self.fast_btn = QPushButton(" Rapide")
+        self.fast_btn.setFixedWidth(120)
+        self.fast_btn.setCheckable(True)
+        self.fast_btn.setToolTip("Défilement rapide : n'affiche que le dernier état de l'écran pendant un flot de sortie")
+        self.fast_btn.setIcon(qta.icon('fa5s.forward', color='#8ab4f8'))
+        self.fast_btn.setStyleSheet("QPushButton { background: #23272e; color: #e0e0e0; border-radius: 6px; font-size: 14px; } QPushButton:hover { background: #3a4250; color: #8ab4f8; } QPushButton:checked { background: #4e8cff; color: #fff; }")
+        self.fast_btn.toggled.connect(self.set_fast_scroll)
+        btn_layout.addWidget(self.fast_btn, alignment=Qt.AlignLeft)
+        # Écho local prédictif (liaisons lentes)
+        self.predict_btn = QPushButton(" Écho")
+        self.predict_btn.setFixedWidth(120)
+        self.predict_btn.setToolTip("Écho local prédictif : la frappe s'affiche sans attendre le serveur")
+        self.predict_btn.setIcon(qta.icon('fa5s.bolt', color='#8ab4f8'))
+        self.predict_btn.setCheckable(True)
+        self.predict_btn.setStyleSheet("QPushButton { background: #23272e; color: #e0e0e0; border-radius: 6px; font-size: 14px; } QPushButton:hover { background: #3a4250; color: #8ab4f8; } QPushButton:checked { background: #4e8cff; color: #fff; } QPushButton::menu-indicator { width: 0; }")
+        predict_menu = QMenu(self.predict_btn)
+        self.predict_group = QActionGroup(self)
+        for label, mode in (("Désactivé", 'off'), (f"Liaison lente (écho > {PREDICT_RTT * 1000:.0f} ms)", 'auto'),
+                            ("Toujours", 'on')):
+            action = predict_menu.addAction(label)
+            action.setCheckable(True)
+            action.setData(mode)
+            action.setChecked(mode == PREDICT_MODE)
+            self.predict_group.addAction(action)
+        self.predict_group.triggered.connect(lambda action: self.set_predict_mode(action.data()))
+        self.predict_btn.setMenu(predict_menu)
+        self.predict_btn.setChecked(PREDICT_MODE != 'off')
+        btn_layout.addWidget(self.predict_btn, alignment=Qt.AlignLeft)
+        # Journal de session et ses options
+        self.log_btn = QPushButton(" Journal")
+        self.log_btn.setFixedWidth(120)
+        self.log_btn.setToolTip(f"Enregistre la sortie brute de la session dans le dossier {LOG_DIR}")
+        self.log_btn.setIcon(qta.icon('fa5s.file-alt', color='#8ab4f8'))
+        self.log_btn.setCheckable(True)
+        self.log_btn.setStyleSheet("QPushButton { background: #23272e; color: #e0e0e0; border-radius: 6px; font-size: 14px; } QPushButton:hover { background: #3a4250; color: #8ab4f8; } QPushButton:checked { background: #4e8cff; color: #fff; } QPushButton::menu-indicator { width: 0; }")
+        log_menu = QMenu(self.log_btn)
+        self.log_action = log_menu.addAction("Enregistrer la session")
+        self.log_action.setCheckable(True)
+        self.log_action.toggled.connect(self.set_logging)
+        self.log_stamp_action = log_menu.addAction("Horodater les lignes")
+        self.log_stamp_action.setCheckable(True)
+        compress_menu = log_menu.addMenu("Compression des fichiers terminés")
+        self.log_compress_group = QActionGroup(self)
+        for label, method in (("Aucune", None), ("gzip", 'gzip'), ("zstd", 'zstd')):
+            action = compress_menu.addAction(label)
+            action.setCheckable(True)
+            action.setData(method)
+            action.setChecked(method == 'gzip')
+            self.log_compress_group.addAction(action)
+        self.log_compress_group.actions()[2].setEnabled(zstd_available())
+        self.log_btn.setMenu(log_menu)
+        btn_layout.addWidget(self.log_btn, alignment=Qt.AlignLeft)
+        # Compteurs de performance et export de trace
+        self.stats_btn = QPushButton(" Stats")
+        self.stats_btn.setFixedWidth(120)
+        self.stats_btn.setToolTip("Compteurs de performance de l'onglet")
+        self.stats_btn.setIcon(qta.icon('fa5s.tachometer-alt', color='#8ab4f8'))
+        self.stats_btn.setCheckable(True)
+        self.stats_btn.setStyleSheet("QPushButton { background: #23272e; color: #e0e0e0; border-radius: 6px; font-size: 14px; } QPushButton:hover { background: #3a4250; color: #8ab4f8; } QPushButton:checked { background: #4e8cff; color: #fff; } QPushButton::menu-indicator { width: 0; }")
+        stats_menu = QMenu(self.stats_btn)
+        self.stats_action = stats_menu.addAction("Afficher les compteurs")
+        self.stats_action.setCheckable(True)
+        self.stats_action.toggled.connect(self.show_stats)
+        stats_menu.addAction("Exporter la trace...").triggered.connect(self.export_trace)
+        self.stats_btn.setMenu(stats_menu)
+        btn_layout.addWidget(self.stats_btn, alignment=Qt.AlignLeft)
+        self.files_btn = QPushButton(" Fichiers")
+        self.files_btn.setFixedWidth(120)
+        self.files_btn.setToolTip("Panneau SFTP : parcourir et transférer des fichiers")
+        self.files_btn.setIcon(qta.icon('fa5s.folder-open', color='#8ab4f8'))
+        self.files_btn.setCheckable(True)
+        self.files_btn.setStyleSheet("QPushButton { background: #23272e; color: #e0e0e0; border-radius: 6px; font-size: 14px; } QPushButton:hover { background: #3a4250; color: #8ab4f8; } QPushButton:checked { background: #4e8cff; color: #fff; }")
+        self.files_btn.toggled.connect(self.toggle_files)
+        btn_layout.addWidget(self.files_btn, alignment=Qt.AlignLeft)
+        self.tunnels_btn = QPushButton(" Tunnels")
+        self.tunnels_btn.setFixedWidth(120)
+        self.tunnels_btn.setToolTip("Redirections de ports locales, distantes et SOCKS")
+        self.tunnels_btn.setIcon(qta.icon('fa5s.exchange-alt', color='#8ab4f8'))
+        self.tunnels_btn.setCheckable(True)
+        self.tunnels_btn.setStyleSheet("QPushButton { background: #23272e; color: #e0e0e0; border-radius: 6px; font-size: 14px; } QPushButton:hover { background: #3a4250; color: #8ab4f8; } QPushButton:checked { background: #4e8cff; color: #fff; }")
+        self.tunnels_btn.toggled.connect(lambda checked: self.tunnels_panel.setVisible(checked))
+        btn_layout.addWidget(self.tunnels_btn, alignment=Qt.AlignLeft)
+        self.find_btn = QPushButton(" Rechercher")
+        self.find_btn.setFixedWidth(120)
+        self.find_btn.setToolTip("Rechercher dans l'historique (Ctrl+Maj+F)")
+        self.find_btn.setIcon(qta.icon('fa5s.search', color='#8ab4f8'))
+        self.find_btn.setStyleSheet("QPushButton { background: #23272e; color: #e0e0e0; border-radius: 6px; font-size: 14px; } QPushButton:hover { background: #3a4250; color: #8ab4f8; }")
+        self.find_btn.clicked.connect(lambda: self.find_bar.open_bar())
+        btn_layout.addWidget(self.find_btn, alignment=Qt.AlignLeft)
+        self.cancel_btn = QPushButton(" Annuler")
+        self.cancel_btn.setFixedWidth(120)
+        self.cancel_btn.setIcon(qta.icon('fa5s.times', color='#ff3333'))
+        self.cancel_btn.setStyleSheet("QPushButton { background: #23272e; color: #e0e0e0; border-radius: 6px; font-size: 14px; } QPushButton:hover { background: #3a4250; color: #8ab4f8; }")
+        self.cancel_btn.clicked.connect(self.cancel_connect)
+        self.cancel_btn.hide()
+        btn_layout.addWidget(self.cancel_btn, alignment=Qt.AlignLeft)
         btn_layout.addStretch(1)
+        # Progression des gros collages
+        self.paste_bar = QProgressBar()
+        self.paste_bar.setFixedWidth(200)
+        self.paste_bar.setRange(0, 100)
+        self.paste_bar.setFormat("Collage %p%")
+        self.paste_bar.setStyleSheet("QProgressBar { background: #23272e; color: #e0e0e0; border-radius: 6px; text-align: center; font-size: 13px; } QProgressBar::chunk { background: #4e8cff; border-radius: 6px; }")
+        self.paste_bar.hide()
+        btn_layout.addWidget(self.paste_bar)
+        self.paste_cancel_btn = QPushButton()
+        self.paste_cancel_btn.setFixedWidth(32)
+        self.paste_cancel_btn.setToolTip("Annuler le collage")
+        self.paste_cancel_btn.setIcon(qta.icon('fa5s.times', color='#ff3333'))
+        self.paste_cancel_btn.setStyleSheet("QPushButton { background: #23272e; border-radius: 6px; } QPushButton:hover { background: #3a4250; }")
+        self.paste_cancel_btn.clicked.connect(self.cancel_paste)
+        self.paste_cancel_btn.hide()
+        btn_layout.addWidget(self.paste_cancel_btn)
         layout.addLayout(btn_layout)
-        self.terminal = QTextEdit()
+        self.terminal = TerminalView()
         self.terminal.setReadOnly(True)
         self.terminal.setFont(QFont("Fira Mono", 11))
-        self.terminal.setStyleSheet("QTextEdit { background-color: #1e1e1e; color: #e0e0e0; }")
+        self.terminal.setStyleSheet("QPlainTextEdit { background-color: #1e1e1e; color: #e0e0e0; }")
         self.terminal.installEventFilter(self)
         self.terminal.setCursorWidth(2)
-        layout.addWidget(self.terminal)
+        self.screen = TerminalScreen()
+        self.renderer = TerminalRenderer(self.terminal, self.screen)
+        self.predictor = EchoPredictor(self.screen)
+        self.renderer.predictor = self.predictor
+        self.terminal.grid_resized.connect(self.resize_terminal)
+        self.find_bar = FindBar(self.terminal, self.renderer)
+        layout.addWidget(self.find_bar)
+        self.files_panel = SftpPanel()
+        self.files_panel.hide()
+        self.tunnels_panel = TunnelPanel()
+        self.tunnels_panel.hide()
+        splitter = QSplitter(Qt.Horizontal)
+        splitter.addWidget(self.terminal)
+        splitter.addWidget(self.files_panel)
+        splitter.addWidget(self.tunnels_panel)
+        splitter.setStretchFactor(0, 3)
+        splitter.setStretchFactor(1, 2)
+        splitter.setStretchFactor(2, 2)
+        layout.addWidget(splitter)
+        self.stats_label = QLabel()
+        self.stats_label.setStyleSheet("QLabel { background: #101014; color: #9aa4b2; font-size: 12px; font-weight: normal; padding: 4px 8px; border-radius: 6px; }")
+        self.stats_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        self.stats_label.hide()
+        layout.addWidget(self.stats_label)
         self.setLayout(layout)
-        self.cursor_timer = QTimer()
-        self.cursor_timer.timeout.connect(self.toggle_cursor)
-        self.cursor_timer.start(500)
 
     def show_connection_dialog(self):
         dialog = ConnectionDialog()
@@ -343,12 +3459,14 @@ class SSHInteractiveClient(QWidget):
         else:
             self.close()
 
-    def connect_ssh(self, dialog):
+    def connect_ssh(self, dialog, history=None):
         host = dialog.host_input.text().strip()
         user = dialog.user_input.text().strip()
         passwd = dialog.pass_input.text()
         port = dialog.port_input.text().strip()
         remember = dialog.remember_pass.isChecked()
+        tags = parse_tags(dialog.tags_input.text())
+        profile = dialog.profile_input.currentData()
         if not host or not user or not passwd:
             self.show_error("Tous les champs doivent être remplis (sauf port si 22).")
             return
@@ -357,133 +3475,304 @@ class SSHInteractiveClient(QWidget):
         except ValueError:
             self.show_error("Le port doit être un nombre.")
             return
-        self.terminal.clear()
-        self.terminal.append("[*] Connexion SSH en cours...")
-        try:
-            self.client = paramiko.SSHClient()
-            self.client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-            self.client.connect(host, port=port, username=user, password=passwd, timeout=10)
-            self.shell = self.client.invoke_shell()
-            self.connected = True
-            self.terminal.append(f"[+] Connecté à {host}:{port}")
-            threading.Thread(target=self.receive_output, daemon=True).start()
-            self.save_server_entry(host, user, port, passwd, remember)
-        except paramiko.AuthenticationException:
-            self.terminal.append("[!] Authentification échouée.")
-        except paramiko.SSHException as e:
-            self.terminal.append(f"[!] Erreur SSH : {str(e)}")
-        except Exception as e:
-            self.terminal.append(f"[!] Connexion échouée : {str(e)}")
+        self.open_session(host, user, port, passwd, remember, tags, profile, history)
+
+    def open_session(self, host, user, port, passwd, remember, tags, profile, history=None):
+        # history : fin de l'historique d'un onglet restauré, affichée avant
+        # la connexion
+        self.host, self.user, self.port = host, user, port
+        self.passwd, self.remember, self.tags = passwd, remember, tags
+        self.profile = profile
+        self.keepalive = saved_server(host, user, port).get('keepalive', KEEPALIVE_INTERVAL)
+        self.renderer.reset()
+        self.find_bar.restart()
+        if history:
+            self.append_output(history.replace('\n', '\r\n') + "\r\n")
+        self.notice("[*] Connexion SSH en cours...")
+        self.start_connect()
+
+    def start_connect(self):
+        self.cancel_btn.show()
+        self.connect_task = ConnectTask(self.worker, self.host, self.port, self.user, self.passwd,
+                                        self.screen.cols, self.screen.rows, self.keepalive,
+                                        server_profile({'profile': self.profile}))
+        ConnectTask.shared_pool().start(self.connect_task)
+
+    def schedule_reconnect(self):
+        self.notice(f"[*] Reconnexion dans {self.reconnect_delay:.1f} s...")
+        self.cancel_btn.show()
+        self.reconnect_timer.start(int(self.reconnect_delay * 1000))
+        self.reconnect_delay = min(self.reconnect_delay * 2, RECONNECT_DELAY_MAX)
+
+    def reconnect(self):
+        # Même identifiants, historique conservé ; l'écran quitte l'écran
+        # alternatif et les modes de l'ancien shell
+        leave = '\x1b[?1049l' if self.screen.on_alternate else ''
+        self.append_output(leave + "\x1b[?2004l\x1b[!p")
+        self.notice("[*] Reconnexion...")
+        self.start_connect()
 
-    def save_server_entry(self, host, user, port, passwd, remember):
-        # Ajoute ou met à jour le serveur dans le JSON (pas de doublon)
+    def on_connect_progress(self, stage):
+        self.notice(f"[*] {stage}")
+
+    def on_connected(self, transport, shell):
+        if self.connect_task is None:
+            # Annulé entre-temps : on rend le canal et la connexion
+            shell.close()
+            ConnectionManager.shared().release(self.connection_key(), transport)
+            return
+        self.connect_task = None
+        self.cancel_btn.hide()
+        self.reconnecting = False
+        self.reconnect_delay = RECONNECT_DELAY_MIN
+        self.transport = transport
+        self.shell = shell
+        self.connected = True
+        self.writer = InputWriter(shell, self.worker)
+        self.notice(f"[+] Connecté à {self.host}:{self.port}")
+        # Le terminal a pu être redimensionné pendant la connexion
+        self.resize_terminal(*self.terminal.grid_size())
+        self.attach_channel(transport, shell)
+        if self.files_panel.isVisible():
+            self.files_panel.attach(transport, f"{self.user}@{self.host}:{self.port}")
+        # Les redirections enregistrées démarrent avec la session, panneau
+        # affiché ou non
+        self.tunnels_panel.attach(transport, (self.host, self.user, self.port),
+                                  server_forwards(saved_server(self.host, self.user, self.port)))
+        self.save_server_entry(self.host, self.user, self.port, self.passwd, self.remember, self.tags, self.profile)
+
+    def on_connect_failed(self, message, retry):
+        if self.connect_task is None:
+            return
+        self.connect_task = None
+        self.cancel_btn.hide()
+        self.notice(f"[!] {message}")
+        if self.reconnecting and retry:
+            self.schedule_reconnect()
+        else:
+            self.reconnecting = False
+
+    def cancel_connect(self):
+        task, self.connect_task = self.connect_task, None
+        waiting = self.reconnect_timer.isActive()
+        self.reconnect_timer.stop()
+        self.reconnecting = False
+        if task is not None or waiting:
+            if task is not None:
+                task.cancel()
+            self.cancel_btn.hide()
+            self.notice("[!] Connexion annulée.")
+
+    def save_server_entry(self, host, user, port, passwd, remember, tags=None, profile=None):
+        # Ajoute ou remonte le serveur en tête de l'inventaire (une seule ligne écrite)
         try:
-            servers_file = "servers.json"
-            if os.path.exists(servers_file):
-                with open(servers_file, 'r', encoding='utf-8') as f:
-                    servers = json.load(f)
-            else:
-                servers = []
-            entry = {"host": host, "user": user, "port": port}
+            password_fernet = None
             if remember and passwd:
                 # Chiffre le mot de passe
-                dialog = self.findChild(ConnectionDialog)
-                if dialog:
-                    fernet = dialog.fernet
-                else:
-                    with open('.fernet.key', 'rb') as f:
-                        fernet = Fernet(f.read())
-                entry["password_fernet"] = fernet.encrypt(passwd.encode()).decode()
-            # Supprime doublon
-            servers = [s for s in servers if not (s['host'] == host and s['user'] == user and str(s['port']) == str(port))]
-            servers.insert(0, entry)
-            # Max 10 serveurs
-            servers = servers[:10]
-            with open(servers_file, 'w', encoding='utf-8') as f:
-                json.dump(servers, f, indent=2, ensure_ascii=False)
+                password_fernet = load_fernet_key().encrypt(passwd.encode()).decode()
+            ServerStore.shared().record_use(host, user, port, password_fernet, tags, profile)
         except Exception:
             pass
 
-    def receive_output(self):
-        try:
-            while self.connected and self.shell and not self.shell.closed:
-                try:
-                    data = self.shell.recv(4096).decode(errors='ignore')
-                    if data:
-                        self.worker.output_ready.emit(data)
-                except Exception:
-                    pass
-                time.sleep(0.01)
-        except Exception as e:
-            self.worker.output_ready.emit(f"\n[!] Erreur réception : {str(e)}")
-
-    def process_backspaces(self, text):
-        result = []
-        for c in text:
-            if c == '\b' or ord(c) == 127:
-                if result:
-                    result.pop()
-            else:
-                result.append(c)
-        return ''.join(result)
+    def attach_channel(self, transport, shell):
+        # Lecture et envoi par le réacteur partagé (pas de thread par
+        # onglet) ; les rappels tournent dans le thread du réacteur et
+        # décodent l'UTF-8 de façon incrémentale
+        reactor = ChannelReactor.shared()
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        stats = self.stats
+
+        def on_data(data):
+            start = time.perf_counter()
+            logger = self.logger
+            if logger is not None:
+                logger.write(data)
+            text = decoder.decode(data)
+            stats.record_read(start, len(data))
+            if not text:
+                return True
+            first, full = self.output.put(text)
+            if first:
+                self.worker.output_pending.emit()
+            return not full
+
+        def on_closed(reason):
+            tail = decoder.decode(b'', final=True)
+            if tail:
+                self.worker.output_ready.emit(tail)
+            # Canal fermé normalement (exit) ou connexion perdue (transport morte)
+            lost = bool(reason) or not transport.is_active()
+            self.worker.session_closed.emit(reason, lost)
+
+        def on_resume(paused):
+            stats.record_wait(paused)
+            reactor.resume(shell)
+
+        self.output.on_resume = on_resume
+        reactor.add(shell, on_data, on_closed, self.writer)
+
+    def on_session_closed(self, reason, lost):
+        if not self.connected:
+            return  # fermeture demandée par l'utilisateur
+        self.connected = False
+        self.release_connection()
+        if reason:
+            self.notice(f"\r\n[!] Erreur réception : {reason}")
+        elif lost:
+            self.notice("\r\n[!] Connexion perdue.")
+        else:
+            self.notice("\r\n[*] Connexion fermée par le serveur.")
+        if lost:
+            self.reconnecting = True
+            self.schedule_reconnect()
 
     def append_output(self, data):
-        self.terminal_buffer += data
-        clean_text = self.process_backspaces(self.terminal_buffer)
-        if self.cursor_visible:
-            display_text = clean_text + self.cursor_char
+        self.output.put(data)
+        self.schedule_render()
+
+    def notice(self, text):
+        # Message du client, pas du serveur : écarté de l'historique
+        # enregistré avec l'espace de travail
+        self.notices.add(text.strip())
+        self.append_output(text + "\r\n")
+
+    def history_tail(self, count):
+        return [line for line in self.renderer.tail_lines(count) if line not in self.notices]
+
+    def schedule_render(self):
+        # Au plus un rendu par frame, quel que soit le nombre de chunks reçus
+        if not self.frame_timer.isActive():
+            interval = HIDDEN_FRAME_INTERVAL if self.dormant else FRAME_INTERVAL
+            delay = interval - (time.monotonic() - self.last_frame)
+            self.frame_timer.start(max(0, int(delay * 1000)))
+
+    def set_fast_scroll(self, enabled):
+        self.fast_scroll = enabled
+
+    def render_frame(self):
+        start = self.last_frame = time.monotonic()
+        traced = time.perf_counter()
+        backlog = len(self.output)
+        # L'émulateur consomme l'arriéré par tranches tant que le budget de la
+        # frame n'est pas épuisé, puis le document n'est mis à jour qu'une fois.
+        # En défilement rapide (ou après Ctrl-C) le budget est plus large : les
+        # états intermédiaires de l'écran ne sont jamais dessinés, l'historique
+        # reste complet.
+        budget = FAST_FRAME_WORK if self.fast_scroll or self.draining else FRAME_WORK
+        if self.dormant:
+            budget = FRAME_WORK
+            if backlog and not self.activity_seen:
+                self.activity_seen = True
+                self.activity.emit()
+        while len(self.output) and time.monotonic() - start < budget:
+            self.screen.feed(self.output.take(FRAME_SLICE))
+        if backlog:
+            self.predictor.verify(time.monotonic(), len(self.screen.scrolled))
+        if len(self.output):
+            self.schedule_render()
         else:
-            display_text = clean_text
-        self.terminal.setPlainText(display_text)
-        self.terminal.moveCursor(QTextCursor.End)
-        self.terminal.ensureCursorVisible()
-
-    def toggle_cursor(self):
-        # Ne jamais modifier le buffer ici, juste réafficher
-        clean_text = self.process_backspaces(self.terminal_buffer)
-        self.cursor_visible = not self.cursor_visible
-        if self.cursor_visible:
-            display_text = clean_text + self.cursor_char
+            self.draining = False
+            if self.renderer.dormant and not self.dormant:
+                self.renderer.wake()  # rattrapage terminé
+        self.renderer.flush()
+        if self.find_bar.matches and not self.dormant:
+            self.find_bar.update_highlights()
+        self.stats.record_frame(traced, backlog - len(self.output), len(self.output))
+        replies = self.screen.take_replies()
+        if replies:
+            self.send_input(replies.encode())
+
+    def resize_terminal(self, cols, rows):
+        self.predictor.reset()
+        self.renderer.resize(cols, rows)
+        if self.shell and self.connected:
+            try:
+                self.shell.resize_pty(width=cols, height=rows)
+            except Exception:
+                pass
+
+    def send_input(self, data):
+        # Ne bloque jamais : l'envoi est fait par le réacteur partagé
+        if self.writer is not None and self.connected:
+            self.stats.record_send(len(data))
+            self.writer.write(data)
+
+    def paste_text(self, text):
+        if self.writer is None or not self.connected:
+            return
+        if self.screen.bracketed_paste:
+            data = ('\x1b[200~' + text + '\x1b[201~').encode()
+            self.writer.paste(data, b'\x1b[201~')
         else:
-            display_text = clean_text
-        self.terminal.setPlainText(display_text)
-        self.terminal.moveCursor(QTextCursor.End)
-        self.terminal.ensureCursorVisible()
+            data = text.encode()
+            self.writer.paste(data)
+        self.stats.record_send(len(data))
+
+    def on_paste_progress(self, sent, total):
+        if sent >= total:
+            self.paste_bar.hide()
+            self.paste_cancel_btn.hide()
+        elif total > PASTE_CHUNK:
+            self.paste_bar.setValue(sent * 100 // total)
+            self.paste_bar.show()
+            self.paste_cancel_btn.show()
+
+    def cancel_paste(self):
+        if self.writer is not None:
+            self.writer.cancel_paste()
 
     def eventFilter(self, source, event):
         if event.type() == QEvent.KeyPress and source is self.terminal:
+            if event.key() == Qt.Key_F and event.modifiers() == Qt.ControlModifier | Qt.ShiftModifier:
+                self.find_bar.open_bar()
+                return True
             if self.shell and self.connected:
+                self.stats.key_sent()
                 key = event.key()
                 modifiers = event.modifiers()
-                try:
-                    if key in (Qt.Key_Return, Qt.Key_Enter):
-                        self.shell.send(b'\r')
-                    elif key == Qt.Key_Backspace:
-                        self.shell.send(b'\x7f')
-                    elif key == Qt.Key_Tab:
-                        self.shell.send(b'\t')
-                    elif modifiers == Qt.ControlModifier and key == Qt.Key_V:
+                predictor = self.predictor
+                now = time.monotonic()
+                text = event.text()
+                if key == Qt.Key_Backspace:
+                    predictor.erase(now)
+                elif text and text.isprintable():
+                    predictor.type_text(text, now)
+                else:
+                    predictor.barrier(now)
+                if predictor.pending:
+                    self.renderer.flush()  # prédiction affichée sans attendre la frame
+                if key in (Qt.Key_Return, Qt.Key_Enter):
+                    self.send_input(b'\r')
+                elif key == Qt.Key_Backspace:
+                    self.send_input(b'\x7f')
+                elif key == Qt.Key_Tab:
+                    self.send_input(b'\t')
+                elif modifiers == Qt.ControlModifier and key == Qt.Key_V:
+                    clipboard = QApplication.clipboard()
+                    if clipboard is not None:
+                        text = clipboard.text()
+                        if text:
+                            self.paste_text(text)
+                elif modifiers == Qt.ControlModifier and key == Qt.Key_C:
+                    cursor = self.terminal.textCursor()
+                    if cursor.hasSelection():
+                        selected_text = cursor.selectedText()
                         clipboard = QApplication.clipboard()
                         if clipboard is not None:
-                            text = clipboard.text()
-                            if text:
-                                self.shell.send(text.encode())
-                    elif modifiers == Qt.ControlModifier and key == Qt.Key_C:
-                        cursor = self.terminal.textCursor()
-                        if cursor.hasSelection():
-                            selected_text = cursor.selectedText()
-                            clipboard = QApplication.clipboard()
-                            if clipboard is not None:
-                                clipboard.setText(selected_text)
-                        else:
-                            self.shell.send(b'\x03')  # SIGINT
-                    elif 32 <= key <= 126:
-                        self.shell.send(event.text().encode())
-                    return True
-                except Exception as e:
-                    self.worker.output_ready.emit(f"\n[!] Erreur touche : {str(e)}")
-            else:
-                return True
+                            clipboard.setText(selected_text)
+                    else:
+                        self.cancel_paste()  # Ctrl-C interrompt aussi un collage en cours
+                        self.send_input(b'\x03')  # SIGINT
+                        self.draining = True  # vide vite l'arriéré jusqu'au prompt
+                elif key in CURSOR_KEYS:
+                    prefix = '\x1bO' if self.screen.app_cursor else '\x1b['
+                    self.send_input((prefix + CURSOR_KEYS[key]).encode())
+                elif key in SPECIAL_KEYS:
+                    self.send_input(SPECIAL_KEYS[key].encode())
+                elif event.text():
+                    # Caractères imprimables (accents compris) et Ctrl+lettre
+                    self.send_input(event.text().encode())
+            return True
         return super().eventFilter(source, event)
 
     def contextMenuEvent(self, event):
@@ -492,33 +3781,144 @@ class SSHInteractiveClient(QWidget):
             if clipboard is not None:
                 text = clipboard.text()
                 if text:
-                    try:
-                        self.shell.send(text.encode())
-                    except Exception as e:
-                        self.worker.output_ready.emit(f"\n[!] Erreur coller clic droit : {str(e)}")
+                    self.paste_text(text)
             event.accept()
         else:
             super().contextMenuEvent(event)
 
-    def closeEvent(self, event):
+    def set_predict_mode(self, mode):
+        self.predictor.mode = mode
+        if mode == 'off':
+            self.predictor.reset()
+        self.renderer.flush()
+        self.predict_btn.setChecked(mode != 'off')
+
+    def set_logging(self, enabled):
+        # Les options sont lues au démarrage du journal
+        if enabled and self.logger is None:
+            self.logger = SessionLogger(f"{self.user}@{self.host}_{self.port}",
+                                        timestamps=self.log_stamp_action.isChecked(),
+                                        compress=self.log_compress_group.checkedAction().data())
+            self.notice(f"\r\n[*] Journal : {os.path.abspath(LOG_DIR)}")
+        elif not enabled and self.logger is not None:
+            logger, self.logger = self.logger, None
+            logger.close()
+        self.log_btn.setChecked(enabled)
+
+    def update_stats(self):
+        backlog = len(self.output)
+        blocks = self.terminal.document().blockCount()
+        cold = len(self.renderer.scrollback)
+        self.stats.sample(backlog, blocks, cold)
+        if self.stats_label.isVisible():
+            self.stats_label.setText(self.stats.summary(backlog, blocks, cold))
+
+    def show_stats(self, visible):
+        self.stats_label.setVisible(visible)
+        self.stats_btn.setChecked(visible)
+        if visible:
+            self.update_stats()
+
+    def export_trace(self):
+        self.stats_btn.setChecked(self.stats_label.isVisible())
+        name = f"ssgui-trace-{self.host or 'local'}-{time.strftime('%Y%m%d-%H%M%S')}.json"
+        path, _ = QFileDialog.getSaveFileName(self, "Exporter la trace", name, "Trace Chrome (*.json)")
+        if not path:
+            return
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(self.stats.chrome_trace(f"{self.user}@{self.host}:{self.port}"), f, ensure_ascii=False)
+        except OSError as e:
+            self.show_error(f"Export impossible : {e}")
+            return
+        self.notice(f"\r\n[*] Trace exportée : {path} (chrome://tracing ou ui.perfetto.dev)")
+
+    def close_session(self):
+        self.stats_timer.stop()
+        self.set_logging(False)
         self.connected = False
+        self.reconnecting = False
+        self.reconnect_timer.stop()
+        self.output.close()
+        if self.connect_task is not None:
+            task, self.connect_task = self.connect_task, None
+            task.cancel()
+        self.release_connection()
+
+    def release_connection(self):
+        # Ferme seulement le canal de l'onglet ; la connexion partagée n'est
+        # fermée qu'avec son dernier onglet
+        shell, self.shell = self.shell, None
+        transport, self.transport = self.transport, None
+        writer, self.writer = self.writer, None
+        if writer is not None:
+            writer.close()
+            self.on_paste_progress(0, 0)
+        self.files_panel.detach()
+        self.tunnels_panel.detach()
+        if shell is not None:
+            ChannelReactor.shared().remove(shell)
         try:
-            if self.client:
-                self.client.close()
+            if shell:
+                shell.close()
         except:
             pass
+        if transport:
+            ConnectionManager.shared().release(self.connection_key(), transport)
+
+    def connection_key(self):
+        return connection_key(self.user, self.host, self.port, self.passwd)
+
+    def toggle_files(self, checked):
+        self.files_panel.setVisible(checked)
+        if not checked:
+            return
+        if self.connected and self.transport is not None and self.files_panel.queue is None:
+            self.files_panel.attach(self.transport, f"{self.user}@{self.host}:{self.port}")
+
+    def closeEvent(self, event):
+        self.close_session()
         event.accept()
 
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.hibernate()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.wake()
+
+    def hibernate(self):
+        # Onglet caché : ni dessin ni compteurs, l'émulateur suit le flux
+        # par tranches espacées (voir render_frame)
+        if self.dormant or self.output.closed:
+            return
+        self.dormant = True
+        self.activity_seen = False
+        self.predictor.reset()
+        self.renderer.sleep()
+        self.output.set_limit(HIDDEN_BACKLOG_LIMIT)
+        self.stats_timer.stop()
+        self.release_timer.start(RELEASE_DELAY * 1000)
+
+    def wake(self):
+        # L'arriéré est rattrapé au budget rapide sans toucher au document,
+        # puis l'écran final est dessiné en une fois
+        if not self.dormant:
+            return
+        self.dormant = False
+        self.release_timer.stop()
+        self.output.set_limit(BACKLOG_LIMIT)
+        self.stats_timer.start(int(STATS_INTERVAL * 1000))
+        self.draining = True
+        self.frame_timer.stop()
+        self.render_frame()
+
     def show_error(self, message):
         QMessageBox.critical(self, "Erreur", message)
 
     def handle_back(self):
-        self.connected = False
-        try:
-            if self.client:
-                self.client.close()
-        except:
-            pass
+        self.close_session()
         # Ferme juste l'onglet courant
         parent = self.parent()
         while parent and not isinstance(parent, QTabWidget):
@@ -528,10 +3928,260 @@ class SSHInteractiveClient(QWidget):
             parent.removeTab(idx)
 
     def handle_clear(self):
-        self.terminal_buffer = ""
-        self.terminal.clear()
-        if self.shell and self.connected:
-            self.shell.send(b'\r')
+        self.predictor.reset()
+        self.renderer.clear()
+        self.find_bar.restart()
+        self.send_input(b'\r')
+
+class FanOutDialog(QDialog):
+    # Lance la même commande sur plusieurs serveurs enregistrés, au plus
+    # N à la fois, avec un délai maximal par serveur.
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("SSGui - Multi-exécution")
+        self.resize(900, 650)
+        self.setStyleSheet("""
+            QDialog {
+                background: #101014;
+                color: #e0e0e0;
+                font-size: 15px;
+            }
+            QLineEdit, QSpinBox {
+                background: #181a20;
+                color: #e0e0e0;
+                border: 1px solid #444;
+                border-radius: 6px;
+                padding: 6px 8px;
+                font-size: 15px;
+            }
+            QLineEdit:focus, QSpinBox:focus {
+                border: 1.5px solid #4e8cff;
+                background: #23272e;
+            }
+            QLabel {
+                color: #b0b8c0;
+                font-weight: bold;
+            }
+            QPushButton {
+                background: #2d333b;
+                color: #e0e0e0;
+                border: 1px solid #444;
+                border-radius: 6px;
+                padding: 7px 18px;
+                font-size: 15px;
+            }
+            QPushButton:hover {
+                background: #3a4250;
+                border: 1.5px solid #4e8cff;
+            }
+            QPushButton:disabled {
+                color: #666;
+            }
+            QListWidget, QTableWidget {
+                background: #23272e;
+                color: #e0e0e0;
+                border: 1px solid #444;
+                border-radius: 8px;
+                font-size: 14px;
+                gridline-color: #333;
+            }
+            QListWidget::item:selected, QTableWidget::item:selected {
+                background: #3a4250;
+                color: #8ab4f8;
+            }
+            QHeaderView::section {
+                background: #181a20;
+                color: #b0b8c0;
+                border: none;
+                padding: 4px;
+            }
+            QPlainTextEdit {
+                background-color: #181a20;
+                color: #e0e0e0;
+                border: 1px solid #444;
+                border-radius: 8px;
+                font-family: monospace;
+                font-size: 14px;
+            }
+        """)
+        self.store = ServerStore.shared()
+        self.servers = self.store.entries()
+        self.fernet = None
+        self.worker = FanOutWorker()
+        self.worker.host_started.connect(self.on_host_started)
+        self.worker.host_output.connect(self.on_host_output)
+        self.worker.host_done.connect(self.on_host_done)
+        self.pool = QThreadPool(self)
+        self.tasks = []
+        self.outputs = {}
+        self.running = 0
+        self.err_format = QTextCharFormat()
+        self.err_format.setForeground(QColor('#ff7b86'))
+        self.out_format = QTextCharFormat()
+        self.init_ui()
+
+    def init_ui(self):
+        layout = QVBoxLayout()
+        top_layout = QHBoxLayout()
+
+        # Serveurs enregistrés à cocher ; le filtre (ex. "#prod") restreint
+        # l'exécution aux serveurs visibles
+        list_layout = QVBoxLayout()
+        self.filter_input = QLineEdit()
+        self.filter_input.setFixedWidth(240)
+        self.filter_input.setPlaceholderText("Filtrer (#tag, hôte...)")
+        self.filter_input.setClearButtonEnabled(True)
+        self.filter_input.textChanged.connect(self.filter_servers)
+        list_layout.addWidget(self.filter_input)
+        self.server_list = QListWidget()
+        self.server_list.setFixedWidth(240)
+        model = ServerListModel(self.servers)
+        for entry in self.servers:
+            item = QListWidgetItem(model.label(entry))
+            item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+            item.setCheckState(Qt.Checked if entry[5] else Qt.Unchecked)
+            if not entry[5]:
+                item.setToolTip("Pas de mot de passe enregistré")
+            self.server_list.addItem(item)
+        self.search_keys = model.keys
+        list_layout.addWidget(self.server_list)
+        top_layout.addLayout(list_layout)
+
+        form_layout = QFormLayout()
+        form_layout.setLabelAlignment(Qt.AlignRight)
+        self.command_input = QLineEdit()
+        self.command_input.setPlaceholderText("uptime")
+        self.command_input.returnPressed.connect(self.run_command)
+        self.concurrency_input = QSpinBox()
+        self.concurrency_input.setRange(1, 64)
+        self.concurrency_input.setValue(10)
+        self.timeout_input = QSpinBox()
+        self.timeout_input.setRange(1, 3600)
+        self.timeout_input.setValue(30)
+        self.timeout_input.setSuffix(" s")
+        form_layout.addRow("Commande :", self.command_input)
+        form_layout.addRow("Simultanés :", self.concurrency_input)
+        form_layout.addRow("Délai par serveur :", self.timeout_input)
+        btn_layout = QHBoxLayout()
+        self.run_btn = QPushButton("Exécuter")
+        self.stop_btn = QPushButton("Arrêter")
+        self.stop_btn.setEnabled(False)
+        self.run_btn.clicked.connect(self.run_command)
+        self.stop_btn.clicked.connect(self.stop)
+        btn_layout.addWidget(self.run_btn)
+        btn_layout.addWidget(self.stop_btn)
+        form_layout.addRow(btn_layout)
+        form_widget = QWidget()
+        form_widget.setLayout(form_layout)
+        top_layout.addWidget(form_widget)
+        layout.addLayout(top_layout)
+
+        # Résultats par serveur, sortie du serveur sélectionné en dessous
+        self.results = QTableWidget(0, 4)
+        self.results.setHorizontalHeaderLabels(["Serveur", "État", "Code", "Durée"])
+        self.results.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
+        self.results.verticalHeader().setVisible(False)
+        self.results.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.results.setSelectionBehavior(QTableWidget.SelectRows)
+        self.results.setSelectionMode(QTableWidget.SingleSelection)
+        self.results.currentCellChanged.connect(self.show_output)
+        layout.addWidget(self.results)
+        self.output_view = QPlainTextEdit()
+        self.output_view.setReadOnly(True)
+        self.output_view.setLineWrapMode(QPlainTextEdit.NoWrap)
+        self.output_view.document().setUndoRedoEnabled(False)
+        layout.addWidget(self.output_view)
+        self.setLayout(layout)
+
+    def decrypt_password(self, server):
+        if 'password_fernet' in server and self.fernet is None:
+            self.fernet = load_fernet_key()
+        return decrypt_password(server, self.fernet)
+
+    def set_cell(self, row, col, text):
+        self.results.setItem(row, col, QTableWidgetItem(text))
+
+    def filter_servers(self, text):
+        pattern = text.strip().lower()
+        for i, key in enumerate(self.search_keys):
+            self.server_list.item(i).setHidden(bool(pattern) and fuzzy_score(pattern, key) is None)
+
+    def run_command(self):
+        command = self.command_input.text().strip()
+        if not command or self.running:
+            return
+        selected = [self.store.get_by_id(self.servers[i][0]) for i in range(self.server_list.count())
+                    if self.server_list.item(i).checkState() == Qt.Checked
+                    and not self.server_list.item(i).isHidden()]
+        if not selected:
+            return
+        self.tasks = []
+        self.outputs = {}
+        self.output_view.clear()
+        self.results.setRowCount(len(selected))
+        self.pool.setMaxThreadCount(self.concurrency_input.value())
+        timeout = self.timeout_input.value()
+        for row, s in enumerate(selected):
+            self.outputs[row] = []
+            self.set_cell(row, 0, f"{s['user']}@{s['host']}:{s['port']}")
+            self.set_cell(row, 2, "")
+            self.set_cell(row, 3, "")
+            passwd = self.decrypt_password(s)
+            if passwd is None:
+                self.set_cell(row, 1, "Pas de mot de passe enregistré")
+                continue
+            self.set_cell(row, 1, "En attente")
+            task = FanOutTask(self.worker, row, s['host'], int(s['port']), s['user'], passwd,
+                              command, timeout, s.get('keepalive', KEEPALIVE_INTERVAL), server_profile(s))
+            self.tasks.append(task)
+        self.running = len(self.tasks)
+        if self.running:
+            self.run_btn.setEnabled(False)
+            self.stop_btn.setEnabled(True)
+        for task in self.tasks:
+            self.pool.start(task)
+        self.results.setCurrentCell(0, 0)
+
+    def stop(self):
+        for task in self.tasks:
+            task.cancel()
+
+    def on_host_started(self, row):
+        self.set_cell(row, 1, "En cours")
+
+    def on_host_output(self, row, text, is_err):
+        self.outputs[row].append((text, is_err))
+        if row == self.results.currentRow():
+            self.append_output(text, is_err)
+
+    def on_host_done(self, row, code, status, elapsed):
+        self.set_cell(row, 1, status)
+        self.set_cell(row, 2, str(code) if code >= 0 else "")
+        self.set_cell(row, 3, f"{elapsed:.1f} s")
+        if code > 0 or code < 0 and status != "Annulé":
+            self.results.item(row, 1).setForeground(QColor('#ff7b86'))
+        self.running -= 1
+        if self.running == 0:
+            self.run_btn.setEnabled(True)
+            self.stop_btn.setEnabled(False)
+
+    def append_output(self, text, is_err):
+        scrollbar = self.output_view.verticalScrollBar()
+        at_bottom = scrollbar.value() >= scrollbar.maximum()
+        cursor = QTextCursor(self.output_view.document())
+        cursor.movePosition(QTextCursor.End)
+        cursor.insertText(text, self.err_format if is_err else self.out_format)
+        if at_bottom:
+            scrollbar.setValue(scrollbar.maximum())
+
+    def show_output(self, row, *args):
+        self.output_view.clear()
+        for text, is_err in self.outputs.get(row, []):
+            self.append_output(text, is_err)
+
+    def done(self, result):
+        self.stop()
+        super().done(result)
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -604,7 +4254,7 @@ class MainWindow(QMainWindow):
                 background: #23272e;
                 color: #8ab4f8;
             }
-            QTextEdit {
+            QTextEdit, QPlainTextEdit {
                 background-color: #101014;
                 color: #e0e0e0;
                 border: 1.5px solid #23272e;
@@ -614,23 +4264,41 @@ class MainWindow(QMainWindow):
                 selection-background-color: #23272e;
                 selection-color: #f0f0f0;
             }
-        """ % resource_path('cross.png'))
+        """ % resource_path('cross.png').replace('\\', '/'))
+        self.activity_icon = None
+        self.keep_workspace = False
         self.tabs = QTabWidget()
         self.tabs.setTabsClosable(True)
         self.tabs.setMovable(True)
         self.tabs.setDocumentMode(True)
         self.tabs.tabCloseRequested.connect(self.close_tab)
-        self.tabs.currentChanged.connect(self.handle_tab_changed)
         self.setCentralWidget(self.tabs)
+        self.add_fanout_button()
         self.add_plus_tab()
+        self.tabs.currentChanged.connect(self.handle_tab_changed)
         self.tabs.setCurrentIndex(0)
         self.tabs.setElideMode(Qt.ElideNone)
-        # Demande la première connexion immédiatement
-        self.handle_tab_changed(0)
+        # Rouvre les onglets de la dernière fois, sinon demande la première
+        # connexion immédiatement
+        if not self.restore_workspace():
+            self.handle_tab_changed(0)
         # Si aucun onglet SSH n'a été ouvert, ferme la fenêtre
         if self.tabs.count() == 1:
             self.close()
 
+    def add_fanout_button(self):
+        # Pas d'icône qtawesome ici : la fenêtre principale est créée avant le
+        # premier affichage et qtawesome est chargé plus tard
+        fanout_btn = QPushButton("Multi-exécution")
+        fanout_btn.setToolTip("Exécuter une commande sur plusieurs serveurs enregistrés")
+        fanout_btn.setStyleSheet("QPushButton { background: #23272e; color: #e0e0e0; border-radius: 6px; font-size: 14px; padding: 6px 12px; } QPushButton:hover { background: #3a4250; color: #8ab4f8; }")
+        fanout_btn.clicked.connect(self.show_fanout)
+        self.tabs.setCornerWidget(fanout_btn, Qt.TopRightCorner)
+
+    def show_fanout(self):
+        dialog = FanOutDialog(self)
+        dialog.exec_()
+
     def add_plus_tab(self):
         # Onglet + à droite
         plus_widget = QWidget()
@@ -638,30 +4306,112 @@ class MainWindow(QMainWindow):
         self.tabs.setTabToolTip(idx, "Nouvelle connexion SSH")
 
     def handle_tab_changed(self, index):
+        self.tabs.setTabIcon(index, QIcon())
         # Si on clique sur l'onglet +, ouvrir la connexion
         if index == self.tabs.count() - 1:
             dialog = ConnectionDialog()
             if dialog.exec_() == QDialog.Accepted:
                 ssh_client = SSHInteractiveClient(dialog, parent=self)
                 tab_title = f"{dialog.host_input.text()} - {dialog.user_input.text()}"
-                idx = self.tabs.insertTab(self.tabs.count() - 1, ssh_client, tab_title)
+                idx = self.add_session(ssh_client, tab_title, self.tabs.count() - 1)
                 self.tabs.setCurrentIndex(idx)
             else:
                 # Revenir à l'onglet précédent si annulation
                 if self.tabs.count() > 1:
                     self.tabs.setCurrentIndex(0)
 
+    def add_session(self, client, title, index):
+        client.activity.connect(lambda client=client: self.mark_activity(client))
+        return self.tabs.insertTab(index, client, title)
+
+    def restore_workspace(self):
+        # Chaque onglet lance sa connexion dès sa création (pool partagé,
+        # MAX_PARALLEL_CONNECTS à la fois) et devient utilisable dès que la
+        # sienne aboutit ; les serveurs sans mot de passe enregistré sont
+        # demandés ensuite, pendant que les autres se connectent
+        tabs = ServerStore.shared().workspace()
+        if not tabs:
+            return False
+        fernet = None
+        placed = []
+        prompts = []
+        for tab in tabs:
+            server = saved_server(tab['host'], tab['user'], tab['port'])
+            if 'password_fernet' in server and fernet is None:
+                fernet = load_fernet_key()
+            passwd = decrypt_password(server, fernet)
+            if passwd is None:
+                prompts.append((tab, server))
+                continue
+            client = SSHInteractiveClient(parent=self, restore={
+                'host': tab['host'], 'user': tab['user'], 'port': tab['port'],
+                'passwd': passwd, 'remember': True, 'tags': server.get('tags', ''),
+                'profile': server.get('profile'), 'history': tab.get('tail')})
+            self.add_session(client, tab['title'], self.restore_index(placed, tab['position']))
+        for tab, server in prompts:
+            dialog = ConnectionDialog()
+            dialog.fill_server(server or tab)
+            dialog.pass_input.setFocus()
+            if dialog.exec_() == QDialog.Accepted:
+                client = SSHInteractiveClient(dialog, parent=self, history=tab.get('tail'))
+                self.add_session(client, tab['title'], self.restore_index(placed, tab['position']))
+        if not placed:
+            # Toutes les demandes annulées : l'espace de travail enregistré
+            # est gardé pour le prochain lancement
+            self.keep_workspace = True
+            return False
+        self.tabs.setCurrentIndex(0)
+        return True
+
+    def restore_index(self, placed, position):
+        # Onglets restaurés dans leur ordre d'origine, même créés en deux fois
+        index = sum(1 for p in placed if p < position)
+        placed.append(position)
+        return index
+
+    def save_workspace(self):
+        if self.keep_workspace:
+            return
+        tabs = []
+        for index in range(self.tabs.count()):
+            client = self.tabs.widget(index)
+            if isinstance(client, SSHInteractiveClient) and client.host:
+                tail = None
+                if RESTORE_TAIL_LINES > 0:
+                    tail = '\n'.join(client.history_tail(RESTORE_TAIL_LINES))
+                tabs.append((client.host, client.user, client.port, self.tabs.tabText(index), tail))
+        try:
+            ServerStore.shared().save_workspace(tabs)
+        except Exception:
+            pass
+
+    def closeEvent(self, event):
+        self.save_workspace()
+        super().closeEvent(event)
+
+    def mark_activity(self, client):
+        # Pastille sur un onglet caché qui reçoit de la sortie
+        index = self.tabs.indexOf(client)
+        if index < 0 or index == self.tabs.currentIndex():
+            return
+        if self.activity_icon is None:
+            pixmap = QPixmap(12, 12)
+            pixmap.fill(Qt.transparent)
+            painter = QPainter(pixmap)
+            painter.setRenderHint(QPainter.Antialiasing)
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(QColor('#8ab4f8'))
+            painter.drawEllipse(2, 2, 8, 8)
+            painter.end()
+            self.activity_icon = QIcon(pixmap)
+        self.tabs.setTabIcon(index, self.activity_icon)
+
     def close_tab(self, index):
         if index == self.tabs.count() - 1:
             return  # Ne pas fermer l'onglet +
         widget = self.tabs.widget(index)
         if isinstance(widget, SSHInteractiveClient):
-            widget.connected = False
-            try:
-                if widget.client:
-                    widget.client.close()
-            except:
-                pass
+            widget.close_session()
         self.tabs.removeTab(index)
         # Si plus d'onglet SSH (seul le + reste), ferme la fenêtre principale
         if self.tabs.count() == 1:
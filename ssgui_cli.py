@@ -0,0 +1,343 @@
+# Ligne de commande de SSGui (python -m ssgui <commande>) : mêmes serveurs
+# enregistrés, mêmes mots de passe chiffrés et même code de connexion que
+# l'interface, sans Qt.
+#
+#   python -m ssgui list [filtre]
+#   python -m ssgui exec [-j N] [-t secondes] <serveur | #tag> -- <commande>
+#   python -m ssgui shell <serveur> [--log]
+#   python -m ssgui probe <serveur> [--save]
+#   python -m ssgui forward <serveur> [-L ...] [-R ...] [-D ...] [--save]
+import argparse
+import getpass
+import os
+import select
+import shutil
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ssgui_core import (
+    READ_MAX, CONNECT_TIMEOUT, KEEPALIVE_INTERVAL,
+    server_key, ConnectionManager, shared_transport, stream_command,
+    ServerStore, fuzzy_score, decrypt_password, resolve_servers, SessionLogger,
+    PROFILE_LABELS, server_profile, probe_profiles, recommend_profile,
+    FORWARD_KINDS, TunnelSet, parse_forward, server_forwards
+)
+
+# Touches spéciales de la console Windows (msvcrt.getwch après \x00 ou \xe0)
+WINDOWS_KEYS = {
+    'H': '\x1b[A', 'P': '\x1b[B', 'M': '\x1b[C', 'K': '\x1b[D',
+    'G': '\x1b[H', 'O': '\x1b[F', 'R': '\x1b[2~', 'S': '\x1b[3~', 'I': '\x1b[5~', 'Q': '\x1b[6~',
+}
+
+def error_message(e):
+    import paramiko
+    if isinstance(e, paramiko.AuthenticationException):
+        return "Authentification échouée"
+    if isinstance(e, paramiko.SSHException):
+        return f"Erreur SSH : {str(e)}"
+    return f"Connexion échouée : {str(e)}"
+
+def targets(target):
+    servers = resolve_servers(target)
+    if not servers:
+        raise ValueError(f"aucun serveur ne correspond à {target}")
+    return servers
+
+def password_for(server):
+    # Mot de passe enregistré, sinon SSGUI_PASSWORD, sinon demandé
+    name = server_key(server['user'], server['host'], server['port'])
+    passwd = decrypt_password(server)
+    if passwd is None:
+        passwd = os.environ.get('SSGUI_PASSWORD')
+    if passwd is None:
+        if not sys.stdin.isatty():
+            raise ValueError(f"pas de mot de passe enregistré pour {name} (définir SSGUI_PASSWORD)")
+        passwd = getpass.getpass(f"Mot de passe {name} : ")
+    return passwd
+
+def cmd_list(args):
+    pattern = ' '.join(args.filtre).strip().lower()
+    rows = []
+    for entry in ServerStore.shared().entries():
+        server_id, user, host, port, tags, has_password = entry
+        key = f"{user}@{host}:{port} " + ' '.join('#' + t for t in tags.split(',') if t).lower()
+        score = fuzzy_score(pattern, key) if pattern else 0
+        if score is not None:
+            rows.append((-score, len(key), entry))
+    rows.sort(key=lambda row: row[:2])
+    for _, _, (server_id, user, host, port, tags, has_password) in rows:
+        print(f"{server_key(user, host, port):40s} {'*' if has_password else ' '} {tags.replace(',', ', ')}")
+    return 0
+
+def cmd_exec(args):
+    servers = targets(args.cible)
+    command = ' '.join(args.commande)
+    if not command:
+        raise ValueError("commande manquante")
+    passwords = [password_for(server) for server in servers]
+    several = len(servers) > 1
+    lock = threading.Lock()
+
+    def run(server, passwd):
+        name = server_key(server['user'], server['host'], server['port'])
+        pending = {False: '', True: ''}
+
+        def on_output(text, is_err):
+            stream = sys.stderr if is_err else sys.stdout
+            if not several:
+                stream.write(text)
+                stream.flush()
+                return
+            # Plusieurs serveurs : lignes complètes préfixées par l'hôte
+            lines = (pending[is_err] + text).split('\n')
+            pending[is_err] = lines.pop()
+            with lock:
+                for line in lines:
+                    stream.write(f"{server['host']} | {line}\n")
+                stream.flush()
+
+        start = time.perf_counter()
+        try:
+            key, transport = shared_transport(server['host'], server['port'], server['user'], passwd,
+                                              server.get('keepalive', KEEPALIVE_INTERVAL),
+                                              min(args.timeout, CONNECT_TIMEOUT), profile=server_profile(server))
+            try:
+                channel = transport.open_session(timeout=CONNECT_TIMEOUT)
+                code, status = stream_command(channel, command, on_output, start + args.timeout)
+                channel.close()
+            finally:
+                ConnectionManager.shared().release(key, transport)
+        except Exception as e:
+            code, status = -1, error_message(e)
+        for is_err, rest in pending.items():
+            if rest:
+                on_output('\n', is_err)
+        return name, code, status, time.perf_counter() - start
+
+    with ThreadPoolExecutor(max(1, args.parallel)) as pool:
+        results = list(pool.map(run, servers, passwords))
+    if not several:
+        name, code, status, _ = results[0]
+        if code < 0:
+            print(f"ssgui : {name} : {status}", file=sys.stderr)
+            return 255
+        return code
+    for name, code, status, elapsed in results:
+        print(f"{name:40s} {status:24s} {code:4d} {elapsed:6.1f} s", file=sys.stderr)
+    return 0 if all(code == 0 for _, code, _, _ in results) else 1
+
+def attach_posix(channel, logger):
+    import signal
+    import termios
+    import tty
+    stdin = sys.stdin.fileno()
+    out = sys.stdout.buffer
+    saved = termios.tcgetattr(stdin) if os.isatty(stdin) else None
+
+    def on_resize(*args):
+        cols, rows = shutil.get_terminal_size()
+        try:
+            channel.resize_pty(width=cols, height=rows)
+        except Exception:
+            pass
+
+    previous = signal.signal(signal.SIGWINCH, on_resize)
+    inputs = [channel, stdin]
+    try:
+        if saved is not None:
+            tty.setraw(stdin)
+        while True:
+            ready, _, _ = select.select(inputs, [], [])
+            if channel in ready:
+                data = channel.recv(READ_MAX)
+                if not data:
+                    break
+                out.write(data)
+                out.flush()
+                if logger is not None:
+                    logger.write(data)
+            if stdin in ready:
+                data = os.read(stdin, 4096)
+                if data:
+                    channel.sendall(data)
+                else:
+                    # Entrée redirigée terminée : on attend la fin de la sortie
+                    channel.shutdown_write()
+                    inputs = [channel]
+    finally:
+        if saved is not None:
+            termios.tcsetattr(stdin, termios.TCSADRAIN, saved)
+        signal.signal(signal.SIGWINCH, previous)
+
+def attach_windows(channel, logger):
+    import msvcrt
+    os.system('')  # active les séquences VT de la console
+    out = sys.stdout.buffer
+
+    def keyboard():
+        while not channel.closed:
+            ch = msvcrt.getwch()
+            if ch in '\x00\xe0':
+                ch = WINDOWS_KEYS.get(msvcrt.getwch(), '')
+            try:
+                channel.sendall(ch.encode())
+            except Exception:
+                return
+
+    threading.Thread(target=keyboard, daemon=True).start()
+    while True:
+        data = channel.recv(READ_MAX)
+        if not data:
+            break
+        out.write(data)
+        out.flush()
+        if logger is not None:
+            logger.write(data)
+
+def cmd_shell(args):
+    servers = targets(args.cible)
+    if len(servers) > 1:
+        raise ValueError(f"{args.cible} désigne {len(servers)} serveurs, shell n'en ouvre qu'un")
+    server = servers[0]
+    passwd = password_for(server)
+    stage = lambda message: print(f"[*] {message}", file=sys.stderr)
+    try:
+        key, transport = shared_transport(server['host'], server['port'], server['user'], passwd,
+                                          server.get('keepalive', KEEPALIVE_INTERVAL), stage=stage,
+                                          profile=server_profile(server))
+    except Exception as e:
+        print(f"[!] {error_message(e)}", file=sys.stderr)
+        return 255
+    name = server_key(server['user'], server['host'], server['port'])
+    logger = SessionLogger(f"{server['user']}@{server['host']}_{server['port']}") if args.log else None
+    try:
+        channel = transport.open_session(timeout=CONNECT_TIMEOUT)
+        cols, rows = shutil.get_terminal_size()
+        channel.get_pty(term=os.environ.get('TERM', 'xterm-256color'), width=cols, height=rows)
+        channel.invoke_shell()
+        print(f"[+] Connecté à {name}", file=sys.stderr)
+        if os.name == 'nt':
+            attach_windows(channel, logger)
+        else:
+            attach_posix(channel, logger)
+        # -1 : canal fermé sans statut de sortie
+        return max(channel.recv_exit_status(), 0) if channel.exit_status_ready() else 0
+    finally:
+        if logger is not None:
+            logger.close()
+        ConnectionManager.shared().release(key, transport)
+
+def cmd_probe(args):
+    servers = targets(args.cible)
+    if len(servers) > 1:
+        raise ValueError(f"{args.cible} désigne {len(servers)} serveurs, probe n'en mesure qu'un")
+    server = servers[0]
+    passwd = password_for(server)
+
+    def on_result(name, result):
+        if isinstance(result, Exception):
+            print(f"{PROFILE_LABELS[name]:30s} {error_message(result)}")
+        else:
+            connect, rate, algorithms = result
+            print(f"{PROFILE_LABELS[name]:30s} {rate / 1024 / 1024:8.1f} Mo/s {connect * 1000:6.0f} ms  {algorithms}")
+        sys.stdout.flush()
+
+    results = probe_profiles(server['host'], server['port'], server['user'], passwd, on_result=on_result)
+    best = recommend_profile(results)
+    if best is None:
+        print("ssgui : aucune mesure n'a abouti", file=sys.stderr)
+        return 1
+    print(f"Recommandé : {best} ({PROFILE_LABELS[best]})")
+    if args.save:
+        if ServerStore.shared().set_profile(server['host'], server['user'], server['port'], best):
+            print("Profil enregistré.")
+        else:
+            print("ssgui : serveur absent de l'inventaire, profil non enregistré", file=sys.stderr)
+    return 0
+
+def cmd_forward(args):
+    servers = targets(args.cible)
+    if len(servers) > 1:
+        raise ValueError(f"{args.cible} désigne {len(servers)} serveurs, forward n'en redirige qu'un")
+    server = servers[0]
+    rules = {rule['spec']: rule for rule in server_forwards(server)}
+    for kind in 'LRD':
+        for spec in getattr(args, kind) or []:
+            rule = parse_forward(f"{kind} {spec}")
+            rules[rule['spec']] = rule
+    if not rules:
+        raise ValueError("aucune redirection : options -L, -R, -D ou règles enregistrées")
+    passwd = password_for(server)
+    try:
+        key, transport = shared_transport(server['host'], server['port'], server['user'], passwd,
+                                          server.get('keepalive', KEEPALIVE_INTERVAL),
+                                          profile=server_profile(server))
+    except Exception as e:
+        print(f"[!] {error_message(e)}", file=sys.stderr)
+        return 255
+    tunnels = TunnelSet.acquire(transport, rules.values())
+    if args.save and not ServerStore.shared().set_forwards(server['host'], server['user'], server['port'],
+                                                           tunnels.specs()):
+        print("ssgui : serveur absent de l'inventaire, redirections non enregistrées", file=sys.stderr)
+    shown = {}
+    try:
+        # Jusqu'à Ctrl+C ou la perte de la connexion ; chaque changement
+        # d'état d'un tunnel est affiché
+        while transport.is_active():
+            for tunnel in tunnels.tunnels:
+                rule = tunnel.rule
+                port = tunnel.port if tunnel.port is not None else rule['port']
+                line = f"{FORWARD_KINDS[rule['kind']]:9s} {rule['spec']:40s} port {port} : {tunnel.status}"
+                if shown.get(tunnel) != line:
+                    shown[tunnel] = line
+                    print(line, file=sys.stderr)
+            time.sleep(0.5)
+        print("[!] Connexion perdue", file=sys.stderr)
+        return 255
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        TunnelSet.release(tunnels)
+        ConnectionManager.shared().release(key, transport)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m ssgui",
+        description="SSGui en ligne de commande, avec les serveurs enregistrés par l'interface "
+                    "(sans argument : interface graphique).")
+    commands = parser.add_subparsers(dest="command", required=True, metavar="commande")
+    p = commands.add_parser("list", help="liste les serveurs enregistrés (filtre comme la recherche de l'interface)")
+    p.add_argument("filtre", nargs="*")
+    p.set_defaults(func=cmd_list)
+    p = commands.add_parser("exec", help="exécute une commande sur un serveur ou sur tous les serveurs d'un #tag")
+    p.add_argument("cible", help="user@host[:port], hôte enregistré ou #tag")
+    p.add_argument("commande", nargs=argparse.REMAINDER, help="commande distante (après --)")
+    p.add_argument("-j", "--parallel", type=int, default=16, help="serveurs traités en même temps")
+    p.add_argument("-t", "--timeout", type=float, default=300, help="délai maximal par serveur, en secondes")
+    p.set_defaults(func=cmd_exec)
+    p = commands.add_parser("shell", help="ouvre un shell interactif (PTY) sur un serveur")
+    p.add_argument("cible", help="user@host[:port] ou hôte enregistré")
+    p.add_argument("--log", action="store_true", help="journalise la session dans le dossier logs")
+    p.set_defaults(func=cmd_shell)
+    p = commands.add_parser("probe", help="mesure le débit de chaque profil réseau et recommande le meilleur")
+    p.add_argument("cible", help="user@host[:port] ou hôte enregistré")
+    p.add_argument("--save", action="store_true", help="enregistre le profil recommandé pour ce serveur")
+    p.set_defaults(func=cmd_probe)
+    p = commands.add_parser("forward", help="redirige des ports (comme ssh -L, -R, -D) jusqu'à Ctrl+C")
+    p.add_argument("cible", help="user@host[:port] ou hôte enregistré")
+    p.add_argument("-L", action="append", metavar="[adresse:]port:hôte:port", help="port local vers le serveur")
+    p.add_argument("-R", action="append", metavar="[adresse:]port:hôte:port", help="port du serveur vers ce poste")
+    p.add_argument("-D", action="append", metavar="[adresse:]port", help="proxy SOCKS5 local")
+    p.add_argument("--save", action="store_true", help="enregistre les redirections pour ce serveur")
+    p.set_defaults(func=cmd_forward)
+    args = parser.parse_args(argv)
+    if getattr(args, "commande", None) and args.commande[0] == "--":
+        args.commande = args.commande[1:]
+    try:
+        return args.func(args)
+    except ValueError as e:
+        parser.exit(2, f"ssgui : {e}\n")
+    except KeyboardInterrupt:
+        return 130
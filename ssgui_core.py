@@ -0,0 +1,1663 @@
+# Cœur de SSGui, sans interface : inventaire des serveurs (SQLite), mots de
+# passe chiffrés (Fernet), connexions SSH partagées, exécution de commandes
+# et journaux de session. Utilisé par l'interface Qt comme par la ligne de
+# commande (python -m ssgui) ; n'importe ni PyQt5 ni paramiko au chargement.
+import os
+import re
+import stat
+import sys
+import time
+import json
+import posixpath
+import codecs
+import select
+import socket
+import selectors
+import hashlib
+import sqlite3
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+# Taille des lectures sur le canal : grandit pendant les rafales
+READ_MIN = 4096
+READ_MAX = 256 * 1024
+
+CONNECT_TIMEOUT = 10
+
+# Profils de transport SSH, choisis par serveur (colonne profile de
+# servers.db : nom d'un profil ou objet JSON avec les mêmes clés). Les
+# algorithmes listés passent devant ceux de paramiko sans les remplacer ;
+# window et packet valent pour chaque canal, rekey_* pour la connexion.
+TRANSPORT_PROFILES = {
+    'standard': {},
+    'lan': {
+        'ciphers': ['aes128-gcm@openssh.com', 'aes256-gcm@openssh.com', 'aes128-ctr'],
+        'macs': ['hmac-sha2-256-etm@openssh.com', 'hmac-sha2-256'],
+        'window': 16 * 1024 * 1024,
+        'packet': 256 * 1024,
+        'rekey_bytes': 2 ** 32,
+        'rekey_packets': 2 ** 31,
+    },
+    'wan': {
+        'compress': True,
+        'ciphers': ['aes128-gcm@openssh.com', 'aes128-ctr'],
+        'macs': ['hmac-sha2-256-etm@openssh.com', 'hmac-sha2-256'],
+        'window': 8 * 1024 * 1024,
+        'packet': 32 * 1024,
+    },
+}
+PROFILE_LABELS = {
+    'standard': "Standard",
+    'lan': "Réseau local rapide",
+    'wan': "Liaison lente (compression)",
+}
+
+# Mesure des profils : sortie texte de PROBE_COMMAND lue pendant au plus
+# PROBE_SECONDS par profil ; un profil doit battre le standard de
+# PROBE_MARGIN pour être recommandé
+PROBE_BYTES = 32 * 1024 * 1024
+PROBE_COMMAND = f"seq 1 100000000 | head -c {PROBE_BYTES}"
+PROBE_SECONDS = 3.0
+PROBE_MARGIN = 0.1
+
+# Sonde de connexion toutes les KEEPALIVE_INTERVAL secondes (réglable par
+# serveur avec la colonne keepalive de servers.db, 0 pour désactiver) ; sans
+# réponse en DEAD_LINK_TIMEOUT secondes la connexion est considérée morte
+KEEPALIVE_INTERVAL = 10
+DEAD_LINK_TIMEOUT = 5
+
+# Réacteur d'E/S partagé par les onglets : un envoi bloqué par la fenêtre
+# SSH est retenté toutes les WRITE_RETRY secondes ; les sondes keepalive
+# attendent leur réponse dans PROBE_WORKERS threads au plus
+WRITE_RETRY = 0.02
+PROBE_WORKERS = 4
+
+# Redirections de ports (L, R et D comme ssh -L, -R et -D) : relayées par
+# le réacteur sans copie intermédiaire, FORWARD_BUFFER octets au plus en
+# transit par sens et par connexion, fenêtre SSH de FORWARD_WINDOW octets
+# par canal. Les ouvertures de canaux et de connexions, bloquantes, passent
+# par FORWARD_OPENERS threads au plus.
+FORWARD_BUFFER = 128 * 1024
+FORWARD_WINDOW = 16 * 1024 * 1024
+FORWARD_OPENERS = 8
+FORWARD_BACKLOG = 128
+FORWARD_KINDS = {'L': "Locale", 'R': "Distante", 'D': "SOCKS"}
+
+# Journal de session : écrit par blocs depuis un thread dédié, fichier
+# changé tous les LOG_MAX_BYTES octets ou LOG_MAX_AGE secondes
+LOG_DIR = "logs"
+LOG_MAX_BYTES = 50 * 1024 * 1024
+LOG_MAX_AGE = 24 * 3600
+LOG_FLUSH_INTERVAL = 1.0
+LOG_FLUSH_BYTES = 256 * 1024
+LOG_BACKLOG_LIMIT = 16 * 1024 * 1024
+
+# Transferts SFTP : chaque fichier est découpé en blocs de SFTP_CHUNK
+# octets répartis entre SFTP_WORKERS canaux (fenêtre SSH de SFTP_WINDOW
+# octets), avec des requêtes de SFTP_BLOCK octets pipelinées. Les blocs
+# terminés sont notés dans TRANSFER_DIR pour reprendre un transfert
+# interrompu ; le fichier n'est renommé qu'une fois complet.
+SFTP_CHUNK = 8 * 1024 * 1024
+SFTP_WORKERS = 4
+SFTP_WINDOW = 64 * 1024 * 1024
+SFTP_BLOCK = 32 * 1024
+PART_SUFFIX = ".ssgui-part"
+TRANSFER_DIR = "transfers"
+
+def server_key(user, host, port):
+    return f"{user}@{host}:{port}"
+
+def connection_key(user, host, port, passwd):
+    # Une connexion n'est réutilisée qu'avec le même mot de passe : un onglet
+    # ouvert avec un mauvais mot de passe ne doit pas hériter d'une session
+    return server_key(user, host, port), hashlib.sha256(passwd.encode()).hexdigest()
+
+class ConnectionManager:
+    # Une seule Transport SSH par serveur (user@host:port) : les onglets
+    # suivants y ouvrent simplement un nouveau canal. La Transport est fermée
+    # quand son dernier utilisateur la rend.
+    instance = None
+
+    @classmethod
+    def shared(cls):
+        if cls.instance is None:
+            cls.instance = cls()
+        return cls.instance
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.transports = {}  # clé -> [transport, nombre d'utilisateurs]
+        self.key_locks = {}
+
+    def key_lock(self, key):
+        # Deux onglets vers le même serveur : le second attend le premier
+        # pour réutiliser sa connexion au lieu d'en ouvrir une autre
+        with self.lock:
+            return self.key_locks.setdefault(key, threading.Lock())
+
+    def acquire(self, key):
+        with self.lock:
+            entry = self.transports.get(key)
+            if entry is None:
+                return None
+            if not entry[0].is_active():
+                del self.transports[key]
+                return None
+            entry[1] += 1
+            return entry[0]
+
+    def add(self, key, transport, keepalive=KEEPALIVE_INTERVAL):
+        with self.lock:
+            self.transports[key] = [transport, 1]
+        if keepalive:
+            ChannelReactor.shared().watch(transport, keepalive)
+
+    def release(self, key, transport):
+        with self.lock:
+            entry = self.transports.get(key)
+            if entry is not None and entry[0] is transport:
+                entry[1] -= 1
+                if entry[1] > 0:
+                    return
+                del self.transports[key]
+        try:
+            transport.close()
+        except Exception:
+            pass
+
+class ReactorStream:
+    # Canal inscrit au réacteur : rappels du propriétaire et tranche en
+    # cours d'envoi
+    def __init__(self, channel, on_data, on_closed, writer):
+        self.channel = channel
+        self.on_data = on_data
+        self.on_closed = on_closed
+        self.writer = writer
+        self.paused = False
+        self.out = b''
+        self.progress = None
+        self.fd = None  # descripteur inscrit : un canal fermé par close() en change
+
+class Tunnel:
+    # Règle de redirection en service et ses compteurs, tenus par le
+    # réacteur et lus tels quels par l'interface
+    def __init__(self, rule, owner):
+        self.rule = rule
+        self.owner = owner
+        self.listener = None
+        self.port = None  # port réellement écouté (règle avec port 0)
+        self.status = "Démarrage..."
+        self.error = ''  # dernière connexion refusée
+        self.relays = set()
+        self.connections = 0
+        self.total = 0
+        self.sent = 0  # octets vers le serveur
+        self.received = 0
+        self.closed = False
+
+class Relay:
+    # Connexion redirigée : socket local et canal SSH, avec la tranche en
+    # attente dans chaque sens. Un côté n'est lu que lorsque l'autre a tout
+    # envoyé, ce qui borne la mémoire et propage la contre-pression.
+    def __init__(self, tunnel, sock=None, channel=None, peer=None):
+        self.tunnel = tunnel
+        self.sock = sock
+        self.channel = channel
+        self.peer = peer
+        self.sock_events = 0
+        self.channel_events = 0
+        self.buffer = None
+        self.up = None  # memoryview en attente vers le canal
+        self.down = None  # memoryview en attente vers le socket
+        self.sock_eof = False
+        self.channel_eof = False
+        self.socks = None  # poignée de main SOCKS en cours
+        self.greeted = False
+        self.opening = False
+        self.closed = False
+
+class ChannelReactor:
+    # Un seul thread pour les canaux de tous les onglets. Il attend dans
+    # select sur les fileno() des canaux paramiko, lit ce qui arrive et le
+    # remet au propriétaire. Il vide les files d'envoi au rythme de la
+    # fenêtre SSH et programme les sondes keepalive des connexions. Les
+    # rappels tournent dans ce thread et ne doivent pas bloquer ; les autres
+    # threads passent par call(). Sans activité, rien ne se réveille.
+    instance = None
+    instance_lock = threading.Lock()
+
+    @classmethod
+    def shared(cls):
+        with cls.instance_lock:
+            if cls.instance is None:
+                cls.instance = cls()
+            return cls.instance
+
+    def __init__(self):
+        self.selector = selectors.DefaultSelector()
+        self.wakeup_read, self.wakeup_write = socket.socketpair()
+        self.wakeup_read.setblocking(False)
+        self.wakeup_write.setblocking(False)
+        self.selector.register(self.wakeup_read, selectors.EVENT_READ)
+        self.calls = deque()
+        self.streams = {}  # canal -> ReactorStream
+        self.writing = set()  # flux dont l'envoi attend la fenêtre SSH
+        self.watches = []  # [transport, intervalle, échéance, sonde en cours]
+        self.blocked = set()  # relais dont l'envoi attend la fenêtre SSH
+        self.probes = None
+        self.openers = None
+        threading.Thread(target=self.run, name="ssgui-reactor", daemon=True).start()
+
+    def call(self, function, *args):
+        self.calls.append((function, args))
+        self.wakeup()
+
+    def wakeup(self):
+        try:
+            self.wakeup_write.send(b'\0')
+        except OSError:
+            pass  # tampon plein : le réacteur est déjà réveillé
+
+    def add(self, channel, on_data, on_closed, writer=None):
+        # on_data(octets) renvoie False pour suspendre la lecture (file du
+        # propriétaire pleine) jusqu'à resume(canal) ; on_closed(raison) est
+        # appelé une fois, raison vide pour une fin normale
+        self.call(self.attach, ReactorStream(channel, on_data, on_closed, writer))
+
+    def remove(self, channel):
+        self.call(self.detach, channel)
+
+    def resume(self, channel):
+        self.call(self.unpause, channel)
+
+    def want_write(self, channel):
+        self.call(self.start_write, channel)
+
+    def watch(self, transport, interval):
+        self.call(self.watches.append, [transport, interval, time.monotonic() + interval, None])
+
+    def attach(self, stream):
+        channel = stream.channel
+        channel.settimeout(0.0)
+        self.streams[channel] = stream
+        stream.fd = self.selector.register(channel, selectors.EVENT_READ, stream).fd
+        if stream.writer is not None:
+            self.start_write(channel)
+
+    def detach(self, channel):
+        stream = self.streams.pop(channel, None)
+        if stream is not None:
+            self.writing.discard(stream)
+            if not stream.paused:
+                # Par descripteur : le propriétaire a pu fermer le canal, dont
+                # fileno() renverrait un nouveau tube
+                self.selector.unregister(stream.fd)
+        return stream
+
+    def call_failed(self, function, args, error):
+        # Un appel en file qui échoue est rendu à son propriétaire : un flux
+        # est retiré puis fermé avec la raison (comme une erreur de lecture),
+        # un tunnel passe en erreur, une connexion redirigée est coupée
+        reason = str(error) or error.__class__.__name__
+        print(f"ssgui : réacteur, échec de {getattr(function, '__name__', function)} : {reason}",
+              file=sys.stderr)
+        target = args[0] if args else None
+        try:
+            if isinstance(target, Tunnel):
+                target.status = f"Erreur : {reason}"
+            elif isinstance(target, Relay):
+                if not target.closed:
+                    self.relay_close(target)
+            else:
+                stream = target if isinstance(target, ReactorStream) else self.streams.get(target)
+                if stream is not None:
+                    self.drop(stream)
+                    stream.on_closed(reason)
+        except Exception:
+            pass
+
+    def drop(self, stream):
+        # Retrait sans supposer l'état de l'inscription (appel interrompu)
+        if self.streams.get(stream.channel) is stream:
+            del self.streams[stream.channel]
+        self.writing.discard(stream)
+        key = self.selector.get_map().get(stream.fd) if stream.fd is not None else None
+        if key is not None and key.data is stream:
+            self.selector.unregister(stream.fd)
+
+    def unpause(self, channel):
+        stream = self.streams.get(channel)
+        if stream is not None and stream.paused:
+            stream.paused = False
+            stream.fd = self.selector.register(channel, selectors.EVENT_READ, stream).fd
+
+    def start_write(self, channel):
+        stream = self.streams.get(channel)
+        if stream is not None and stream.writer is not None:
+            self.writing.add(stream)
+            self.write(stream)
+
+    def run(self):
+        while True:
+            events = self.selector.select(self.next_timeout(time.monotonic()))
+            # Réveil vidé avant les appels : un appel ajouté pendant leur
+            # traitement laisse son octet pour le tour suivant
+            if any(key.fileobj is self.wakeup_read for key, _ in events):
+                try:
+                    while self.wakeup_read.recv(4096):
+                        pass
+                except OSError:
+                    pass
+            while self.calls:
+                function, args = self.calls.popleft()
+                try:
+                    function(*args)
+                except Exception as e:
+                    self.call_failed(function, args, e)
+            for key, mask in events:
+                if key.fileobj is self.wakeup_read:
+                    continue
+                if isinstance(key.data, Tunnel):
+                    self.accept(key.data)
+                elif isinstance(key.data, Relay):
+                    if not key.data.closed:
+                        self.relay_step(key.data, self.relay_event, key.fileobj, mask)
+                elif self.streams.get(key.fileobj) is key.data and not key.data.paused:
+                    try:
+                        self.read(key.data)
+                    except Exception:
+                        self.detach(key.fileobj)  # propriétaire disparu (fin de l'application)
+            for stream in list(self.writing):
+                try:
+                    self.write(stream)
+                except Exception:
+                    self.writing.discard(stream)
+            for relay in list(self.blocked):
+                self.relay_step(relay, self.relay_flush)
+            self.check_watches(time.monotonic())
+
+    def next_timeout(self, now):
+        # Réveil seulement pour un envoi bloqué par la fenêtre SSH ou pour
+        # une sonde keepalive ; sinon select attend indéfiniment
+        deadlines = []
+        if self.writing or self.blocked:
+            deadlines.append(now + WRITE_RETRY)
+        for transport, interval, due, probe in self.watches:
+            if probe is None:
+                deadlines.append(due)
+            elif probe[0] is not None:
+                deadlines.append(probe[0] + DEAD_LINK_TIMEOUT)
+        return max(0.0, min(deadlines) - now) if deadlines else None
+
+    def read(self, stream):
+        channel = stream.channel
+        chunks = []
+        size = 0
+        reason = None
+        try:
+            while size < READ_MAX:
+                data = channel.recv(READ_MAX - size)
+                if not data:
+                    reason = ''
+                    break
+                chunks.append(data)
+                size += len(data)
+                if not channel.recv_ready():
+                    break
+        except socket.timeout:
+            pass
+        except Exception as e:
+            reason = str(e) or e.__class__.__name__
+        try:
+            if chunks and stream.on_data(b''.join(chunks)) is False and reason is None:
+                stream.paused = True
+                self.selector.unregister(stream.fd)
+        finally:
+            if reason is not None:
+                self.detach(channel)
+                stream.on_closed(reason)
+
+    def write(self, stream):
+        channel = stream.channel
+        try:
+            while True:
+                if not stream.out:
+                    item = stream.writer.next_chunk()
+                    if item is None:
+                        self.writing.discard(stream)
+                        return
+                    stream.out, stream.progress = item
+                    if not stream.out:
+                        stream.writer.chunk_sent(stream.progress)
+                        continue
+                if not channel.send_ready():
+                    return  # fenêtre pleine : nouvel essai après WRITE_RETRY
+                stream.out = stream.out[channel.send(stream.out):]
+                if not stream.out:
+                    stream.writer.chunk_sent(stream.progress)
+        except socket.timeout:
+            pass
+        except Exception as e:
+            self.writing.discard(stream)
+            stream.out = b''
+            stream.writer.send_failed(e)
+
+    def check_watches(self, now):
+        for watch in list(self.watches):
+            transport, interval, due, probe = watch
+            if not transport.is_active():
+                self.watches.remove(watch)
+            elif probe is None:
+                if now >= due:
+                    watch[3] = [None, threading.Event()]
+                    self.probe_pool().submit(self.probe, transport, watch[3])
+            elif probe[1].is_set():
+                watch[2] = now + interval
+                watch[3] = None
+            elif probe[0] is not None and now - probe[0] > DEAD_LINK_TIMEOUT:
+                # Pas de réponse à temps : la transport est fermée et tous
+                # ses canaux se terminent aussitôt
+                self.watches.remove(watch)
+                transport.close()
+
+    def probe_pool(self):
+        if self.probes is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self.probes = ThreadPoolExecutor(PROBE_WORKERS, thread_name_prefix="ssgui-keepalive")
+        return self.probes
+
+    def probe(self, transport, probe):
+        # Thread de sonde : global_request attend la réponse ; le réacteur
+        # mesure le délai depuis probe[0] et ferme la transport s'il expire
+        probe[0] = time.monotonic()
+        self.wakeup()
+        try:
+            transport.global_request('keepalive@openssh.com', wait=True)
+            probe[1].set()
+        except Exception:
+            transport.close()
+        self.wakeup()
+
+    def opener_pool(self):
+        if self.openers is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self.openers = ThreadPoolExecutor(FORWARD_OPENERS, thread_name_prefix="ssgui-forward")
+        return self.openers
+
+    def listen(self, tunnel, sock):
+        if tunnel.closed:
+            sock.close()
+            return
+        tunnel.listener = sock
+        self.selector.register(sock, selectors.EVENT_READ, tunnel)
+
+    def unlisten(self, tunnel, drop):
+        # drop : coupe aussi les connexions en cours (fin de session) ;
+        # sinon elles se terminent d'elles-mêmes, comme avec ssh -O cancel
+        if tunnel.listener is not None:
+            self.selector.unregister(tunnel.listener)
+            tunnel.listener.close()
+            tunnel.listener = None
+        if drop:
+            for relay in list(tunnel.relays):
+                self.relay_close(relay)
+
+    def accept(self, tunnel):
+        for _ in range(FORWARD_BACKLOG):
+            try:
+                sock, peer = tunnel.listener.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                tunnel.error = str(e)
+                return
+            self.relay_accepted(Relay(tunnel, sock=sock, peer=peer[:2]))
+
+    def relay_accepted(self, relay):
+        # Nouvelle connexion : côté local accepté (L, D) ou canal ouvert par
+        # le serveur (R) ; l'autre côté est ouvert par un thread d'ouverture
+        tunnel = relay.tunnel
+        if tunnel.closed:
+            self.relay_close(relay, counted=False)
+            return
+        tunnel.relays.add(relay)
+        tunnel.connections += 1
+        tunnel.total += 1
+        rule = tunnel.rule
+        if rule['kind'] == 'D':
+            relay.socks = b''
+            relay.sock.setblocking(False)
+            self.relay_update(relay)
+        elif rule['kind'] == 'L':
+            self.opener_pool().submit(tunnel.owner.open_channel, relay, rule['host'], rule['host_port'])
+        else:
+            self.opener_pool().submit(tunnel.owner.open_socket, relay, rule['host'], rule['host_port'])
+
+    def relay_opened(self, relay, endpoint, error):
+        if relay.closed:
+            if endpoint is not None:
+                endpoint.close()
+            return
+        if error is not None:
+            relay.tunnel.error = str(error) or error.__class__.__name__
+            if relay.socks is not None:
+                self.socks_reply(relay, 5)
+            self.relay_close(relay)
+            return
+        if relay.channel is None:
+            relay.channel = endpoint
+        else:
+            relay.sock = endpoint
+        relay.channel.settimeout(0.0)
+        relay.sock.setblocking(False)
+        relay.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        relay.buffer = memoryview(bytearray(FORWARD_BUFFER))
+        if relay.socks is not None:
+            early, relay.socks = relay.socks, None
+            self.socks_reply(relay, 0)
+            if early:
+                relay.up = memoryview(early)
+        self.relay_step(relay, self.relay_flush)
+
+    def relay_step(self, relay, action, *args):
+        try:
+            action(relay, *args)
+        except Exception as e:
+            if not isinstance(e, (BrokenPipeError, ConnectionResetError, EOFError)):
+                relay.tunnel.error = str(e) or e.__class__.__name__
+            self.relay_close(relay)
+            return
+        if relay.closed:
+            return
+        if relay.sock_eof and relay.channel_eof and relay.up is None and relay.down is None:
+            self.relay_close(relay)
+        else:
+            self.relay_update(relay)
+
+    def relay_update(self, relay):
+        # Inscriptions selon l'état : le socket est lu si rien n'attend vers
+        # le canal, le canal si rien n'attend vers le socket
+        if relay.channel is None or relay.sock is None:
+            events = selectors.EVENT_READ if relay.socks is not None and not relay.opening else 0
+        else:
+            events = (selectors.EVENT_READ if relay.up is None and not relay.sock_eof else 0) | \
+                     (selectors.EVENT_WRITE if relay.down is not None else 0)
+        relay.sock_events = self.set_events(relay.sock, relay, relay.sock_events, events)
+        if relay.channel is not None:
+            events = selectors.EVENT_READ if relay.down is None and not relay.channel_eof else 0
+            relay.channel_events = self.set_events(relay.channel, relay, relay.channel_events, events)
+        if relay.up is None:
+            self.blocked.discard(relay)
+        else:
+            self.blocked.add(relay)
+
+    def set_events(self, fileobj, data, current, events):
+        if events != current:
+            if not current:
+                self.selector.register(fileobj, events, data)
+            elif not events:
+                self.selector.unregister(fileobj)
+            else:
+                self.selector.modify(fileobj, events, data)
+        return events
+
+    def relay_event(self, relay, fileobj, mask):
+        if fileobj is relay.channel:
+            if relay.down is None:
+                self.relay_down(relay)
+        elif relay.socks is not None:
+            self.socks_read(relay)
+        else:
+            if mask & selectors.EVENT_WRITE and relay.down is not None:
+                self.relay_drain(relay)
+            if mask & selectors.EVENT_READ and relay.up is None and not relay.sock_eof:
+                self.relay_up(relay)
+
+    def relay_up(self, relay):
+        try:
+            size = relay.sock.recv_into(relay.buffer)
+        except (BlockingIOError, InterruptedError):
+            return
+        if not size:
+            relay.sock_eof = True
+            relay.channel.shutdown_write()
+            return
+        relay.tunnel.sent += size
+        relay.up = relay.buffer[:size]
+        self.relay_flush(relay)
+
+    def relay_flush(self, relay):
+        # Vers le canal, au rythme de la fenêtre SSH ; le reste attend dans
+        # blocked et sera retenté après WRITE_RETRY
+        while relay.up is not None and relay.channel.send_ready():
+            sent = relay.channel.send(relay.up)
+            if not sent:
+                raise EOFError()
+            relay.up = relay.up[sent:] if sent < len(relay.up) else None
+
+    def relay_down(self, relay):
+        try:
+            data = relay.channel.recv(FORWARD_BUFFER)
+        except socket.timeout:
+            return
+        if not data:
+            relay.channel_eof = True
+            relay.sock.shutdown(socket.SHUT_WR)
+            return
+        relay.tunnel.received += len(data)
+        relay.down = memoryview(data)
+        self.relay_drain(relay)
+
+    def relay_drain(self, relay):
+        try:
+            sent = relay.sock.send(relay.down)
+        except (BlockingIOError, InterruptedError):
+            return
+        relay.down = relay.down[sent:] if sent < len(relay.down) else None
+
+    def relay_close(self, relay, counted=True):
+        relay.closed = True
+        self.blocked.discard(relay)
+        for endpoint, events in ((relay.sock, relay.sock_events), (relay.channel, relay.channel_events)):
+            if endpoint is None:
+                continue
+            if events:
+                self.selector.unregister(endpoint)
+            try:
+                endpoint.close()
+            except Exception:
+                pass
+        relay.sock_events = relay.channel_events = 0
+        if counted and relay in relay.tunnel.relays:
+            relay.tunnel.relays.discard(relay)
+            relay.tunnel.connections -= 1
+
+    def socks_read(self, relay):
+        # SOCKS5 sans authentification, commande CONNECT seulement
+        data = relay.sock.recv(4096)
+        if not data:
+            raise EOFError()
+        relay.socks += data
+        buf = relay.socks
+        if not relay.greeted:
+            if len(buf) < 2 or len(buf) < 2 + buf[1]:
+                return
+            if buf[0] != 5 or 0 not in buf[2:2 + buf[1]]:
+                relay.sock.send(b'\x05\xff')
+                raise EOFError()
+            relay.sock.send(b'\x05\x00')
+            relay.greeted = True
+            relay.socks = buf = buf[2 + buf[1]:]
+        if len(buf) < 5:
+            return
+        kind = buf[3]
+        end = {1: 10, 3: 7 + buf[4], 4: 22}.get(kind)
+        if end is None:
+            self.socks_reply(relay, 8)
+            raise EOFError()
+        if len(buf) < end:
+            return
+        if kind == 1:
+            host = socket.inet_ntop(socket.AF_INET, buf[4:8])
+        elif kind == 4:
+            host = socket.inet_ntop(socket.AF_INET6, buf[4:20])
+        else:
+            host = buf[5:5 + buf[4]].decode('ascii', 'replace')
+        port = int.from_bytes(buf[end - 2:end], 'big')
+        if buf[1] != 1:
+            self.socks_reply(relay, 7)
+            raise EOFError()
+        # Le reste éventuel part dès que le canal est ouvert
+        relay.socks = buf[end:]
+        relay.opening = True
+        self.opener_pool().submit(relay.tunnel.owner.open_channel, relay, host, port)
+
+    def socks_reply(self, relay, code):
+        try:
+            relay.sock.send(bytes((5, code, 0, 1, 0, 0, 0, 0, 0, 0)))
+        except OSError:
+            pass
+
+def parse_forward(spec):
+    # « L [adresse:]port:hôte:port », « R [adresse:]port:hôte:port » ou
+    # « D [adresse:]port », comme les options -L, -R et -D de ssh ; les
+    # adresses IPv6 s'écrivent entre crochets
+    match = re.match(r'\s*-?([LRDlrd])\s*(\S+)\s*$', spec)
+    if match is None:
+        raise ValueError(f"redirection invalide : {spec.strip()}")
+    kind = match.group(1).upper()
+    fields = [f[1:-1] if f.startswith('[') else f for f in re.findall(r'\[[^\]]*\]|[^:]+', match.group(2))]
+    wanted = 1 if kind == 'D' else 3
+    if len(fields) == wanted:
+        fields.insert(0, 'localhost' if kind == 'R' else '127.0.0.1')
+    if len(fields) != wanted + 1 or not all(f.isdigit() and int(f) < 65536 for f in fields[1::2]):
+        raise ValueError(f"redirection invalide : {spec.strip()}")
+    rule = {'spec': f"{kind} {match.group(2)}", 'kind': kind, 'bind': fields[0], 'port': int(fields[1])}
+    if kind != 'D':
+        rule['host'], rule['host_port'] = fields[2], int(fields[3])
+    return rule
+
+def server_forwards(server):
+    # Redirections enregistrées d'un serveur (colonne forwards, liste JSON)
+    try:
+        specs = json.loads(server.get('forwards') or '[]')
+    except ValueError:
+        return []
+    rules = []
+    for spec in specs:
+        try:
+            rules.append(parse_forward(spec))
+        except ValueError:
+            pass
+    return rules
+
+class TunnelSet:
+    # Redirections d'une connexion SSH, partagées par ses onglets comme la
+    # Transport elle-même et arrêtées avec son dernier onglet. Les données
+    # passent par le réacteur ; seules les ouvertures bloquent, dans ses
+    # threads d'ouverture.
+    instances = {}  # transport -> [TunnelSet, nombre d'utilisateurs]
+    lock = threading.Lock()
+
+    @classmethod
+    def acquire(cls, transport, rules=()):
+        with cls.lock:
+            entry = cls.instances.get(transport)
+            if entry is None:
+                entry = cls.instances[transport] = [cls(transport), 0]
+                for rule in rules:
+                    entry[0].add(rule)
+            entry[1] += 1
+            return entry[0]
+
+    @classmethod
+    def release(cls, tunnels):
+        with cls.lock:
+            entry = cls.instances.get(tunnels.transport)
+            if entry is None or entry[0] is not tunnels:
+                return
+            entry[1] -= 1
+            if entry[1] > 0:
+                return
+            del cls.instances[tunnels.transport]
+        tunnels.close()
+
+    def __init__(self, transport):
+        self.transport = transport
+        self.reactor = ChannelReactor.shared()
+        self.tunnels = []
+        self.remote = {}  # port écouté par le serveur -> Tunnel (règles R)
+
+    def specs(self):
+        return [tunnel.rule['spec'] for tunnel in self.tunnels]
+
+    def add(self, rule):
+        tunnel = Tunnel(rule, self)
+        self.tunnels.append(tunnel)
+        self.reactor.opener_pool().submit(self.start, tunnel)
+        return tunnel
+
+    def remove(self, tunnel, drop=False):
+        if tunnel in self.tunnels:
+            self.tunnels.remove(tunnel)
+        tunnel.closed = True
+        tunnel.status = "Arrêtée"
+        self.reactor.call(self.reactor.unlisten, tunnel, drop)
+        if tunnel.rule['kind'] == 'R' and self.remote.get(tunnel.port) is tunnel:
+            del self.remote[tunnel.port]
+            if not drop:
+                self.reactor.opener_pool().submit(self.cancel, tunnel)
+
+    def close(self):
+        for tunnel in list(self.tunnels):
+            self.remove(tunnel, drop=True)
+
+    def start(self, tunnel):
+        rule = tunnel.rule
+        try:
+            if rule['kind'] == 'R':
+                tunnel.port = self.transport.request_port_forward(rule['bind'], rule['port'], self.on_remote)
+                self.remote[tunnel.port] = tunnel
+                if tunnel.closed:
+                    self.remove(tunnel)
+                    return
+            else:
+                family = socket.AF_INET6 if ':' in rule['bind'] else socket.AF_INET
+                sock = socket.create_server((rule['bind'], rule['port']), family=family, backlog=FORWARD_BACKLOG)
+                sock.setblocking(False)
+                tunnel.port = sock.getsockname()[1]
+                self.reactor.call(self.reactor.listen, tunnel, sock)
+            if not tunnel.closed:
+                tunnel.status = "Active"
+        except Exception as e:
+            tunnel.status = f"Erreur : {str(e) or e.__class__.__name__}"
+
+    def cancel(self, tunnel):
+        try:
+            self.transport.cancel_port_forward(tunnel.rule['bind'], tunnel.port)
+        except Exception:
+            pass
+
+    def on_remote(self, channel, origin, server):
+        # Thread de la Transport : connexion arrivée sur un port distant
+        tunnel = self.remote.get(server[1])
+        if tunnel is None:
+            channel.close()
+            return
+        self.reactor.call(self.reactor.relay_accepted, Relay(tunnel, channel=channel, peer=origin))
+
+    def open_channel(self, relay, host, port):
+        try:
+            channel = self.transport.open_channel('direct-tcpip', (host, port), relay.peer,
+                                                  window_size=FORWARD_WINDOW, timeout=CONNECT_TIMEOUT)
+            self.reactor.call(self.reactor.relay_opened, relay, channel, None)
+        except Exception as e:
+            self.reactor.call(self.reactor.relay_opened, relay, None, e)
+
+    def open_socket(self, relay, host, port):
+        try:
+            sock = socket.create_connection((host, port), CONNECT_TIMEOUT)
+            self.reactor.call(self.reactor.relay_opened, relay, sock, None)
+        except Exception as e:
+            self.reactor.call(self.reactor.relay_opened, relay, None, e)
+
+def server_profile(server):
+    # Profil de transport d'un serveur de l'inventaire (standard par défaut)
+    value = server.get('profile')
+    if not value:
+        return {}
+    if value in TRANSPORT_PROFILES:
+        return TRANSPORT_PROFILES[value]
+    try:
+        profile = json.loads(value)
+    except ValueError:
+        return {}
+    return profile if isinstance(profile, dict) else {}
+
+def profile_name(profile):
+    for name, preset in TRANSPORT_PROFILES.items():
+        if preset == profile:
+            return name
+    return json.dumps(profile, sort_keys=True)
+
+def configure_transport(transport, profile):
+    # À appeler avant start_client
+    options = transport.get_security_options()
+    for key, attr in (('ciphers', 'ciphers'), ('macs', 'digests')):
+        available = getattr(options, attr)
+        preferred = [name for name in profile.get(key, ()) if name in available]
+        if preferred:
+            setattr(options, attr, preferred + [name for name in available if name not in preferred])
+    transport.use_compression(bool(profile.get('compress')))
+    # Seuils de renégociation des clés : attributs de classe du Packetizer,
+    # redéfinis pour cette connexion seulement
+    if 'rekey_bytes' in profile:
+        transport.packetizer.REKEY_BYTES = int(profile['rekey_bytes'])
+    if 'rekey_packets' in profile:
+        transport.packetizer.REKEY_PACKETS = int(profile['rekey_packets'])
+
+def connect_transport(host, port, user, passwd, timeout=CONNECT_TIMEOUT, stage=None, on_open=None, profile=None):
+    # TCP, échange de clés puis authentification par mot de passe
+    import paramiko
+    from paramiko.common import DEFAULT_WINDOW_SIZE, DEFAULT_MAX_PACKET_SIZE
+    stage = stage or (lambda message: None)
+    on_open = on_open or (lambda closable: None)
+    profile = profile or {}
+    stage(f"TCP : connexion à {host}:{port}...")
+    sock = socket.create_connection((host, port), timeout=timeout)
+    on_open(sock)
+    stage("KEX : échange de clés...")
+    transport = paramiko.Transport(sock,
+                                   default_window_size=int(profile.get('window', DEFAULT_WINDOW_SIZE)),
+                                   default_max_packet_size=int(profile.get('packet', DEFAULT_MAX_PACKET_SIZE)))
+    on_open(transport)
+    configure_transport(transport, profile)
+    transport.start_client(timeout=timeout)
+    stage("Authentification...")
+    transport.auth_password(user, passwd)
+    return transport
+
+def shared_transport(host, port, user, passwd, keepalive=KEEPALIVE_INTERVAL, timeout=CONNECT_TIMEOUT, stage=None,
+                     profile=None):
+    # Connexion partagée du ConnectionManager, ouverte si besoin ; renvoie
+    # (clé, transport) à rendre avec ConnectionManager.release
+    key = connection_key(user, host, port, passwd)
+    manager = ConnectionManager.shared()
+    with manager.key_lock(key):
+        transport = manager.acquire(key)
+        if transport is not None:
+            return key, transport
+        opened = []
+        try:
+            transport = connect_transport(host, port, user, passwd, timeout, stage, opened.append, profile)
+        except Exception:
+            for closable in reversed(opened):
+                closable.close()
+            raise
+        manager.add(key, transport, keepalive)
+    return key, transport
+
+def stream_command(channel, command, on_output, deadline=None, cancelled=None):
+    # exec_command sur un canal ouvert ; on_output(texte, stderr) reçoit la
+    # sortie au fil de l'eau. Renvoie (code de sortie ou -1, état).
+    cancelled = cancelled or (lambda: False)
+    channel.exec_command(command)
+    out = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    err = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    while True:
+        wait = 0.1
+        if deadline is not None:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return -1, "Délai dépassé"
+            wait = min(remaining, wait)
+        select.select([channel], [], [], wait)
+        if cancelled():
+            return -1, "Annulé"
+        # Le statut de sortie arrive après toutes les données
+        done = channel.exit_status_ready()
+        while channel.recv_ready():
+            text = out.decode(channel.recv(READ_MAX))
+            if text:
+                on_output(text, False)
+        while channel.recv_stderr_ready():
+            text = err.decode(channel.recv_stderr(READ_MAX))
+            if text:
+                on_output(text, True)
+        if done:
+            code = channel.recv_exit_status()
+            return code, "OK" if code == 0 else "Échec"
+
+def probe_profile(host, port, user, passwd, profile, seconds=PROBE_SECONDS):
+    # Connexion dédiée avec le profil, puis débit de PROBE_COMMAND ;
+    # renvoie (durée de connexion, octets par seconde, algorithmes négociés)
+    start = time.perf_counter()
+    opened = []
+    try:
+        transport = connect_transport(host, port, user, passwd, on_open=opened.append, profile=profile)
+        connected = time.perf_counter()
+        channel = transport.open_session(timeout=CONNECT_TIMEOUT)
+        channel.exec_command(PROBE_COMMAND)
+        received = 0
+        first = None
+        deadline = connected + seconds
+        while received < PROBE_BYTES:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            channel.settimeout(remaining)
+            try:
+                data = channel.recv(READ_MAX)
+            except socket.timeout:
+                break
+            if not data:
+                break
+            if first is None:
+                first = time.perf_counter()  # chronomètre lancé au premier bloc
+                continue
+            received += len(data)
+        elapsed = time.perf_counter() - first if first is not None else 0
+        if received <= 0 or elapsed <= 0:
+            raise EOFError("pas de sortie de la commande de mesure")
+        # Les chiffrements AES-GCM authentifient eux-mêmes : pas de MAC à afficher
+        mac = None if transport.remote_cipher.endswith('gcm@openssh.com') else transport.remote_mac
+        algorithms = ', '.join(a for a in (transport.remote_cipher, mac, transport.remote_compression) if a)
+        return connected - start, received / elapsed, algorithms
+    finally:
+        for closable in reversed(opened):
+            try:
+                closable.close()
+            except Exception:
+                pass
+
+def probe_profiles(host, port, user, passwd, names=None, on_result=None):
+    # Mesure chaque profil l'un après l'autre ; on_result(nom, résultat)
+    # reçoit (connexion, débit, algorithmes) ou l'exception
+    results = {}
+    for name in names or TRANSPORT_PROFILES:
+        try:
+            results[name] = probe_profile(host, port, user, passwd, TRANSPORT_PROFILES[name])
+        except Exception as e:
+            results[name] = e
+        if on_result is not None:
+            on_result(name, results[name])
+    return results
+
+def recommend_profile(results):
+    # Meilleur débit, le profil standard gardant l'avantage à PROBE_MARGIN près
+    rates = {name: r[1] for name, r in results.items() if not isinstance(r, Exception)}
+    if not rates:
+        return None
+    best = max(rates, key=rates.get)
+    if 'standard' in rates and rates[best] < rates['standard'] * (1 + PROBE_MARGIN):
+        return 'standard'
+    return best
+
+def read_servers_file(path="servers.json"):
+    if os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception:
+            return []
+    return []
+
+class ServerStore:
+    # Inventaire des serveurs dans SQLite : mises à jour atomiques ligne par
+    # ligne, ordre MRU indexé, pas de limite de taille. L'ancien
+    # servers.json est importé une seule fois.
+    instance = None
+
+    @classmethod
+    def shared(cls):
+        if cls.instance is None:
+            cls.instance = cls()
+        return cls.instance
+
+    def __init__(self, path="servers.db", legacy_path="servers.json"):
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        with self.lock, self.db:
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("""
+                CREATE TABLE IF NOT EXISTS servers (
+                    id INTEGER PRIMARY KEY,
+                    host TEXT NOT NULL,
+                    user TEXT NOT NULL,
+                    port INTEGER NOT NULL,
+                    password_fernet TEXT,
+                    tags TEXT NOT NULL DEFAULT '',
+                    keepalive INTEGER,
+                    profile TEXT,
+                    forwards TEXT,
+                    last_used REAL NOT NULL DEFAULT 0,
+                    UNIQUE (host, user, port)
+                )
+            """)
+            self.db.execute("CREATE INDEX IF NOT EXISTS servers_mru ON servers (last_used DESC)")
+            # Onglets ouverts à la fermeture, rouverts au lancement suivant
+            self.db.execute("""
+                CREATE TABLE IF NOT EXISTS workspace (
+                    position INTEGER PRIMARY KEY,
+                    host TEXT NOT NULL,
+                    user TEXT NOT NULL,
+                    port INTEGER NOT NULL,
+                    title TEXT NOT NULL,
+                    tail TEXT
+                )
+            """)
+            version = self.db.execute("PRAGMA user_version").fetchone()[0]
+            if version == 0:
+                self.import_json(legacy_path)
+            columns = [row['name'] for row in self.db.execute("PRAGMA table_info(servers)")]
+            if 'profile' not in columns:
+                self.db.execute("ALTER TABLE servers ADD COLUMN profile TEXT")
+            if 'forwards' not in columns:
+                self.db.execute("ALTER TABLE servers ADD COLUMN forwards TEXT")
+            if version < 3:
+                self.db.execute("PRAGMA user_version = 3")
+
+    def import_json(self, path):
+        now = time.time()
+        for i, s in enumerate(read_servers_file(path)):
+            self.db.execute(
+                "INSERT OR IGNORE INTO servers (host, user, port, password_fernet, keepalive, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (s['host'], s['user'], int(s['port']), s.get('password_fernet'), s.get('keepalive'), now - i))
+
+    def entries(self):
+        # Colonnes légères seulement : les mots de passe restent en base
+        with self.lock:
+            return [tuple(row) for row in self.db.execute(
+                "SELECT id, user, host, port, tags, password_fernet IS NOT NULL "
+                "FROM servers ORDER BY last_used DESC")]
+
+    def row_dict(self, row):
+        return {k: row[k] for k in row.keys() if row[k] is not None} if row is not None else {}
+
+    def get(self, host, user, port):
+        with self.lock:
+            row = self.db.execute("SELECT * FROM servers WHERE host = ? AND user = ? AND port = ?",
+                                  (host, user, int(port))).fetchone()
+        return self.row_dict(row)
+
+    def get_by_id(self, server_id):
+        with self.lock:
+            row = self.db.execute("SELECT * FROM servers WHERE id = ?", (server_id,)).fetchone()
+        return self.row_dict(row)
+
+    def record_use(self, host, user, port, password_fernet=None, tags=None, profile=None):
+        # Ajoute le serveur ou le remonte en tête (MRU) ; tags ou profil à
+        # None : inchangés
+        with self.lock, self.db:
+            self.db.execute(
+                "INSERT INTO servers (host, user, port, password_fernet, tags, profile, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (host, user, port) DO UPDATE SET "
+                "password_fernet = excluded.password_fernet, last_used = excluded.last_used, "
+                "tags = COALESCE(?, tags), profile = COALESCE(?, profile)",
+                (host, user, int(port), password_fernet, tags or '', profile, time.time(), tags, profile))
+
+    def set_profile(self, host, user, port, profile):
+        with self.lock, self.db:
+            return self.db.execute("UPDATE servers SET profile = ? WHERE host = ? AND user = ? AND port = ?",
+                                   (profile, host, user, int(port))).rowcount
+
+    def set_forwards(self, host, user, port, specs):
+        with self.lock, self.db:
+            return self.db.execute("UPDATE servers SET forwards = ? WHERE host = ? AND user = ? AND port = ?",
+                                   (json.dumps(specs) if specs else None, host, user, int(port))).rowcount
+
+    def workspace(self):
+        with self.lock:
+            return [self.row_dict(row) for row in self.db.execute("SELECT * FROM workspace ORDER BY position")]
+
+    def save_workspace(self, tabs):
+        # tabs : (host, user, port, titre, fin de l'historique ou None), dans
+        # l'ordre des onglets ; remplace tout l'espace de travail d'un coup
+        with self.lock, self.db:
+            self.db.execute("DELETE FROM workspace")
+            self.db.executemany(
+                "INSERT INTO workspace (position, host, user, port, title, tail) VALUES (?, ?, ?, ?, ?, ?)",
+                [(i, host, user, int(port), title, tail) for i, (host, user, port, title, tail) in enumerate(tabs)])
+
+def saved_server(host, user, port):
+    return ServerStore.shared().get(host, user, port)
+
+def parse_tags(text):
+    return ','.join(t.strip() for t in text.split(',') if t.strip())
+
+def fuzzy_score(pattern, text):
+    # Chaque mot du motif est une sous-séquence du texte (caractères dans
+    # l'ordre) ; les suites consécutives et les débuts et fins de mot comptent
+    # davantage. Un mot "#tag" doit correspondre au début d'un tag.
+    score = 0
+    for word in pattern.split():
+        if word.startswith('#'):
+            if text.find(' ' + word) < 0:
+                return None
+            score += 3 * len(word)
+            continue
+        pos = -1
+        for ch in word:
+            i = text.find(ch, pos + 1)
+            if i < 0:
+                return None
+            if i == pos + 1 and pos >= 0:
+                score += 3
+            if i == 0 or text[i - 1] in '@.:-_ #,':
+                score += 2
+            score += 1
+            pos = i
+        if pos + 1 == len(text) or text[pos + 1] in '@.:-_ #,':
+            score += 2
+    return score
+
+def decrypt_password(server, fernet=None):
+    # Mot de passe enregistré du serveur, ou None (absent ou indéchiffrable)
+    if 'password_fernet' not in server:
+        return None
+    try:
+        return (fernet or load_fernet_key()).decrypt(server['password_fernet'].encode()).decode()
+    except Exception:
+        return None
+
+def parse_target(target):
+    # "user@host[:port]" ou "host[:port]" -> (user ou None, host, port ou None)
+    user, _, rest = target.rpartition('@')
+    host, _, port = rest.partition(':')
+    return user or None, host, int(port) if port else None
+
+def resolve_servers(target, store=None):
+    # "#tag" : tous les serveurs du tag ; sinon un seul serveur, désigné par
+    # user@host[:port] ou par un hôte sans ambiguïté dans l'inventaire
+    store = store or ServerStore.shared()
+    if target.startswith('#'):
+        tag = target[1:].lower()
+        return [store.get_by_id(e[0]) for e in store.entries()
+                if tag in (t.lower() for t in e[4].split(','))]
+    user, host, port = parse_target(target)
+    matches = [e for e in store.entries()
+               if e[2] == host and (user is None or e[1] == user) and (port is None or e[3] == port)]
+    if len(matches) == 1:
+        return [store.get_by_id(matches[0][0])]
+    if len(matches) > 1:
+        raise ValueError(f"{target} désigne plusieurs serveurs : "
+                         + ', '.join(server_key(e[1], e[2], e[3]) for e in matches))
+    if user is None:
+        return []
+    # Serveur absent de l'inventaire : utilisable tel quel
+    return [{'host': host, 'user': user, 'port': port or 22}]
+
+def load_fernet_key(path=".fernet.key"):
+    from cryptography.fernet import Fernet
+    if not os.path.exists(path):
+        key = Fernet.generate_key()
+        with open(path, 'wb') as f:
+            f.write(key)
+    else:
+        with open(path, 'rb') as f:
+            key = f.read()
+    return Fernet(key)
+
+def zstd_available():
+    import importlib.util
+    return importlib.util.find_spec('zstandard') is not None
+
+def compress_log(path, method):
+    # Compresse un journal terminé puis supprime l'original (seulement si la
+    # compression a réussi)
+    try:
+        if method == 'zstd':
+            import zstandard
+            with open(path, 'rb') as src, open(path + '.zst', 'wb') as dst:
+                zstandard.ZstdCompressor().copy_stream(src, dst)
+        else:
+            import gzip
+            import shutil
+            with open(path, 'rb') as src, gzip.open(path + '.gz', 'wb', compresslevel=6) as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+        os.remove(path)
+    except Exception:
+        pass
+
+class SessionLogger:
+    # Journal brut (octets reçus) d'un onglet. write() ne fait qu'empiler :
+    # le thread du journal écrit par gros blocs, horodate les lignes si
+    # demandé et change de fichier selon la taille ou l'âge. Si le disque ne
+    # suit pas, les données au-delà de LOG_BACKLOG_LIMIT sont abandonnées
+    # (le journal l'indique) plutôt que de ralentir la lecture.
+    def __init__(self, name, timestamps=False, compress=None, directory=LOG_DIR):
+        self.name = re.sub(r'[^\w@.-]', '_', name)
+        self.timestamps = timestamps
+        self.compress = compress
+        self.directory = directory
+        self.chunks = deque()
+        self.size = 0
+        self.dropped = 0
+        self.closed = False
+        self.cond = threading.Condition()
+        self.file = None
+        self.path = None
+        self.at_line_start = True
+        os.makedirs(directory, exist_ok=True)
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def write(self, data):
+        with self.cond:
+            if self.size + len(data) > LOG_BACKLOG_LIMIT:
+                self.dropped += len(data)
+                return
+            self.chunks.append((time.time(), data))
+            self.size += len(data)
+            if self.size >= LOG_FLUSH_BYTES:
+                self.cond.notify()
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify()
+
+    def open_file(self):
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        self.path = os.path.join(self.directory, f"{self.name}_{stamp}.log")
+        n = 1
+        while os.path.exists(self.path):
+            n += 1
+            self.path = os.path.join(self.directory, f"{self.name}_{stamp}-{n}.log")
+        self.file = open(self.path, 'ab', buffering=1024 * 1024)
+        self.opened = time.time()
+        self.written = 0
+
+    def close_file(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+            if self.compress:
+                threading.Thread(target=compress_log, args=(self.path, self.compress), daemon=True).start()
+
+    def stamp_lines(self, when, data):
+        prefix = time.strftime('[%Y-%m-%d %H:%M:%S] ', time.localtime(when)).encode()
+        lines = data.split(b'\n')
+        out = []
+        for i, line in enumerate(lines):
+            if i:
+                out.append(b'\n')
+            if line and (i or self.at_line_start):
+                out.append(prefix)
+            out.append(line)
+        self.at_line_start = data.endswith(b'\n')
+        return b''.join(out)
+
+    def run(self):
+        try:
+            while True:
+                with self.cond:
+                    if not self.closed and self.size < LOG_FLUSH_BYTES:
+                        self.cond.wait(LOG_FLUSH_INTERVAL)
+                    chunks, self.chunks = self.chunks, deque()
+                    self.size = 0
+                    dropped, self.dropped = self.dropped, 0
+                    closed = self.closed
+                if chunks or dropped:
+                    if self.file is None or self.written >= LOG_MAX_BYTES or time.time() - self.opened >= LOG_MAX_AGE:
+                        self.close_file()
+                        self.open_file()
+                    if self.timestamps:
+                        data = b''.join(self.stamp_lines(when, chunk) for when, chunk in chunks)
+                    else:
+                        data = b''.join(chunk for _, chunk in chunks)
+                    if dropped:
+                        data += f"\r\n[ssgui : {dropped} octets non journalisés]\r\n".encode()
+                    self.file.write(data)
+                    self.file.flush()
+                    self.written += len(data)
+                if closed:
+                    break
+        finally:
+            self.close_file()
+
+class Transfer:
+    # Un fichier en cours de copie ; l'interface lit size, done et status
+    def __init__(self, upload, local, remote):
+        self.upload = upload
+        self.local, self.remote = local, remote
+        self.name = os.path.basename(local) if upload else posixpath.basename(remote)
+        self.size = 0
+        self.done = 0
+        self.status = "En attente"
+        self.resumed = False
+        self.finished = False
+        self.stopped = False  # annulé ou en échec : reprise possible
+        self.generation = 0
+        self.remaining = 0
+        self.lock = threading.Lock()
+        self.part = None
+        self.state = None
+        self.state_path = None
+
+    def progress(self, size):
+        with self.lock:
+            self.done += size
+
+    def stop(self, status):
+        if not self.finished:
+            self.stopped = True
+            self.status = status
+
+class TransferQueue:
+    # Transferts d'une connexion : les blocs de tous les fichiers en cours
+    # passent par une même file, servie par des canaux SFTP parallèles ouverts
+    # sur la transport existante.
+    def __init__(self, transport, server, workers=SFTP_WORKERS, directory=TRANSFER_DIR):
+        self.transport = transport
+        self.server = server
+        self.workers = workers
+        self.directory = directory
+        self.transfers = []
+        self.items = deque()  # (transfert, génération, numéro du bloc)
+        self.cond = threading.Condition()
+        self.threads = 0
+        self.walking = 0
+        self.closed = False
+        self.control_client = None
+        self.control_lock = threading.Lock()
+
+    def open_client(self):
+        import paramiko
+        return paramiko.SFTPClient.from_transport(self.transport, window_size=SFTP_WINDOW)
+
+    @contextmanager
+    def control(self):
+        # Canal pour les listes de dossiers et les petites opérations, une à
+        # la fois (un SFTPClient ne se partage pas entre threads)
+        with self.control_lock:
+            if self.control_client is None:
+                self.control_client = self.open_client()
+            yield self.control_client
+
+    def add(self, upload, local, remote):
+        transfer = Transfer(upload, local, remote)
+        with self.cond:
+            self.transfers.append(transfer)
+        self.restart(transfer)
+        return transfer
+
+    def restart(self, transfer):
+        # Nouveau départ ou reprise d'un transfert arrêté (les blocs déjà
+        # copiés ne sont pas refaits)
+        with self.cond:
+            if transfer not in self.transfers:
+                self.transfers.append(transfer)
+            transfer.generation += 1
+            transfer.stopped = transfer.finished = False
+            transfer.status = "En attente"
+        threading.Thread(target=self.prepare, args=(transfer, transfer.generation), daemon=True).start()
+
+    def add_tree(self, upload, local, remote):
+        # Dossier : parcouru dans un thread, un transfert par fichier
+        with self.cond:
+            self.walking += 1
+        threading.Thread(target=self.walk, args=(upload, local, remote), daemon=True).start()
+
+    def walk(self, upload, local, remote):
+        client = None
+        try:
+            client = self.open_client()
+            if upload:
+                for root, dirs, files in os.walk(local):
+                    relative = os.path.relpath(root, local)
+                    target = remote if relative == '.' else posixpath.join(remote, *relative.split(os.sep))
+                    try:
+                        client.mkdir(target)
+                    except IOError:
+                        pass  # existe déjà
+                    for name in files:
+                        self.add(True, os.path.join(root, name), posixpath.join(target, name))
+            else:
+                folders = [(remote, local)]
+                while folders:
+                    source, target = folders.pop()
+                    os.makedirs(target, exist_ok=True)
+                    for attr in client.listdir_attr(source):
+                        path = posixpath.join(source, attr.filename)
+                        if stat.S_ISDIR(attr.st_mode or 0):
+                            folders.append((path, os.path.join(target, attr.filename)))
+                        else:
+                            self.add(False, os.path.join(target, attr.filename), path)
+        except Exception as e:
+            transfer = Transfer(upload, local, remote)
+            transfer.stop(f"Échec : {e}")
+            with self.cond:
+                self.transfers.append(transfer)
+        finally:
+            if client is not None:
+                client.close()
+            with self.cond:
+                self.walking -= 1
+
+    def state_file(self, transfer):
+        key = f"{'up' if transfer.upload else 'down'}|{self.server}|{transfer.remote}|{os.path.abspath(transfer.local)}"
+        return os.path.join(self.directory, hashlib.sha1(key.encode()).hexdigest() + '.json')
+
+    def save_state(self, transfer):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(transfer.state_path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(transfer.state, f)
+            os.replace(transfer.state_path + '.tmp', transfer.state_path)
+        except OSError:
+            pass  # sans état, le transfert repartira de zéro
+
+    def prepare(self, transfer, generation):
+        transfer.status = "Préparation"
+        try:
+            with self.control() as client:
+                self.open_part(client, transfer)
+            if transfer.stopped or transfer.generation != generation:
+                return
+            if not transfer.remaining:
+                with self.control() as client:
+                    self.finish(client, transfer)
+                return
+            self.save_state(transfer)
+            transfer.status = "Reprise" if transfer.resumed else "En cours"
+            done = set(transfer.state['done'])
+            count = (transfer.size + SFTP_CHUNK - 1) // SFTP_CHUNK
+            with self.cond:
+                self.items.extend((transfer, generation, i) for i in range(count) if i not in done)
+                while self.threads < self.workers:
+                    self.threads += 1
+                    threading.Thread(target=self.worker, daemon=True).start()
+                self.cond.notify_all()
+        except Exception as e:
+            transfer.stop(f"Échec : {e}")
+
+    def open_part(self, client, transfer):
+        # Reprend le fichier partiel si l'état enregistré correspond encore à
+        # la source, sinon en crée un nouveau
+        if transfer.upload:
+            st = os.stat(transfer.local)
+            transfer.part = transfer.remote + PART_SUFFIX
+        else:
+            st = client.stat(transfer.remote)
+            transfer.part = transfer.local + PART_SUFFIX
+        size, mtime = st.st_size, int(st.st_mtime)
+        transfer.size = size
+        transfer.state_path = self.state_file(transfer)
+        try:
+            with open(transfer.state_path, encoding='utf-8') as f:
+                state = json.load(f)
+            if transfer.upload:
+                client.stat(transfer.part)
+            elif not os.path.exists(transfer.part):
+                state = None
+        except (OSError, ValueError):
+            state = None
+        if state is None or (state['size'], state['mtime'], state['chunk']) != (size, mtime, SFTP_CHUNK):
+            if transfer.upload:
+                client.open(transfer.part, 'wb').close()
+            else:
+                os.makedirs(os.path.dirname(os.path.abspath(transfer.part)), exist_ok=True)
+                with open(transfer.part, 'wb') as f:
+                    f.truncate(size)
+            state = {'size': size, 'mtime': mtime, 'chunk': SFTP_CHUNK, 'done': [],
+                     'local': transfer.local, 'remote': transfer.remote}
+        transfer.state = state
+        transfer.resumed = bool(state['done'])
+        transfer.done = sum(min(SFTP_CHUNK, size - i * SFTP_CHUNK) for i in state['done'])
+        transfer.remaining = (size + SFTP_CHUNK - 1) // SFTP_CHUNK - len(state['done'])
+
+    def worker(self):
+        client = None
+        try:
+            client = self.open_client()
+            while True:
+                with self.cond:
+                    while not self.items and not self.closed:
+                        self.cond.wait()
+                    if self.closed:
+                        return
+                    transfer, generation, index = self.items.popleft()
+                if transfer.stopped or transfer.generation != generation:
+                    continue
+                try:
+                    if not self.copy_chunk(client, transfer, generation, index):
+                        continue
+                    with transfer.lock:
+                        transfer.state['done'].append(index)
+                        transfer.remaining -= 1
+                        last = not transfer.remaining
+                        self.save_state(transfer)
+                    if last:
+                        self.finish(client, transfer)
+                except Exception as e:
+                    transfer.stop(f"Échec : {e}")
+        except Exception as e:
+            # Canal refusé (MaxSessions du serveur...) : les autres suffisent,
+            # sauf s'il n'en reste aucun
+            with self.cond:
+                if self.threads == 1:
+                    for transfer, _, _ in self.items:
+                        transfer.stop(f"Échec : {e}")
+                    self.items.clear()
+        finally:
+            with self.cond:
+                self.threads -= 1
+            if client is not None:
+                client.close()
+
+    def copy_chunk(self, client, transfer, generation, index):
+        # Renvoie False si le transfert a été arrêté pendant la copie
+        start = index * SFTP_CHUNK
+        end = min(transfer.size, start + SFTP_CHUNK)
+        if transfer.upload:
+            with open(transfer.local, 'rb') as src, client.open(transfer.part, 'r+b') as dst:
+                dst.set_pipelined(True)
+                src.seek(start)
+                dst.seek(start)
+                pos = start
+                while pos < end:
+                    if transfer.stopped or transfer.generation != generation:
+                        return False
+                    data = src.read(min(end - pos, 32 * SFTP_BLOCK))
+                    if not data:
+                        raise IOError("fichier local raccourci pendant l'envoi")
+                    dst.write(data)
+                    pos += len(data)
+                    transfer.progress(len(data))
+        else:
+            with client.open(transfer.remote, 'rb') as src, open(transfer.part, 'r+b') as dst:
+                dst.seek(start)
+                blocks = [(pos, min(SFTP_BLOCK, end - pos)) for pos in range(start, end, SFTP_BLOCK)]
+                for data in src.readv(blocks):
+                    if transfer.stopped or transfer.generation != generation:
+                        return False
+                    dst.write(data)
+                    transfer.progress(len(data))
+        return True
+
+    def finish(self, client, transfer):
+        mtime = transfer.state['mtime']
+        if transfer.upload:
+            try:
+                client.posix_rename(transfer.part, transfer.remote)
+            except IOError:
+                # Serveur sans l'extension posix-rename
+                try:
+                    client.remove(transfer.remote)
+                except IOError:
+                    pass
+                client.rename(transfer.part, transfer.remote)
+            client.utime(transfer.remote, (mtime, mtime))
+        else:
+            os.replace(transfer.part, transfer.local)
+            os.utime(transfer.local, (mtime, mtime))
+        try:
+            os.remove(transfer.state_path)
+        except OSError:
+            pass
+        transfer.finished = True
+        transfer.status = "Terminé"
+
+    def active(self):
+        with self.cond:
+            return self.walking > 0 or any(not t.finished and not t.stopped for t in self.transfers)
+
+    def close(self):
+        # Les transferts en cours restent reprenables (état et fichier partiel gardés)
+        with self.cond:
+            self.closed = True
+            for transfer in self.transfers:
+                transfer.stop("Interrompu")
+            self.cond.notify_all()
+        with self.control_lock:
+            client, self.control_client = self.control_client, None
+        if client is not None:
+            try:
+                client.close()
+            except Exception:
+                pass